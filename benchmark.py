@@ -0,0 +1,446 @@
+"""
+Banco de pruebas reproducible del pipeline OCR: rendimiento y precisión.
+
+Procesa un corpus (por defecto test_images/) con OcrService y reporta:
+- imágenes por segundo y latencia p50/p95 de cada etapa: lectura, decodificación,
+  OSD, detección de color, máscaras y pre-procesamiento (la etapa OCR sin el
+  tiempo dentro de Tesseract) y OCR, además del total por imagen;
+- número de llamadas a Tesseract y su latencia por tipo de llamada;
+- memoria máxima del proceso (RSS);
+- precisión frente a las salidas esperadas (benchmarks/expected.json):
+  colores detectados y similitud del texto.
+
+Para que las corridas sean comparables, la caché de resultados se desactiva y
+las estadísticas de estrategias empiezan de cero en cada ejecución. Con
+--baseline compara contra un informe guardado y termina con código 1 si alguna
+métrica empeoró más que la tolerancia.
+
+Uso:
+    python benchmark.py                                     # corpus test_images/
+    python benchmark.py --repeat 3 -o benchmarks/baseline.json
+    python benchmark.py --baseline benchmarks/baseline.json
+    python benchmark.py --update-expected                   # agrega las imágenes nuevas a los esperados
+
+Los colores y textos de benchmarks/expected.json están verificados a mano
+sobre cada imagen. --update-expected solo agrega las imágenes que todavía no
+tienen entrada (con la salida de esta corrida) y nunca pisa las existentes:
+las entradas nuevas hay que revisarlas a mano antes de confiar en ellas.
+"""
+import argparse
+import difflib
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from src.infrastructure.ocr_service import OcrService
+from src.infrastructure.ocr_config import (
+    OcrConfig, HIGHLIGHT_MODE_PAGE, HIGHLIGHT_MODE_REGIONS, HIGHLIGHT_MODE_COMPOSITE,
+    FALLBACK_SEQUENTIAL, FALLBACK_FIRST_ACCEPTABLE, FALLBACK_BEST_CONFIDENCE,
+    PREPROCESS_FAST, PREPROCESS_BALANCED, PREPROCESS_QUALITY, MODEL_FAST, MODEL_BEST,
+)
+from src.infrastructure.ocr_result import STATUS_OK, STATUS_EMPTY, STATUS_ERROR
+from src.interface.cli import collect_image_paths
+
+REPORT_VERSION = 1
+DEFAULT_CORPUS = "test_images"
+DEFAULT_EXPECTED = os.path.join("benchmarks", "expected.json")
+
+# Etapas reportadas, en orden (las claves salen de OcrResult.timings, salvo "masking")
+STAGES = ("read", "decode", "orientation", "analysis", "masking", "ocr", "total")
+STAGE_LABELS = {
+    "read": "Lectura", "decode": "Decodificación", "orientation": "OSD",
+    "analysis": "Detección de color", "masking": "Máscaras y preproceso", "ocr": "OCR (etapa)", "total": "Total",
+}
+# Métodos del motor que ejecutan Tesseract (y que se cuentan)
+TESSERACT_METHODS = ("image_to_string", "image_to_data", "recognize", "detect_orientation")
+OSD_METHOD = "detect_orientation"
+
+# Tolerancias al comparar con la línea base
+DEFAULT_TOLERANCE = 0.10        # Relativa, para tiempos, llamadas y memoria
+ACCURACY_TOLERANCE = 0.005      # Absoluta, para tasas de acierto y similitud
+MIN_STAGE_DELTA_MS = 1.0        # Las etapas de menos de un milisegundo son ruido de medición
+
+
+class CountingEngine:
+    """
+    Envoltorio del motor de Tesseract que registra cada llamada (método y
+    duración). Es seguro entre hilos: las estrategias de página completa
+    llaman al motor en paralelo.
+    """
+
+    def __init__(self, engine):
+        self._engine = engine
+        self._lock = threading.Lock()
+        self.calls: list[tuple[str, float]] = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._engine, name)
+        if name not in TESSERACT_METHODS:
+            return attr
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.calls.append((name, time.perf_counter() - start))
+        return timed
+
+    def calls_since(self, position: int) -> list[tuple[str, float]]:
+        with self._lock:
+            return self.calls[position:]
+
+    def call_count(self) -> int:
+        with self._lock:
+            return len(self.calls)
+
+
+# --- Métricas ---
+def peak_rss_bytes() -> Optional[int]:
+    """Memoria residente máxima del proceso (None si la plataforma no la informa)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux la informa en KB y macOS en bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    try:
+        import psutil  # Windows: opcional
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    except ImportError:
+        return None
+
+
+def summarize(values: list[float]) -> dict:
+    """p50, p95, media y máximo en milisegundos."""
+    if not values:
+        return {"count": 0, "p50": None, "p95": None, "mean": None, "max": None}
+    millis = np.asarray(values, dtype=np.float64) * 1000
+    return {
+        "count": len(values),
+        "p50": round(float(np.percentile(millis, 50)), 2),
+        "p95": round(float(np.percentile(millis, 95)), 2),
+        "mean": round(float(millis.mean()), 2),
+        "max": round(float(millis.max()), 2),
+    }
+
+
+def text_similarity(expected: str, actual: str) -> float:
+    """Similitud de caracteres (0-1), ignorando diferencias de espacios."""
+    return difflib.SequenceMatcher(None, " ".join(expected.split()), " ".join(actual.split()), autojunk=False).ratio()
+
+
+def sample_name(path: str) -> str:
+    """Clave del archivo en las salidas esperadas (nombre, con la página si es un documento)."""
+    return os.path.basename(path)
+
+
+# --- Ejecución ---
+def build_config(args: argparse.Namespace, stats_dir: str) -> OcrConfig:
+    return OcrConfig(
+        highlight_mode=args.mode,
+        fallback_policy=args.policy,
+        preprocess_profile=args.profile,
+        target_dpi=args.target_dpi,
+        language=args.lang,
+        model_variant=args.model,
+        strategy_stats_path=os.path.join(stats_dir, "strategy_stats.json"),
+        use_cache=False,
+    )
+
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    paths = collect_image_paths(args.inputs)
+    if not paths:
+        raise SystemExit(f"No se encontraron imágenes en: {', '.join(args.inputs)}")
+    expected = load_expected(args.expected)
+
+    with tempfile.TemporaryDirectory(prefix="ocr-bench-") as stats_dir:
+        config = build_config(args, stats_dir)
+        service = OcrService(config)
+        engine = CountingEngine(service.engine)
+        service.engine = engine
+
+        # Calentamiento: carga de modelos e importaciones perezosas fuera de la medición
+        for path in paths[:args.warmup]:
+            service.extract_result(path, args.color)
+
+        stage_samples: dict[str, list[float]] = {stage: [] for stage in STAGES}
+        call_samples: dict[str, list[float]] = {method: [] for method in TESSERACT_METHODS}
+        calls_before = engine.call_count()
+        samples = []
+        wall_start = time.perf_counter()
+        for repetition in range(args.repeat):
+            service.begin_batch()
+            for path in paths:
+                position = engine.call_count()
+                result = service.extract_result(path, args.color)
+                calls = engine.calls_since(position)
+
+                # Enmascarado = etapa OCR menos el tiempo dentro de Tesseract (OSD va en "orientation")
+                ocr_calls_seconds = sum(seconds for method, seconds in calls if method != OSD_METHOD)
+                timings = dict(result.timings)
+                if "ocr" in timings:
+                    timings["masking"] = max(0.0, timings["ocr"] - ocr_calls_seconds)
+                for stage in STAGES:
+                    if stage in timings:
+                        stage_samples[stage].append(timings[stage])
+                for method, seconds in calls:
+                    call_samples[method].append(seconds)
+
+                if repetition == args.repeat - 1:
+                    samples.append((path, result, calls))
+        wall_seconds = time.perf_counter() - wall_start
+        total_calls = engine.call_count() - calls_before
+
+        if service.strategy_stats is not None:
+            service.strategy_stats.flush()
+
+    processed = len(paths) * args.repeat
+    rss = peak_rss_bytes()
+    return {
+        "version": REPORT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "engine": engine.backend,
+            "tesseract": engine.version(),
+        },
+        "config": {**config.pipeline_fields(), "highlight_mode": service.highlight_mode},
+        "corpus": {"inputs": args.inputs, "images": len(paths), "repeat": args.repeat, "warmup": args.warmup},
+        "throughput": {
+            "wall_seconds": round(wall_seconds, 3),
+            "images_per_second": round(processed / wall_seconds, 3) if wall_seconds > 0 else None,
+        },
+        "stages": {stage: summarize(stage_samples[stage]) for stage in STAGES},
+        "tesseract": {
+            "calls": total_calls,
+            "calls_per_image": round(total_calls / processed, 3),
+            "by_method": {method: summarize(values) for method, values in call_samples.items() if values},
+        },
+        "peak_rss_mb": round(rss / (1024 * 1024), 1) if rss is not None else None,
+        "accuracy": score_accuracy(samples, expected),
+        "images": [
+            {
+                "name": sample_name(path),
+                "status": result.status,
+                "colors": result.colors,
+                "total_ms": round(result.timings.get("total", 0.0) * 1000, 2),
+                "tesseract_calls": len(calls),
+                "text": result.text,
+            }
+            for path, result, calls in samples
+        ],
+    }
+
+
+# --- Precisión ---
+def load_expected(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def score_accuracy(samples: list, expected: dict) -> dict:
+    """Estados, acierto de colores y similitud de texto frente a las salidas esperadas."""
+    statuses = {STATUS_OK: 0, STATUS_EMPTY: 0, STATUS_ERROR: 0}
+    colors_checked = colors_matched = 0
+    similarities = []
+    for path, result, _ in samples:
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+        entry = expected.get(sample_name(path))
+        if not entry:
+            continue
+        if entry.get("colors") is not None:
+            colors_checked += 1
+            colors_matched += sorted(result.colors or []) == sorted(entry["colors"])
+        if entry.get("text") is not None:
+            similarity = text_similarity(entry["text"], result.text) if result.status != STATUS_ERROR else 0.0
+            similarities.append(similarity)
+    return {
+        "status": statuses,
+        "colors": {
+            "checked": colors_checked,
+            "matched": colors_matched,
+            "rate": round(colors_matched / colors_checked, 4) if colors_checked else None,
+        },
+        "text": {
+            "checked": len(similarities),
+            "similarity": round(float(np.mean(similarities)), 4) if similarities else None,
+        },
+    }
+
+
+def update_expected(path: str, report: dict) -> int:
+    """
+    Agrega como esperados los colores y textos de esta corrida para las
+    imágenes sin entrada. Las entradas existentes (verificadas a mano) no se
+    tocan y las imágenes con error se omiten.
+    """
+    expected = load_expected(path)
+    updated = 0
+    for image in report["images"]:
+        if image["status"] == STATUS_ERROR or image["name"] in expected:
+            continue
+        expected[image["name"]] = {"colors": image["colors"], "text": image["text"]}
+        updated += 1
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(expected.items())), f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    return updated
+
+
+# --- Comparación con la línea base ---
+def _lookup(report: dict, dotted: str):
+    value = report
+    for key in dotted.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def comparable_metrics() -> list[tuple[str, bool, bool]]:
+    """(métrica, mayor es mejor, tolerancia absoluta) de cada valor que se compara."""
+    metrics = [("throughput.images_per_second", True, False), ("stages.total.p50", False, False)]
+    metrics += [(f"stages.{stage}.p95", False, False) for stage in STAGES]
+    metrics += [
+        ("tesseract.calls_per_image", False, False),
+        ("peak_rss_mb", False, False),
+        ("accuracy.colors.rate", True, True),
+        ("accuracy.text.similarity", True, True),
+    ]
+    return metrics
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """Cambios respecto de la línea base; cada uno indica si es una regresión."""
+    rows = []
+    for metric, higher_is_better, absolute in comparable_metrics():
+        current, previous = _lookup(report, metric), _lookup(baseline, metric)
+        if current is None or previous is None:
+            continue
+        if absolute:
+            change = current - previous
+            worse = -change if higher_is_better else change
+            regression = worse > ACCURACY_TOLERANCE
+        else:
+            change = (current - previous) / previous if previous else 0.0
+            worse = -change if higher_is_better else change
+            regression = worse > tolerance
+            if metric.startswith("stages.") and abs(current - previous) < MIN_STAGE_DELTA_MS:
+                regression = False
+        rows.append({"metric": metric, "baseline": previous, "current": current,
+                     "change": round(change, 4), "regression": regression})
+    return rows
+
+
+# --- Salida ---
+def format_report(report: dict) -> str:
+    lines = []
+    corpus, throughput = report["corpus"], report["throughput"]
+    lines.append(f"Corpus: {corpus['images']} imágenes x {corpus['repeat']} repeticiones "
+                 f"({report['environment']['engine']} {report['environment']['tesseract']})")
+    lines.append(f"Rendimiento: {throughput['images_per_second']} imágenes/s ({throughput['wall_seconds']} s)")
+    lines.append("")
+    lines.append(f"{'Etapa':<22}{'p50 ms':>10}{'p95 ms':>10}{'media ms':>10}")
+    for stage in STAGES:
+        stats = report["stages"][stage]
+        if stats["count"]:
+            lines.append(f"{STAGE_LABELS[stage]:<22}{stats['p50']:>10}{stats['p95']:>10}{stats['mean']:>10}")
+    lines.append("")
+    tesseract = report["tesseract"]
+    lines.append(f"Llamadas a Tesseract: {tesseract['calls']} ({tesseract['calls_per_image']} por imagen)")
+    for method, stats in tesseract["by_method"].items():
+        lines.append(f"  {method:<20}{stats['count']:>6} llamadas   p50 {stats['p50']} ms   p95 {stats['p95']} ms")
+    lines.append(f"Memoria máxima (RSS): {report['peak_rss_mb']} MB")
+    lines.append("")
+    accuracy = report["accuracy"]
+    lines.append("Estados: " + ", ".join(f"{status}={count}" for status, count in accuracy["status"].items()))
+    colors, text = accuracy["colors"], accuracy["text"]
+    lines.append(f"Colores: {colors['matched']}/{colors['checked']} correctos"
+                 + (f" ({colors['rate']:.0%})" if colors["rate"] is not None else ""))
+    if text["checked"]:
+        lines.append(f"Texto: similitud media {text['similarity']:.3f} en {text['checked']} imágenes")
+    else:
+        lines.append("Texto: sin textos esperados (transcribirlos a mano en el JSON de esperados)")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: list[dict]) -> str:
+    lines = [f"{'Métrica':<34}{'base':>12}{'actual':>12}{'cambio':>10}"]
+    for row in rows:
+        marker = "  ⚠️ regresión" if row["regression"] else ""
+        lines.append(f"{row['metric']:<34}{row['baseline']:>12}{row['current']:>12}{row['change']:>+10.1%}{marker}")
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Mide el rendimiento y la precisión del pipeline OCR sobre un corpus.")
+    parser.add_argument("inputs", nargs="*", default=[DEFAULT_CORPUS], help="Archivos, carpetas o patrones glob (por defecto, test_images).")
+    parser.add_argument("--repeat", type=int, default=1, help="Veces que se procesa el corpus completo.")
+    parser.add_argument("--warmup", type=int, default=1, help="Imágenes procesadas antes de medir (carga de modelos).")
+    parser.add_argument("-c", "--color", default="auto", help="Color de resaltador a buscar (por defecto, auto).")
+    parser.add_argument("--mode", choices=(HIGHLIGHT_MODE_REGIONS, HIGHLIGHT_MODE_COMPOSITE, HIGHLIGHT_MODE_PAGE),
+                        default=OcrConfig.highlight_mode)
+    parser.add_argument("--policy", choices=(FALLBACK_FIRST_ACCEPTABLE, FALLBACK_BEST_CONFIDENCE, FALLBACK_SEQUENTIAL),
+                        default=OcrConfig.fallback_policy)
+    parser.add_argument("--profile", choices=(PREPROCESS_FAST, PREPROCESS_BALANCED, PREPROCESS_QUALITY),
+                        default=OcrConfig.preprocess_profile)
+    parser.add_argument("--target-dpi", type=int, default=OcrConfig.target_dpi)
+    parser.add_argument("--lang", default=OcrConfig.language, help="Idioma de Tesseract (auto, spa, eng, spa+eng...).")
+    parser.add_argument("--model", choices=(MODEL_FAST, MODEL_BEST), default=OcrConfig.model_variant)
+    parser.add_argument("--expected", default=DEFAULT_EXPECTED, help="JSON con los colores y textos esperados.")
+    parser.add_argument("--update-expected", action="store_true", help="Agregar como esperados los resultados de las imágenes que aún no tienen entrada.")
+    parser.add_argument("-o", "--output", help="Guardar el informe JSON (p. ej. como nueva línea base).")
+    parser.add_argument("--baseline", help="Informe JSON con el que comparar.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Empeoramiento relativo tolerado antes de marcar una regresión (por defecto, 0.10).")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    report = run_benchmark(args)
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nInforme guardado en {args.output}")
+    if args.update_expected:
+        print(f"Salidas esperadas agregadas (revisarlas a mano): {update_expected(args.expected, report)} imágenes")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"] or baseline.get("corpus", {}).get("images") != report["corpus"]["images"]:
+            print("\n⚠️ La línea base se midió con otra configuración u otro corpus: la comparación es orientativa.")
+        rows = compare(report, baseline, args.tolerance)
+        print("\n" + format_comparison(rows))
+        if any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
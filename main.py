@@ -2,12 +2,20 @@
 """
 Punto de entrada principal de la aplicación OCR.
 
-Este script inicializa y ejecuta la interfaz de usuario.
+Sin argumentos inicia la interfaz de usuario; con argumentos (rutas de
+imágenes, carpetas o patrones) ejecuta la línea de comandos sin ventana.
 """
 
-from src.interface import gui
+import multiprocessing
+import sys
 
 # Comprobación estándar para asegurar que el script se ejecuta directamente
 if __name__ == "__main__":
+    # Necesario para que el pool de procesos del modo lote funcione en el .exe (PyInstaller)
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        from src.interface import cli
+        sys.exit(cli.main())
     # Inicia la interfaz gráfica de usuario
+    from src.interface import gui
     gui.main()
\ No newline at end of file
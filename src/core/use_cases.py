@@ -2,7 +2,7 @@
 Módulo que contiene los casos de uso o la lógica de negocio principal.
 Es agnóstico a la implementación concreta de la infraestructura o la interfaz.
 """
-from typing import Protocol
+from typing import AsyncIterable, AsyncIterator, Iterable, Protocol, Union
 
 # --- Definición de la Interfaz del Servicio de OCR ---
 class OcrServiceProtocol(Protocol):
@@ -10,6 +10,14 @@ class OcrServiceProtocol(Protocol):
     def extract_text_from_image(self, image_path: str, color: str) -> str:
         ...
 
+class AsyncOcrServiceProtocol(Protocol):
+    """Contrato asíncrono: el OCR no bloquea el bucle de eventos de quien lo llama."""
+    async def extract(self, image_path: str, color: str) -> str:
+        ...
+
+    def extract_many(self, image_paths: Union[Iterable[str], AsyncIterable[str]], color: str) -> AsyncIterator[tuple[int, str]]:
+        ...
+
 # --- Caso de Uso: Extracción de Texto ---
 def extraer_texto_de_imagen(ocr_service: OcrServiceProtocol, image_path: str, color: str) -> str:
     """
@@ -31,3 +39,29 @@ def extraer_texto_de_imagen(ocr_service: OcrServiceProtocol, image_path: str, co
 
     return texto_extraido
 
+
+
+# --- Caso de Uso: Extracción de Texto Asíncrona ---
+async def extraer_texto_de_imagen_async(ocr_service: AsyncOcrServiceProtocol, image_path: str, color: str) -> str:
+    """
+    Versión asíncrona de extraer_texto_de_imagen para servicios basados en asyncio.
+
+    Returns:
+        El texto extraído de la imagen.
+    """
+    if not image_path:
+        return "Error: No se proporcionó una ruta de imagen."
+
+    return await ocr_service.extract(image_path, color)
+
+
+async def extraer_textos_async(ocr_service: AsyncOcrServiceProtocol, image_paths: Union[Iterable[str], AsyncIterable[str]],
+                               color: str) -> AsyncIterator[tuple[int, str]]:
+    """
+    Extrae el texto de muchas imágenes, entregando cada una en cuanto termina.
+
+    Yields:
+        (índice de la imagen en image_paths, texto extraído), en orden de finalización.
+    """
+    async for index, texto_extraido in ocr_service.extract_many(image_paths, color):
+        yield index, texto_extraido
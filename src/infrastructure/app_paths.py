@@ -0,0 +1,27 @@
+"""
+Módulo de infraestructura con las rutas de datos de la aplicación
+en el perfil del usuario (caché, estadísticas, trabajos).
+"""
+import os
+import sys
+
+APP_DIR_NAME = "ExtractorOCR"
+
+
+def user_data_dir() -> str:
+    """
+    Carpeta de datos de la aplicación en el perfil del usuario.
+    Windows: %LOCALAPPDATA%\\ExtractorOCR. Otros: $XDG_CACHE_HOME/ExtractorOCR o ~/.cache/ExtractorOCR.
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    path = os.path.join(base, APP_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def user_data_path(*parts: str) -> str:
+    """Ruta de un archivo dentro de la carpeta de datos de la aplicación."""
+    return os.path.join(user_data_dir(), *parts)
@@ -0,0 +1,212 @@
+"""
+Módulo de infraestructura con la API asíncrona del OCR, para integrar el
+extractor en servicios basados en asyncio.
+
+El trabajo de CPU y de Tesseract corre en un pool de procesos propio; el
+bucle de eventos solo espera. La concurrencia está acotada: como mucho
+max_concurrency imágenes en proceso, y quien llama de más espera su turno
+(contrapresión) en lugar de encolar trabajo sin límite. Cada llamada puede
+tener un tiempo máximo: al agotarse se libera a quien espera, aunque el
+proceso termina la imagen en curso antes de aceptar otra.
+
+Lo que el pipeline aprende a lo largo de un lote (idioma automático,
+orientación dominante, estadísticas de estrategias) se reinicia en cada
+trabajo: las imágenes de una misma llamada a extract_many, o las que
+comparten batch_id, forman un lote; cualquier otra llamada es un lote propio.
+"""
+import asyncio
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional, Union
+
+from src.infrastructure.ocr_service import OcrService
+from src.infrastructure.ocr_config import OcrConfig
+from src.infrastructure.ocr_result import OcrResult, STATUS_ERROR
+from src.infrastructure.page_refs import split_page_ref
+
+TIMEOUT_MESSAGE = "Error: Se agotó el tiempo de espera ({seconds:g} s)."
+WORKER_ERROR_MESSAGE = "Error: Falló el proceso de OCR ({error})."
+
+# --- Estado de cada proceso trabajador ---
+_worker_service: Optional[OcrService] = None
+_worker_batch_id: Optional[str] = None
+
+
+def _init_worker(service_kwargs: dict):
+    global _worker_service
+    _worker_service = OcrService(**service_kwargs)
+
+
+def _extract_in_worker(batch_id: str, image_path: str, color: str) -> OcrResult:
+    global _worker_batch_id
+    if batch_id != _worker_batch_id:
+        # Primera imagen de un trabajo nuevo en este proceso
+        _worker_service.begin_batch()
+        _worker_batch_id = batch_id
+    return _worker_service.extract_result(image_path, color)
+
+
+def error_result(image_path: str, message: str) -> OcrResult:
+    """Resultado de error de una imagen que no llegó a procesarse (tiempo agotado, proceso caído)."""
+    source_path, page = split_page_ref(image_path)
+    return OcrResult(path=source_path, text=message, status=STATUS_ERROR, page=page)
+
+
+# --- Implementación Concreta ---
+class AsyncOcrService:
+    """
+    Servicio OCR asíncrono (cumple AsyncOcrServiceProtocol).
+
+        async with AsyncOcrService(max_concurrency=4, timeout=60) as ocr:
+            texto = await ocr.extract("escaneo.jpg")
+            async for index, texto in ocr.extract_many(rutas):
+                ...
+
+    Debe usarse desde un único bucle de eventos.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 service_kwargs: Optional[dict] = None):
+        # Un proceso por imagen simultánea (por defecto, uno por núcleo)
+        self.max_concurrency = max(1, max_concurrency or os.cpu_count() or 1)
+        # Tiempo máximo por imagen en segundos (None = sin límite)
+        self.timeout = timeout
+        self.service_kwargs = service_kwargs or {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Se crea en el bucle de eventos que hace la primera llamada
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """Libera los procesos trabajadores (descarta las imágenes que no empezaron)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # --- API ---
+    async def extract(self, image_path: str, color: str = "auto", timeout: Optional[float] = None,
+                      batch_id: Optional[str] = None) -> str:
+        """Texto extraído, como extract_text_from_image. Lanza asyncio.TimeoutError si se agota el tiempo."""
+        return (await self.extract_result(image_path, color, timeout, batch_id)).text
+
+    async def extract_result(self, image_path: str, color: str = "auto", timeout: Optional[float] = None,
+                             batch_id: Optional[str] = None) -> OcrResult:
+        """
+        Resultado completo de una imagen (o página / documento). timeout=None
+        usa el del servicio. Las llamadas con el mismo batch_id forman un lote;
+        sin batch_id la imagen es un lote en sí misma.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        return await asyncio.wait_for(self._run(image_path, color, batch_id or uuid.uuid4().hex), timeout)
+
+    async def extract_many(self, image_paths: Union[Iterable[str], AsyncIterable[str]], color: str = "auto",
+                           timeout: Optional[float] = None, detailed: bool = False) -> AsyncIterator[tuple[int, Union[str, OcrResult]]]:
+        """
+        Procesa muchas imágenes y entrega (índice, texto) en orden de finalización
+        (con detailed=True, (índice, OcrResult)). Las rutas se consumen de a poco:
+        nunca hay más de max_concurrency imágenes en vuelo, y si quien itera no
+        consume los resultados, no se envían más. Un tiempo agotado o un fallo
+        del proceso se entregan como resultado de error sin cortar la iteración.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        batch_id = uuid.uuid4().hex
+        if isinstance(image_paths, AsyncIterable):
+            source = aiter(image_paths)
+        else:
+            source = _as_async_iterator(image_paths)
+
+        pending: set[asyncio.Task] = set()
+        next_index = 0
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.max_concurrency:
+                    try:
+                        image_path = await anext(source)
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.ensure_future(self._run_indexed(batch_id, next_index, image_path, color, timeout)))
+                    next_index += 1
+
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index, result = task.result()
+                    yield index, (result if detailed else result.text)
+        finally:
+            # Iteración abandonada: se descartan las imágenes en vuelo
+            for task in pending:
+                task.cancel()
+
+    # --- Ejecución ---
+    async def _run_indexed(self, batch_id: str, index: int, image_path: str, color: str,
+                           timeout: Optional[float]) -> tuple[int, OcrResult]:
+        try:
+            return index, await asyncio.wait_for(self._run(image_path, color, batch_id), timeout)
+        except asyncio.TimeoutError:
+            return index, error_result(image_path, TIMEOUT_MESSAGE.format(seconds=timeout))
+        except BrokenProcessPool as e:
+            return index, error_result(image_path, WORKER_ERROR_MESSAGE.format(error=e))
+
+    async def _run(self, image_path: str, color: str, batch_id: str) -> OcrResult:
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        slots = self._slots
+
+        await slots.acquire()
+        try:
+            future = self._get_executor().submit(_extract_in_worker, batch_id, image_path, color)
+        except BaseException:
+            slots.release()
+            raise
+        # El turno se devuelve cuando el proceso queda libre, no cuando quien
+        # espera se rinde: así el límite refleja el trabajo real en curso.
+        future.add_done_callback(lambda _: _call_soon(loop, slots.release))
+
+        try:
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            # Tiempo agotado o llamada cancelada: si todavía no empezó, no se procesa
+            future.cancel()
+            raise
+        except BrokenProcessPool:
+            # Un proceso trabajador murió: el pool queda inservible
+            await self.aclose()
+            raise
+
+    def _worker_kwargs(self) -> dict:
+        # Los hilos de las estrategias de cada proceso, acotados a su parte de los núcleos
+        config = self.service_kwargs.get("config") or OcrConfig()
+        return {**self.service_kwargs, "config": config.for_workers(self.max_concurrency)}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_concurrency,
+                initializer=_init_worker,
+                initargs=(self._worker_kwargs(),),
+            )
+        return self._executor
+
+
+async def _as_async_iterator(items: Iterable[str]) -> AsyncIterator[str]:
+    for item in items:
+        yield item
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback):
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass  # El bucle ya se cerró
@@ -0,0 +1,228 @@
+"""
+Módulo de infraestructura que reparte el procesamiento por lotes
+entre varios procesos para aprovechar todos los núcleos de la CPU.
+Las imágenes casi idénticas del lote se procesan una sola vez.
+"""
+import dataclasses
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Optional, Union
+
+from src.core import use_cases
+from src.infrastructure.ocr_service import OcrService
+from src.infrastructure.ocr_config import OcrConfig
+from src.infrastructure.ocr_result import OcrResult
+from src.infrastructure.job_store import JobStore
+from src.infrastructure.near_duplicates import find_near_duplicates
+
+# --- Tipos de Datos ---
+# Texto extraído o, con detailed=True, el resultado completo
+BatchResult = Union[str, OcrResult]
+# on_progress(completadas, total, indice, ruta, resultado)
+ProgressCallback = Callable[[int, int, int, str, BatchResult], None]
+
+# --- Estado de cada proceso trabajador ---
+# Cada proceso crea su propio OcrService una única vez y lo reutiliza
+# para todas las imágenes que le toquen.
+_worker_service: Optional[OcrService] = None
+_worker_batch_id: Optional[str] = None
+
+
+def _init_worker(service_kwargs: dict):
+    global _worker_service
+    _worker_service = OcrService(**service_kwargs)
+
+
+def _extract(service: OcrService, image_path: str, color: str, detailed: bool) -> BatchResult:
+    if detailed:
+        return service.extract_result(image_path, color)
+    return use_cases.extraer_texto_de_imagen(service, image_path, color)
+
+
+def _process_image(batch_id: str, index: int, image_path: str, color: str, detailed: bool) -> tuple[int, BatchResult]:
+    global _worker_batch_id
+    if batch_id != _worker_batch_id:
+        # Primera imagen de un lote nuevo en este proceso
+        _worker_service.begin_batch()
+        _worker_batch_id = batch_id
+    return index, _extract(_worker_service, image_path, color, detailed)
+
+
+def _linked_result(result: BatchResult, image_path: str, representative_path: str) -> BatchResult:
+    """Resultado de un duplicado: el del representante, con su propia ruta y sin tiempos."""
+    if not isinstance(result, OcrResult):
+        return result
+    return dataclasses.replace(result, path=image_path, timings={}, duplicate_of=representative_path)
+
+
+# --- Implementación Concreta ---
+class BatchEngine:
+    """
+    Motor de procesamiento por lotes basado en un pool de procesos.
+    OpenCV y los subprocesos de Tesseract corren realmente en paralelo,
+    los resultados se devuelven en el orden de entrada y el lote
+    puede cancelarse a mitad de camino.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, service: Optional[OcrService] = None, service_kwargs: Optional[dict] = None):
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        # Servicio local para lotes de una sola imagen (evita arrancar procesos)
+        self.service = service
+        self.service_kwargs = service_kwargs or {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Solicita la cancelación del lote en curso."""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def shutdown(self):
+        """Libera los procesos trabajadores."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def run(self, image_paths: list[str], color: str = "auto", on_progress: Optional[ProgressCallback] = None,
+            detailed: bool = False) -> list[Optional[BatchResult]]:
+        """
+        Procesa todas las rutas y devuelve los resultados en el mismo orden.
+        Las posiciones que no llegaron a procesarse por cancelación quedan en None.
+        Con detailed=True cada resultado es un OcrResult en lugar del texto.
+
+        Las imágenes casi idénticas (config.near_duplicate_distance) reciben el
+        resultado de la más nítida de su grupo en cuanto este termina, con
+        duplicate_of apuntando a ella.
+        """
+        self._cancel_event.clear()
+        total = len(image_paths)
+        results: list[Optional[BatchResult]] = [None] * total
+
+        if total == 0:
+            return results
+
+        duplicates = find_near_duplicates(image_paths, self._config().near_duplicate_distance, self.max_workers)
+        if duplicates:
+            self._run_deduplicated(image_paths, duplicates, color, results, on_progress, detailed)
+        else:
+            self._run_unique(image_paths, color, results, on_progress, detailed)
+        return results
+
+    def run_job(self, store: JobStore, color: str = "auto", on_progress: Optional[ProgressCallback] = None) -> int:
+        """
+        Procesa solo las imágenes pendientes del trabajo y guarda cada resultado
+        en el almacén en cuanto termina. on_progress recibe los índices del
+        trabajo y cuenta también las imágenes ya hechas en ejecuciones anteriores.
+        Devuelve cuántas imágenes se procesaron en esta ejecución.
+        """
+        pending = store.pending()
+        total = store.total
+        already_done = total - len(pending)
+        indices = [index for index, _ in pending]
+
+        def record(completed, _pending_total, position, image_path, result):
+            store.record(indices[position], result)
+            if on_progress:
+                on_progress(already_done + completed, total, indices[position], image_path, result)
+
+        results = self.run([path for _, path in pending], color, on_progress=record, detailed=True)
+        return sum(result is not None for result in results)
+
+    def _config(self) -> OcrConfig:
+        config = self.service.config if self.service is not None else self.service_kwargs.get("config")
+        return config or OcrConfig()
+
+    def _worker_kwargs(self) -> dict:
+        # Sin esto, N procesos x 4 hilos de estrategias competirían por N núcleos
+        return {**self.service_kwargs, "config": self._config().for_workers(self.max_workers)}
+
+    def _run_unique(self, image_paths, color, results, on_progress, detailed):
+        if self.max_workers == 1 or (len(image_paths) == 1 and self.service is not None):
+            self._run_inline(image_paths, color, results, on_progress, detailed)
+        else:
+            self._run_parallel(image_paths, color, results, on_progress, detailed)
+
+    def _run_deduplicated(self, image_paths, duplicates, color, results, on_progress, detailed):
+        """Procesa solo los representantes y copia cada resultado a sus duplicados."""
+        total = len(image_paths)
+        unique = [index for index in range(total) if index not in duplicates]
+        copies: dict[int, list[int]] = {}
+        for duplicate, representative in duplicates.items():
+            copies.setdefault(representative, []).append(duplicate)
+        completed = 0
+
+        def report(index, result):
+            nonlocal completed
+            results[index] = result
+            completed += 1
+            if on_progress:
+                on_progress(completed, total, index, image_paths[index], result)
+
+        def on_unique(_completed, _total, position, image_path, result):
+            index = unique[position]
+            report(index, result)
+            for duplicate in sorted(copies.get(index, ())):
+                report(duplicate, _linked_result(result, image_paths[duplicate], image_path))
+
+        self._run_unique([image_paths[index] for index in unique], color, [None] * len(unique), on_unique, detailed)
+
+    def _run_inline(self, image_paths, color, results, on_progress, detailed):
+        if self.service is None:
+            self.service = OcrService(**self.service_kwargs)
+        self.service.begin_batch()
+        total = len(image_paths)
+        for index, image_path in enumerate(image_paths):
+            if self.cancelled:
+                break
+            results[index] = _extract(self.service, image_path, color, detailed)
+            if on_progress:
+                on_progress(index + 1, total, index, image_path, results[index])
+
+    def _run_parallel(self, image_paths, color, results, on_progress, detailed):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self._worker_kwargs(),),
+            )
+
+        total = len(image_paths)
+        batch_id = uuid.uuid4().hex
+        # Ventana de envíos acotada: la cancelación es inmediata y no se
+        # encolan cientos de tareas que luego habría que descartar.
+        max_in_flight = self.max_workers * 2
+        pending = set()
+        next_index = 0
+        completed = 0
+
+        try:
+            while completed < total:
+                while next_index < total and len(pending) < max_in_flight and not self.cancelled:
+                    pending.add(self._executor.submit(_process_image, batch_id, next_index, image_paths[next_index], color, detailed))
+                    next_index += 1
+
+                if self.cancelled or not pending:
+                    break
+
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, result = future.result()
+                    results[index] = result
+                    completed += 1
+                    if on_progress:
+                        on_progress(completed, total, index, image_paths[index], result)
+        except Exception:
+            # Un proceso trabajador murió: el pool queda inservible
+            self.shutdown()
+            raise
+
+        if self.cancelled:
+            for future in pending:
+                future.cancel()
+            # Los procesos terminan la imagen en curso y se descartan
+            self.shutdown()
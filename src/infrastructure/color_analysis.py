@@ -0,0 +1,179 @@
+"""
+Módulo de infraestructura que clasifica los píxeles de una imagen por color
+de resaltador en una sola pasada, a partir de los rangos HSV compilados
+en tablas de consulta (LUT).
+
+El análisis se hace sobre una versión reducida de la imagen (proxy); la
+resolución completa solo se usa en los recortes que finalmente van al OCR.
+"""
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Cada color ocupa un bit de la máscara intermedia (uint8)
+MAX_COLORS = 8
+
+# (x, y, ancho, alto)
+Box = Tuple[int, int, int, int]
+
+# Rango HSV de cada color de resaltador
+# HSV: Hue (0-180), Saturation (0-255), Value (0-255)
+# Rangos calibrados con imágenes reales de documentos, EXCLUSIVOS para evitar solapamientos.
+# Saturation Min subido a 50 para ignorar sombras grises y blancos sucios.
+HIGHLIGHT_COLOR_RANGES: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+    # Naranja: 0-18 (Antes 0-25)
+    "naranja": (np.array([0, 50, 80]), np.array([18, 255, 255])),
+    # Amarillo: 19-35 (Antes 22-45, evitando verde)
+    "amarillo": (np.array([19, 50, 120]), np.array([35, 255, 255])),
+    # Verde: 36-90 (Antes 35-85, rango principal)
+    "verde": (np.array([36, 50, 120]), np.array([90, 255, 255])),
+    # Celeste: 91-110
+    "celeste": (np.array([91, 50, 120]), np.array([110, 255, 255])),
+    # Azul: 111-125
+    "azul": (np.array([111, 50, 120]), np.array([125, 255, 255])),
+    # Violeta: 126-160
+    "violeta": (np.array([126, 50, 120]), np.array([160, 255, 255])),
+    # Rosa: 161-180
+    "rosa": (np.array([161, 50, 120]), np.array([180, 255, 255])),
+}
+
+
+def make_analysis_proxy(image: np.ndarray, max_pixels: int) -> np.ndarray:
+    """
+    Reduce la imagen a lo sumo a `max_pixels` (manteniendo la proporción) para
+    los pasos que no necesitan resolución completa. Con 0 o imágenes pequeñas
+    devuelve la misma imagen.
+    """
+    height, width = image.shape[:2]
+    if max_pixels <= 0 or height * width <= max_pixels:
+        return image
+    # Factor entero: INTER_AREA usa su camino rápido (promedio de bloques f x f)
+    factor = int(np.ceil((height * width / max_pixels) ** 0.5))
+    return cv2.resize(image, None, fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA)
+
+
+class ColorClassifier:
+    """
+    Rangos HSV compilados una sola vez en tablas de consulta.
+    Cada canal (H, S, V) se traduce a un conjunto de bits con los colores
+    cuyo rango contiene ese valor; la intersección de los tres conjuntos
+    da el color del píxel (etiqueta 0 = ningún color).
+    """
+
+    def __init__(self, color_ranges: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        if len(color_ranges) > MAX_COLORS:
+            raise ValueError(f"Se admiten como máximo {MAX_COLORS} colores de resaltador.")
+
+        self.color_names = list(color_ranges)
+        self._hue_lut = np.zeros(256, np.uint8)
+        self._sat_lut = np.zeros(256, np.uint8)
+        self._val_lut = np.zeros(256, np.uint8)
+
+        for bit, (lower, upper) in enumerate(color_ranges.values()):
+            flag = np.uint8(1 << bit)
+            for lut, channel in ((self._hue_lut, 0), (self._sat_lut, 1), (self._val_lut, 2)):
+                lut[int(lower[channel]):int(upper[channel]) + 1] |= flag
+
+        # Conjunto de bits -> etiqueta (bit menos significativo = primer color
+        # declarado). Los rangos son exclusivos, así que no hay empates reales.
+        self._label_lut = np.zeros(256, np.uint8)
+        for bits in range(1, 256):
+            self._label_lut[bits] = (bits & -bits).bit_length()
+
+    def label_of(self, color_name: str) -> int:
+        return self.color_names.index(color_name) + 1
+
+    def classify(self, hsv_image: np.ndarray) -> np.ndarray:
+        """Devuelve el mapa de etiquetas (uint8) de una imagen HSV."""
+        hue, sat, val = cv2.split(hsv_image)
+        bits = cv2.LUT(hue, self._hue_lut)
+        cv2.bitwise_and(bits, cv2.LUT(sat, self._sat_lut), dst=bits)
+        cv2.bitwise_and(bits, cv2.LUT(val, self._val_lut), dst=bits)
+        return cv2.LUT(bits, self._label_lut)
+
+
+class ImageAnalysis:
+    """
+    Análisis de color de una imagen, compartido entre la detección de colores
+    y la extracción de texto para no repetir conversiones ni máscaras.
+    El mapa de etiquetas y los conteos corresponden al proxy; `scale` es la
+    relación proxy / original para trasladar coordenadas.
+    """
+
+    def __init__(self, image: np.ndarray, classifier: ColorClassifier, proxy: Optional[np.ndarray] = None):
+        self.image = image
+        self.proxy = image if proxy is None else proxy
+        self.scale = self.proxy.shape[1] / image.shape[1]
+        self.classifier = classifier
+        self.labels = classifier.classify(cv2.cvtColor(self.proxy, cv2.COLOR_BGR2HSV))
+
+        # Conteo de píxeles por etiqueta en una sola pasada (histograma del mapa)
+        num_labels = len(classifier.color_names) + 1
+        hist = cv2.calcHist([self.labels], [0], None, [num_labels], [0, num_labels])
+        self.counts = hist.ravel().astype(np.int64)
+
+        self._thresh: Optional[np.ndarray] = None
+
+    @property
+    def total_pixels(self) -> int:
+        return self.labels.shape[0] * self.labels.shape[1]
+
+    def pixel_count(self, color_name: str) -> int:
+        return int(self.counts[self.classifier.label_of(color_name)])
+
+    @property
+    def is_downscaled(self) -> bool:
+        return self.proxy is not self.image
+
+    def mask(self, color_name: str) -> np.ndarray:
+        """Máscara binaria (0/255) de un color en el proxy, equivalente a cv2.inRange."""
+        return cv2.compare(self.labels, self.classifier.label_of(color_name), cv2.CMP_EQ)
+
+    def scale_length(self, length: int) -> int:
+        """Traslada una longitud en píxeles del original al proxy."""
+        return max(1, int(round(length * self.scale)))
+
+    def to_full_box(self, box: Box) -> Box:
+        """Traslada una caja del proxy a coordenadas de la imagen original."""
+        if not self.is_downscaled:
+            return box
+        height, width = self.image.shape[:2]
+        x, y, w, h = box
+        x0, y0 = int(x / self.scale), int(y / self.scale)
+        x1, y1 = min(width, int(np.ceil((x + w) / self.scale))), min(height, int(np.ceil((y + h) / self.scale)))
+        return x0, y0, x1 - x0, y1 - y0
+
+    def to_full_mask(self, proxy_mask: np.ndarray) -> np.ndarray:
+        """Amplía una máscara del proxy al tamaño original."""
+        if not self.is_downscaled:
+            return proxy_mask
+        height, width = self.image.shape[:2]
+        return cv2.resize(proxy_mask, (width, height), interpolation=cv2.INTER_NEAREST)
+
+    def crop_mask(self, color_name: str, box: Box) -> np.ndarray:
+        """Máscara de un color a resolución completa, solo dentro de la caja."""
+        x, y, w, h = box
+        crop = self.image[y:y + h, x:x + w]
+        labels = self.classifier.classify(cv2.cvtColor(crop, cv2.COLOR_BGR2HSV))
+        return cv2.compare(labels, self.classifier.label_of(color_name), cv2.CMP_EQ)
+
+    def crop_thresh(self, box: Box) -> np.ndarray:
+        """Binarizado a resolución completa, solo dentro de la caja."""
+        x, y, w, h = box
+        if self._thresh is not None:
+            return self._thresh[y:y + h, x:x + w]
+        return self._binarize(self.image[y:y + h, x:x + w])
+
+    @property
+    def thresh(self) -> np.ndarray:
+        """Imagen binarizada (texto en blanco) a resolución completa."""
+        if self._thresh is None:
+            self._thresh = self._binarize(self.image)
+        return self._thresh
+
+    @staticmethod
+    def _binarize(image: np.ndarray) -> np.ndarray:
+        gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        _, binary = cv2.threshold(gray_image, 128, 255, cv2.THRESH_BINARY_INV)
+        return binary
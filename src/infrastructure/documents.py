@@ -0,0 +1,136 @@
+"""
+Módulo de infraestructura para documentos de varias páginas (TIFF y PDF).
+
+Cada página se procesa como una imagen independiente, identificada por una
+referencia "documento.pdf#page=3" (ver page_refs). Las páginas se decodifican
+de a una y solo cuando se necesitan: contar las páginas no decodifica
+ninguna, de modo que un documento de cientos de páginas no ocupa más memoria
+que una página.
+
+- TIFF: se lee con Pillow (seek a la página pedida).
+- PDF: se rasteriza con PyMuPDF a la resolución del OCR. Es opcional: sin
+  él los PDF se informan como error y el resto sigue funcionando.
+"""
+from typing import Iterable
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from src.infrastructure.page_refs import PDF_EXTENSIONS, is_document, page_ref, split_page_ref
+from src.infrastructure.image_ingest import DecodedImage, ImageHeader, EXIF_ORIENTATION_TAG, target_scale, MAX_USEFUL_SCALE
+
+try:
+    import pymupdf
+except ImportError:  # Dependencia opcional: sin ella no se leen PDF
+    pymupdf = None
+
+# Resolución de rasterizado de los PDF cuando no se indica target_dpi
+DEFAULT_PDF_DPI = 300
+# Puntos por pulgada del sistema de coordenadas de PDF
+PDF_POINTS_PER_INCH = 72
+
+MISSING_PDF_SUPPORT_MESSAGE = "Para leer PDF se necesita PyMuPDF (pip install pymupdf)."
+
+
+def pdf_supported() -> bool:
+    """True si está instalado el lector de PDF (PyMuPDF)."""
+    return pymupdf is not None
+
+
+def page_count(path: str) -> int:
+    """Número de páginas sin decodificar ninguna. Lanza la excepción del lector si no se puede abrir."""
+    if path.lower().endswith(PDF_EXTENSIONS):
+        if pymupdf is None:
+            raise RuntimeError(MISSING_PDF_SUPPORT_MESSAGE)
+        with pymupdf.open(path) as document:
+            return document.page_count
+    with Image.open(path) as document:
+        return getattr(document, "n_frames", 1)
+
+
+def expand_pages(paths: Iterable[str]) -> list[str]:
+    """
+    Reemplaza cada documento de varias páginas por la referencia de cada una,
+    en orden. Los PDF se expanden siempre (OpenCV no los decodifica); los TIFF
+    de una sola página, las imágenes, las referencias ya expandidas y los
+    documentos que no se pueden abrir se dejan tal cual (el error se informa
+    al procesarlos).
+    """
+    expanded = []
+    for path in paths:
+        if not is_document(path) or split_page_ref(path)[1] is not None:
+            expanded.append(path)
+            continue
+        try:
+            count = page_count(path)
+        except Exception:
+            count = 0
+        if count > 1 or (count == 1 and path.lower().endswith(PDF_EXTENSIONS)):
+            expanded.extend(page_ref(path, page) for page in range(1, count + 1))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def render_page(path: str, page: int, target_dpi: int = 0) -> DecodedImage:
+    """
+    Decodifica una sola página (desde 1) a la escala necesaria para target_dpi
+    (0 = resolución nativa; en PDF, DEFAULT_PDF_DPI). Imagen BGR como cv2.imdecode.
+    """
+    if path.lower().endswith(PDF_EXTENSIONS):
+        return _render_pdf_page(path, page, target_dpi or DEFAULT_PDF_DPI)
+    return _render_tiff_page(path, page, target_dpi)
+
+
+def preview_page(path: str, page: int, max_size: tuple[int, int]) -> Image.Image:
+    """Vista previa RGB de una página, rasterizada directamente al tamaño de pantalla."""
+    if path.lower().endswith(PDF_EXTENSIONS):
+        if pymupdf is None:
+            raise RuntimeError(MISSING_PDF_SUPPORT_MESSAGE)
+        with pymupdf.open(path) as document:
+            pdf_page = document.load_page(page - 1)
+            zoom = min(max_size[0] / pdf_page.rect.width, max_size[1] / pdf_page.rect.height)
+            pixmap = pdf_page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+            return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    with Image.open(path) as document:
+        document.seek(page - 1)
+        preview = ImageOps.exif_transpose(document).convert("RGB")
+    preview.thumbnail(max_size, Image.Resampling.BILINEAR)
+    return preview
+
+
+# --- Lectores ---
+def _render_pdf_page(path: str, page: int, dpi: int) -> DecodedImage:
+    if pymupdf is None:
+        raise RuntimeError(MISSING_PDF_SUPPORT_MESSAGE)
+    with pymupdf.open(path) as document:
+        pixmap = document.load_page(page - 1).get_pixmap(dpi=dpi, alpha=False, colorspace=pymupdf.csRGB)
+    # Las filas pueden traer relleno: se recortan al ancho útil
+    rgb = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.stride)
+    rgb = rgb[:, :pixmap.width * 3].reshape(pixmap.height, pixmap.width, 3)
+    # Escala respecto de las coordenadas de la página (puntos PDF)
+    return DecodedImage(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), None, dpi / PDF_POINTS_PER_INCH)
+
+
+def _render_tiff_page(path: str, page: int, target_dpi: int) -> DecodedImage:
+    with Image.open(path) as document:
+        document.seek(page - 1)
+        dpi = document.info.get("dpi")
+        exif_orientation = document.getexif().get(EXIF_ORIENTATION_TAG)
+        header = ImageHeader(
+            format=document.format,
+            width=document.width,
+            height=document.height,
+            dpi=float(dpi[0]) if dpi and dpi[0] else None,
+            exif_orientation=exif_orientation,
+        )
+        # La orientación TIFF se aplica como hace IMREAD_COLOR con las imágenes sueltas
+        frame = ImageOps.exif_transpose(document).convert("RGB")
+    image = cv2.cvtColor(np.asarray(frame), cv2.COLOR_RGB2BGR)
+    del frame
+
+    scale = target_scale(header, target_dpi)
+    if scale <= MAX_USEFUL_SCALE:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return DecodedImage(image, exif_orientation, max(image.shape[:2]) / max(header.width, header.height))
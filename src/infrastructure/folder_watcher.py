@@ -0,0 +1,269 @@
+"""
+Módulo de infraestructura que vigila una carpeta donde los escáneres dejan
+archivos y entrega solo los nuevos o modificados, una vez que terminaron de
+escribirse.
+
+- Eventos del sistema de archivos con watchdog (opcional). Sin él, o además
+  de él, se sondea: solo se listan las carpetas cuya fecha de modificación
+  cambió, de modo que el costo depende de lo que llega y no del tamaño de la
+  carpeta. Un barrido completo periódico recupera eventos perdidos (las
+  carpetas compartidas en red no siempre los emiten) y sobrescrituras.
+- Un archivo está listo cuando no está vacío, su tamaño y fecha no cambian
+  durante settle_seconds y se puede abrir para leer (en Windows el escáner lo
+  mantiene bloqueado mientras escribe).
+- Lo ya procesado (ruta, tamaño y fecha) se guarda en un archivo SQLite: al
+  reiniciar solo se procesa lo que llegó mientras tanto.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from src.infrastructure.app_paths import user_data_path
+from src.infrastructure.result_cache import fingerprint
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Dependencia opcional: sin ella se sondea la carpeta
+    FileSystemEventHandler = object
+    Observer = None
+
+WATCH_DIR_NAME = "watch"
+# Segundos que un archivo debe quedar sin cambios para considerarlo completo
+DEFAULT_SETTLE_SECONDS = 2.0
+# Intervalo de sondeo de las carpetas
+DEFAULT_POLL_INTERVAL = 1.0
+# Barrido completo (sin mirar la fecha de las carpetas), sin y con eventos
+FULL_RESCAN_SECONDS = 60.0
+FULL_RESCAN_SECONDS_WITH_EVENTS = 300.0
+# Temporales de editores y sistemas (~$archivo, .archivo)
+IGNORED_PREFIXES = (".", "~")
+
+
+class FileStamp(NamedTuple):
+    size: int
+    mtime_ns: int
+
+
+class _Candidate:
+    __slots__ = ("stamp", "since")
+
+    def __init__(self, stamp: FileStamp, since: float):
+        self.stamp = stamp
+        self.since = since
+
+
+def watchdog_available() -> bool:
+    """True si está instalado watchdog (eventos del sistema de archivos)."""
+    return Observer is not None
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Anota las rutas que cambiaron; el hilo de watchdog no hace nada más."""
+
+    def __init__(self, watcher: "FolderWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event):
+        self._touch(event)
+
+    def on_modified(self, event):
+        self._touch(event)
+
+    def on_moved(self, event):
+        self._touch(event, event.dest_path)
+
+    def _touch(self, event, path: Optional[str] = None):
+        if not event.is_directory:
+            self.watcher.notify(path or event.src_path)
+
+
+class FolderWatcher:
+    """
+    Vigila root y devuelve con poll() los archivos listos para procesar.
+    Quien los procesa confirma cada uno con mark_done(); hasta entonces no se
+    vuelven a entregar (salvo que cambien de nuevo).
+    """
+
+    def __init__(self, root: str, extensions: tuple[str, ...], recursive: bool = True,
+                 settle_seconds: float = DEFAULT_SETTLE_SECONDS, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 use_events: bool = True, include_existing: bool = False, state_path: Optional[str] = None,
+                 wake: Optional[threading.Event] = None):
+        self.root = os.path.abspath(root)
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.recursive = recursive
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        # En la primera ejecución, procesar también lo que ya había en la carpeta
+        self.include_existing = include_existing
+
+        if state_path is None:
+            os.makedirs(user_data_path(WATCH_DIR_NAME), exist_ok=True)
+            state_path = user_data_path(WATCH_DIR_NAME, f"{fingerprint(os.path.normcase(self.root))}.sqlite")
+        # Sin archivo de estado es la primera vez que se vigila esta carpeta
+        self._first_run = not os.path.exists(state_path)
+        self._conn = sqlite3.connect(state_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS processed (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL)")
+        self._processed: dict[str, FileStamp] = {
+            path: FileStamp(size, mtime_ns)
+            for path, size, mtime_ns in self._conn.execute("SELECT path, size, mtime_ns FROM processed")
+        }
+
+        self._candidates: dict[str, _Candidate] = {}
+        # Entregados y todavía sin confirmar, con la marca que tenían al entregarse
+        self._in_progress: dict[str, FileStamp] = {}
+        # Carpeta -> (fecha de modificación, subcarpetas) del último listado
+        self._directories: dict[str, tuple[int, list[str]]] = {}
+        self._last_full_scan = 0.0
+
+        self._use_events = use_events and watchdog_available()
+        self._observer = None
+        self._events: set[str] = set()
+        self._events_lock = threading.Lock()
+        # Varias carpetas pueden compartir el evento para esperar en un solo lugar
+        self._wake = wake or threading.Event()
+
+    # --- Ciclo de vida ---
+    def start(self):
+        """Barrido inicial y, si hay watchdog, suscripción a los eventos."""
+        if self._use_events:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.root, recursive=self.recursive)
+            self._observer.start()
+        if self._first_run and not self.include_existing:
+            self._baseline()
+        self._scan(self.root, full=True)
+        self._last_full_scan = time.monotonic()
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self._wake.set()
+        self._conn.close()
+
+    @property
+    def uses_events(self) -> bool:
+        return self._use_events
+
+    # --- API ---
+    def notify(self, path: str):
+        """Marca una ruta como posiblemente cambiada (lo llama el manejador de eventos)."""
+        with self._events_lock:
+            self._events.add(path)
+        self._wake.set()
+
+    def wait(self):
+        """Espera hasta el próximo sondeo (o antes, si llega un evento)."""
+        self._wake.wait(self.poll_interval)
+        self._wake.clear()
+
+    def poll(self) -> list[str]:
+        """Archivos nuevos o modificados que ya terminaron de escribirse, en orden."""
+        with self._events_lock:
+            events, self._events = self._events, set()
+        for path in events:
+            self._consider(os.path.abspath(path))
+
+        now = time.monotonic()
+        full_rescan_seconds = FULL_RESCAN_SECONDS_WITH_EVENTS if self._use_events else FULL_RESCAN_SECONDS
+        if now - self._last_full_scan >= full_rescan_seconds:
+            self._scan(self.root, full=True)
+            self._last_full_scan = now
+        elif not self._use_events:
+            self._scan(self.root, full=False)
+
+        ready = []
+        for path, candidate in list(self._candidates.items()):
+            stamp = _stat(path)
+            if stamp is None:
+                del self._candidates[path]
+            elif stamp != candidate.stamp:
+                # Todavía se está escribiendo
+                candidate.stamp, candidate.since = stamp, now
+            elif stamp.size and now - candidate.since >= self.settle_seconds and _readable(path):
+                del self._candidates[path]
+                self._in_progress[path] = stamp
+                ready.append(path)
+        return sorted(ready)
+
+    def mark_done(self, path: str):
+        """Confirma que path se procesó: no se vuelve a entregar mientras no cambie."""
+        stamp = self._in_progress.pop(path, None)
+        if stamp is None:
+            return
+        self._processed[path] = stamp
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO processed (path, size, mtime_ns) VALUES (?, ?, ?)", (path, *stamp))
+
+    # --- Detección ---
+    def _consider(self, path: str, stamp: Optional[FileStamp] = None):
+        name = os.path.basename(path)
+        if name.startswith(IGNORED_PREFIXES) or not name.lower().endswith(self.extensions):
+            return
+        stamp = stamp or _stat(path)
+        if stamp is None or self._processed.get(path) == stamp or self._in_progress.get(path) == stamp:
+            return
+        if path not in self._candidates:
+            self._candidates[path] = _Candidate(stamp, time.monotonic())
+
+    def _scan(self, directory: str, full: bool):
+        """Lista directory si cambió (o si full) y recorre sus subcarpetas conocidas."""
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            self._directories.pop(directory, None)
+            return
+        known = self._directories.get(directory)
+        if full or known is None or known[0] != mtime_ns:
+            subdirectories = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.recursive:
+                                subdirectories.append(entry.path)
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            self._consider(entry.path, FileStamp(stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                return
+            known = self._directories[directory] = (mtime_ns, subdirectories)
+        for subdirectory in known[1]:
+            self._scan(subdirectory, full)
+
+    def _baseline(self):
+        """Primera ejecución: lo que ya está en la carpeta se da por procesado."""
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                stamp = _stat(path)
+                if stamp is not None and name.lower().endswith(self.extensions):
+                    self._processed[path] = stamp
+            if not self.recursive:
+                break
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO processed (path, size, mtime_ns) VALUES (?, ?, ?)",
+                                   ((path, *stamp) for path, stamp in self._processed.items()))
+
+
+def _stat(path: str) -> Optional[FileStamp]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return FileStamp(stat.st_size, stat.st_mtime_ns)
+
+
+def _readable(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            f.read(1)
+        return True
+    except OSError:
+        return False
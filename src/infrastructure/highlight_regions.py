@@ -0,0 +1,143 @@
+"""
+Módulo de infraestructura que localiza las zonas resaltadas de una máscara
+(componentes conexos) y las agrupa en líneas y bloques para que el OCR
+trabaje solo sobre esos recortes y no sobre la página completa.
+También apila recortes en un lienzo compuesto para reconocerlos de una vez.
+"""
+from bisect import bisect_right
+from typing import Hashable
+
+import cv2
+import numpy as np
+
+# (x, y, ancho, alto)
+Box = tuple[int, int, int, int]
+# (clave del recorte, y inicial en el lienzo, alto)
+Placement = tuple[Hashable, int, int]
+
+# Componentes con menos área que esta fracción de la imagen se consideran ruido
+MIN_REGION_AREA_PERCENT = 0.0002
+# Margen alrededor de cada bloque para que Tesseract no corte los bordes de las letras
+REGION_PADDING = 10
+# Separación vertical (fondo negro) entre recortes del lienzo compuesto
+COMPOSITE_GAP = 30
+# Alto máximo de cada lienzo compuesto (Tesseract rechaza imágenes de más de 32767 px)
+MAX_COMPOSITE_HEIGHT = 30000
+
+
+def find_highlight_blocks(dilated_mask: np.ndarray) -> list[Box]:
+    """
+    Devuelve los bloques resaltados de la máscara ordenados de arriba hacia abajo.
+    Primero une los fragmentos de una misma línea y luego las líneas contiguas.
+    """
+    height, width = dilated_mask.shape[:2]
+    num_labels, _, stats, _ = cv2.connectedComponentsWithStats(dilated_mask, connectivity=8)
+
+    min_area = max(1, int(height * width * MIN_REGION_AREA_PERCENT))
+    boxes = [
+        (int(x), int(y), int(w), int(h))
+        for x, y, w, h, area in stats[1:num_labels]  # La etiqueta 0 es el fondo
+        if area >= min_area
+    ]
+    if not boxes:
+        return []
+
+    line_height = int(np.median([h for _, _, _, h in boxes]))
+
+    # Líneas: fragmentos solapados en vertical y separados por poco espacio horizontal
+    lines = _merge_boxes(boxes, gap_x=line_height * 2, gap_y=0, min_overlap_y=0.5)
+    # Bloques: líneas consecutivas con poco espacio vertical entre ellas
+    blocks = _merge_boxes(lines, gap_x=line_height * 2, gap_y=line_height // 2, min_overlap_y=0.0)
+
+    blocks = [_pad_box(box, REGION_PADDING, width, height) for box in blocks]
+    return sorted(blocks, key=lambda box: (box[1], box[0]))
+
+
+def _merge_boxes(boxes: list[Box], gap_x: int, gap_y: int, min_overlap_y: float) -> list[Box]:
+    """Une cajas cercanas de forma iterativa hasta que no quede ningún par unible."""
+    merged = list(boxes)
+    changed = True
+    while changed:
+        changed = False
+        result: list[Box] = []
+        for box in sorted(merged, key=lambda b: (b[1], b[0])):
+            for i, other in enumerate(result):
+                if _are_close(box, other, gap_x, gap_y, min_overlap_y):
+                    result[i] = _union(box, other)
+                    changed = True
+                    break
+            else:
+                result.append(box)
+        merged = result
+    return merged
+
+
+def _are_close(a: Box, b: Box, gap_x: int, gap_y: int, min_overlap_y: float) -> bool:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    horizontal_gap = max(bx - (ax + aw), ax - (bx + bw))
+    vertical_gap = max(by - (ay + ah), ay - (by + bh))
+    if horizontal_gap > gap_x or vertical_gap > gap_y:
+        return False
+    if min_overlap_y > 0:
+        overlap = min(ay + ah, by + bh) - max(ay, by)
+        return overlap >= min_overlap_y * min(ah, bh)
+    return True
+
+
+def _union(a: Box, b: Box) -> Box:
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _pad_box(box: Box, padding: int, width: int, height: int) -> Box:
+    x, y, w, h = box
+    x0, y0 = max(0, x - padding), max(0, y - padding)
+    x1, y1 = min(width, x + w + padding), min(height, y + h + padding)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def pack_vertically(crops: list[tuple[Hashable, np.ndarray]]) -> list[tuple[np.ndarray, list[Placement]]]:
+    """
+    Apila los recortes uno debajo de otro en lienzos negros, para reconocerlos
+    con una sola llamada a Tesseract. Devuelve cada lienzo con la posición
+    vertical de cada recorte.
+    """
+    canvases = []
+    group: list[tuple[Hashable, np.ndarray]] = []
+    group_height = 0
+    for key, crop in crops:
+        needed = crop.shape[0] + (COMPOSITE_GAP if group else 0)
+        if group and group_height + needed > MAX_COMPOSITE_HEIGHT:
+            canvases.append(_build_canvas(group))
+            group, group_height = [], 0
+            needed = crop.shape[0]
+        group.append((key, crop))
+        group_height += needed
+    if group:
+        canvases.append(_build_canvas(group))
+    return canvases
+
+
+def _build_canvas(group: list[tuple[Hashable, np.ndarray]]) -> tuple[np.ndarray, list[Placement]]:
+    width = max(crop.shape[1] for _, crop in group)
+    height = sum(crop.shape[0] for _, crop in group) + COMPOSITE_GAP * (len(group) - 1)
+    canvas = np.zeros((height, width), np.uint8)
+    placements = []
+    top = 0
+    for key, crop in group:
+        h, w = crop.shape[:2]
+        canvas[top:top + h, :w] = crop
+        placements.append((key, top, h))
+        top += h + COMPOSITE_GAP
+    return canvas, placements
+
+
+def locate_placement(placements: list[Placement], center_y: float):
+    """Devuelve la clave del recorte que contiene la coordenada vertical, o None."""
+    index = bisect_right([top for _, top, _ in placements], center_y) - 1
+    if index < 0:
+        return None
+    key, top, height = placements[index]
+    return key if center_y < top + height else None
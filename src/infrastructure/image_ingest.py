@@ -0,0 +1,123 @@
+"""
+Módulo de infraestructura que lee y decodifica las imágenes a la resolución
+que el OCR realmente necesita (~300 DPI), en lugar de siempre a la nativa.
+
+- Los archivos grandes se mapean en memoria en vez de copiarse a un buffer.
+- La resolución efectiva se estima con los DPI del archivo (escáneres) o,
+  en fotos, suponiendo que la página ocupa el encuadre (A4).
+- Los JPEG se decodifican directamente a 1/2, 1/4 u 1/8 (IMREAD_REDUCED_*);
+  el resto se reduce con INTER_AREA tras decodificar.
+"""
+import io
+import os
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Etiqueta EXIF de orientación y bytes iniciales donde buscarla (APP1 ocupa hasta 64KB)
+EXIF_ORIENTATION_TAG = 0x0112
+# Valor "normal" (sin giro) de la etiqueta
+EXIF_ORIENTATION_NORMAL = 1
+HEADER_BYTES = 128 * 1024
+
+# A partir de este tamaño el archivo se mapea en memoria en lugar de copiarse
+MMAP_THRESHOLD_BYTES = 32 * 1024 * 1024
+# Lado largo de una página A4 en pulgadas (supuesto para fotos sin DPI fiables)
+PAGE_LONG_SIDE_INCHES = 11.69
+# Los DPI por debajo de este valor son los de cámara (72/96), no de escáner
+MIN_TRUSTED_DPI = 150
+# No se reduce si la escala resultante queda por encima de este valor
+MAX_USEFUL_SCALE = 0.75
+
+# Formatos cuya EXIF se lee de la cabecera (en PNG requeriría decodificar la imagen)
+EXIF_HEADER_FORMATS = ("JPEG", "MPO", "TIFF", "WEBP")
+
+# Factor de reducción del decodificador JPEG -> bandera de OpenCV
+REDUCED_DECODE_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+class ImageHeader(NamedTuple):
+    format: Optional[str]
+    width: int
+    height: int
+    dpi: Optional[float]
+    exif_orientation: Optional[int]
+
+
+class DecodedImage(NamedTuple):
+    image: Optional[np.ndarray]
+    exif_orientation: Optional[int]
+    # Relación tamaño decodificado / tamaño original (1.0 = resolución nativa)
+    scale: float
+
+
+def read_file(path: str) -> np.ndarray:
+    """Contenido del archivo como array uint8 (mapeado en memoria si es grande). Admite rutas Unicode."""
+    if os.path.getsize(path) >= MMAP_THRESHOLD_BYTES:
+        return np.memmap(path, dtype=np.uint8, mode="r")
+    return np.fromfile(path, dtype=np.uint8)
+
+
+def read_header(stream: np.ndarray) -> Optional[ImageHeader]:
+    """Formato, tamaño, DPI y orientación EXIF leyendo solo la cabecera."""
+    try:
+        with Image.open(io.BytesIO(stream[:HEADER_BYTES].tobytes())) as header:
+            dpi = header.info.get("dpi")
+            exif_orientation = None
+            if header.format in EXIF_HEADER_FORMATS:
+                try:
+                    exif_orientation = header.getexif().get(EXIF_ORIENTATION_TAG)
+                except Exception:
+                    pass
+            return ImageHeader(
+                format=header.format,
+                width=header.width,
+                height=header.height,
+                dpi=float(dpi[0]) if dpi and dpi[0] else None,
+                exif_orientation=exif_orientation,
+            )
+    except Exception:
+        return None
+
+
+def target_scale(header: Optional[ImageHeader], target_dpi: int) -> float:
+    """Escala (<= 1) que lleva la imagen a target_dpi. 1.0 si no conviene reducir."""
+    if header is None or target_dpi <= 0:
+        return 1.0
+    if header.dpi and header.dpi >= MIN_TRUSTED_DPI:
+        effective_dpi = header.dpi
+    else:
+        effective_dpi = max(header.width, header.height) / PAGE_LONG_SIDE_INCHES
+    scale = target_dpi / effective_dpi
+    return scale if scale <= MAX_USEFUL_SCALE else 1.0
+
+
+def decode(stream: np.ndarray, target_dpi: int = 0) -> DecodedImage:
+    """Decodifica a la escala necesaria para target_dpi (0 = resolución nativa)."""
+    header = read_header(stream)
+    exif_orientation = header.exif_orientation if header else None
+    scale = target_scale(header, target_dpi)
+    if scale == 1.0:
+        return DecodedImage(cv2.imdecode(stream, cv2.IMREAD_COLOR), exif_orientation, 1.0)
+
+    image = None
+    if header.format == "JPEG":
+        # El mayor factor que todavía deja la imagen a target_dpi o más
+        for factor, flag in REDUCED_DECODE_FLAGS:
+            if 1 / factor >= scale:
+                image = cv2.imdecode(stream, flag)
+                break
+    if image is None:
+        image = cv2.imdecode(stream, cv2.IMREAD_COLOR)
+        if image is None:
+            return DecodedImage(None, exif_orientation, 1.0)
+
+    # Tamaño decodificado respecto del original (los ejes pueden venir girados por EXIF)
+    original_long_side = max(header.width, header.height)
+    decoded_scale = max(image.shape[:2]) / original_long_side
+    remaining = scale / decoded_scale
+    if remaining <= MAX_USEFUL_SCALE:
+        image = cv2.resize(image, None, fx=remaining, fy=remaining, interpolation=cv2.INTER_AREA)
+    return DecodedImage(image, exif_orientation, max(image.shape[:2]) / original_long_side)
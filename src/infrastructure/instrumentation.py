@@ -0,0 +1,409 @@
+"""
+Módulo de infraestructura con la instrumentación del pipeline OCR: tramos
+cronometrados (spans), contadores y eventos, enviados a uno o varios
+destinos intercambiables (sinks).
+
+- MemorySink: agrega en memoria (conteo, total, máximo por tramo) y guarda el
+  desglose de las páginas más lentas.
+- JsonLinesSink: una línea JSON por tramo o evento (archivo o stream).
+- PrometheusFileSink: volcado de los agregados en formato de texto de Prometheus.
+- ConsoleSink: eventos legibles en la salida de errores (reemplaza a DEBUG).
+
+Sin destinos, la instrumentación está desactivada: span() devuelve un
+contexto vacío compartido y count()/event() retornan en la primera línea,
+de modo que el costo en el camino caliente es una comprobación de atributo.
+
+Los tramos se anidan: cada uno conoce su ruta ("page/ocr/strategy") y la
+traza (una por página) a la que pertenece, también en los hilos de las
+estrategias paralelas si se lanzan con Instrumentation.bind().
+"""
+import atexit
+import contextvars
+import heapq
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, NamedTuple, Optional, Protocol, TextIO
+
+# Límites de los buckets del histograma de Prometheus (segundos)
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Páginas más lentas cuyo desglose conserva MemorySink
+SLOWEST_TRACES = 10
+# Cada cuánto (segundos) se reescribe el volcado de Prometheus como mucho
+METRICS_FLUSH_INTERVAL = 5.0
+
+
+class SpanRecord(NamedTuple):
+    name: str
+    path: str           # Ruta del tramo dentro de la traza ("page/ocr/strategy")
+    trace: str          # Identificador de la traza (una por página)
+    label: Optional[str]  # Variante del tramo (color, estrategia, método de Tesseract...)
+    seconds: float
+    attrs: dict
+
+
+class Sink(Protocol):
+    """Destino de la instrumentación."""
+    def record_span(self, span: SpanRecord) -> None: ...
+    def record_count(self, name: str, value: float) -> None: ...
+    def record_event(self, name: str, attrs: dict) -> None: ...
+    def flush(self) -> None: ...
+
+
+class _SpanContext(NamedTuple):
+    trace: str
+    path: str
+
+
+# Tramo abierto en el contexto actual (por hilo / por tarea)
+_current_span: contextvars.ContextVar[Optional[_SpanContext]] = contextvars.ContextVar("ocr_span", default=None)
+
+
+class _NullSpan:
+    """Contexto vacío que se devuelve con la instrumentación desactivada."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_owner", "name", "label", "attrs", "_context", "_token", "_start")
+
+    def __init__(self, owner: "Instrumentation", name: str, label: Optional[str], attrs: dict):
+        self._owner = owner
+        self.name = name
+        self.label = label
+        self.attrs = attrs
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is None:
+            self._context = _SpanContext(uuid.uuid4().hex[:12], self.name)
+        else:
+            self._context = _SpanContext(parent.trace, f"{parent.path}/{self.name}")
+        self._token = _current_span.set(self._context)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self._owner._emit_span(SpanRecord(self.name, self._context.path, self._context.trace,
+                                          self.label, seconds, self.attrs))
+        return False
+
+    def set(self, **attrs):
+        """Agrega atributos conocidos recién al terminar (p. ej. si la estrategia fue aceptada)."""
+        self.attrs.update(attrs)
+
+
+class Instrumentation:
+    """Punto de entrada de la instrumentación: reparte tramos, contadores y eventos entre los destinos."""
+
+    def __init__(self, sinks: Optional[list] = None):
+        self._sinks: list = list(sinks or [])
+        self.enabled = bool(self._sinks)
+
+    def add_sink(self, sink: Sink):
+        self._sinks.append(sink)
+        self.enabled = True
+
+    @property
+    def sinks(self) -> list:
+        return list(self._sinks)
+
+    # --- Camino caliente ---
+    def span(self, name: str, label: Optional[str] = None, **attrs):
+        """Contexto que cronometra un tramo. Desactivada, devuelve un contexto vacío compartido."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, label, attrs)
+
+    def count(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        for sink in self._sinks:
+            sink.record_count(name, value)
+
+    def event(self, name: str, **attrs):
+        """Suceso puntual (lo que antes era un print de DEBUG)."""
+        if not self.enabled:
+            return
+        context = _current_span.get()
+        if context is not None:
+            attrs = {"trace": context.trace, "path": context.path, **attrs}
+        for sink in self._sinks:
+            sink.record_event(name, attrs)
+
+    def bind(self, function: Callable) -> Callable:
+        """Función que se ejecuta dentro del tramo actual (para enviarla a otro hilo)."""
+        if not self.enabled:
+            return function
+        context = contextvars.copy_context()
+        return lambda *args, **kwargs: context.run(function, *args, **kwargs)
+
+    def flush(self):
+        for sink in self._sinks:
+            sink.flush()
+
+    def _emit_span(self, span: SpanRecord):
+        for sink in self._sinks:
+            sink.record_span(span)
+
+
+def instrumentation_from_config(config) -> Instrumentation:
+    """Instrumentación según OcrConfig.trace_path / metrics_path (desactivada si no se indica ninguno)."""
+    sinks = []
+    if getattr(config, "trace_path", None):
+        sinks.append(JsonLinesSink(config.trace_path))
+    if getattr(config, "metrics_path", None):
+        sinks.append(PrometheusFileSink(config.metrics_path))
+    return Instrumentation(sinks)
+
+
+# --- Destinos ---
+class MemorySink:
+    """
+    Agrega en memoria, seguro entre hilos. snapshot() devuelve el conteo,
+    total y máximo por tramo, los contadores y el desglose por tramo de
+    las SLOWEST_TRACES páginas más lentas.
+    """
+
+    def __init__(self, slowest_traces: int = SLOWEST_TRACES):
+        self._lock = threading.Lock()
+        self.slowest_traces = slowest_traces
+        # (ruta, variante) -> [conteo, total, máximo, conteos por bucket]
+        self._spans: dict[tuple[str, Optional[str]], list] = {}
+        self._counters: dict[str, float] = {}
+        # Tramos de las trazas todavía abiertas y el montículo de las más lentas
+        self._open_traces: dict[str, list[SpanRecord]] = {}
+        self._slowest: list[tuple[float, str, list]] = []
+
+    def record_span(self, span: SpanRecord):
+        with self._lock:
+            entry = self._spans.get((span.path, span.label))
+            if entry is None:
+                entry = self._spans[(span.path, span.label)] = [0, 0.0, 0.0, [0] * len(HISTOGRAM_BUCKETS)]
+            entry[0] += 1
+            entry[1] += span.seconds
+            entry[2] = max(entry[2], span.seconds)
+            for i, bound in enumerate(HISTOGRAM_BUCKETS):
+                if span.seconds <= bound:
+                    entry[3][i] += 1
+                    break
+
+            if self.slowest_traces <= 0:
+                return
+            if "/" in span.path:
+                self._open_traces.setdefault(span.trace, []).append(span)
+                return
+            # Terminó la raíz: se decide si la traza entra entre las más lentas
+            children = self._open_traces.pop(span.trace, [])
+            breakdown = [{"path": child.path, "label": child.label, "ms": round(child.seconds * 1000, 2)}
+                         for child in children]
+            item = (span.seconds, span.trace, [{"path": span.path, "ms": round(span.seconds * 1000, 2),
+                                                **span.attrs}] + breakdown)
+            if len(self._slowest) < self.slowest_traces:
+                heapq.heappush(self._slowest, item)
+            elif span.seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def record_count(self, name: str, value: float):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_event(self, name: str, attrs: dict):
+        pass
+
+    def flush(self):
+        pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            spans = {}
+            for (path, label), (count, total, maximum, _) in sorted(self._spans.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+                key = f"{path}[{label}]" if label else path
+                spans[key] = {"count": count, "total_ms": round(total * 1000, 2),
+                              "mean_ms": round(total / count * 1000, 2), "max_ms": round(maximum * 1000, 2)}
+            slowest = [trace for _, _, trace in sorted(self._slowest, reverse=True)]
+            return {"spans": spans, "counters": dict(self._counters), "slowest": slowest}
+
+    def prometheus_text(self, prefix: str = "ocr") -> str:
+        """Agregados en el formato de texto de Prometheus (histograma por tramo y contadores)."""
+        with self._lock:
+            spans = {key: (entry[0], entry[1], list(entry[3])) for key, entry in self._spans.items()}
+            counters = dict(self._counters)
+
+        lines = [f"# HELP {prefix}_span_seconds Duración de los tramos del pipeline OCR.",
+                 f"# TYPE {prefix}_span_seconds histogram"]
+        for (path, label), (count, total, buckets) in sorted(spans.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+            labels = f'span="{_escape_label(path)}"' + (f',label="{_escape_label(label)}"' if label else "")
+            cumulative = 0
+            for bound, bucket in zip(HISTOGRAM_BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(f'{prefix}_span_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_span_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{prefix}_span_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{prefix}_span_seconds_count{{{labels}}} {count}")
+        for name, value in sorted(counters.items()):
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+class PrometheusFileSink(MemorySink):
+    """
+    Agrega en memoria y vuelca el texto de Prometheus a un archivo (para el
+    "textfile collector" de node_exporter). Se reescribe como mucho cada
+    METRICS_FLUSH_INTERVAL segundos y al salir. En los procesos trabajadores
+    se agrega el PID al nombre para que no se pisen entre sí.
+    """
+
+    def __init__(self, path: str, flush_interval: float = METRICS_FLUSH_INTERVAL):
+        super().__init__(slowest_traces=0)
+        if multiprocessing.parent_process() is not None:
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{os.getpid()}{ext}"
+        self.path = path
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        _at_exit(self.flush)
+
+    def record_span(self, span: SpanRecord):
+        super().record_span(span)
+        # Al cerrar una página (raíz de la traza), si pasó el intervalo
+        if "/" not in span.path and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # Sin permisos de escritura: las métricas simplemente no se vuelcan
+
+
+class JsonLinesSink:
+    """
+    Una línea JSON por tramo o evento, con la traza a la que pertenece: filtrando
+    por "trace" se ve en qué se fue cada segundo de una página lenta. Los
+    contadores se escriben agregados al terminar cada página (con su traza) y
+    al hacer flush. Varios procesos pueden escribir en el mismo archivo (se
+    abre en modo append, línea a línea).
+    """
+
+    def __init__(self, target, include_spans: bool = True):
+        self._lock = threading.Lock()
+        self._owns_stream = isinstance(target, str)
+        self._stream: TextIO = open(target, "a", encoding="utf-8", buffering=1) if self._owns_stream else target
+        self.include_spans = include_spans
+        self._counters: dict[str, float] = {}
+        if self._owns_stream:
+            _at_exit(self.close)
+
+    def record_span(self, span: SpanRecord):
+        if not self.include_spans:
+            return
+        record = {"type": "span", "ts": round(time.time(), 3), "pid": os.getpid(), "trace": span.trace,
+                  "span": span.path, "ms": round(span.seconds * 1000, 3)}
+        if span.label is not None:
+            record["label"] = span.label
+        record.update(span.attrs)
+        self._write(record)
+        if "/" not in span.path:
+            self._write_counters(trace=span.trace)
+
+    def record_count(self, name: str, value: float):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_event(self, name: str, attrs: dict):
+        self._write({"type": "event", "ts": round(time.time(), 3), "pid": os.getpid(), "event": name, **attrs})
+
+    def flush(self):
+        self._write_counters()
+        with self._lock:
+            if not self._stream.closed:
+                self._stream.flush()
+
+    def close(self):
+        self.flush()
+        if self._owns_stream:
+            with self._lock:
+                self._stream.close()
+
+    def _write_counters(self, **attrs):
+        """Contadores acumulados desde la última escritura."""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+        if counters:
+            self._write({"type": "counters", "ts": round(time.time(), 3), "pid": os.getpid(), **attrs, **counters})
+
+    def _write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            if not self._stream.closed:
+                self._stream.write(line + "\n")
+
+
+class ConsoleSink:
+    """Eventos (y opcionalmente tramos) legibles en la salida de errores, para depurar."""
+
+    def __init__(self, stream: Optional[TextIO] = None, include_spans: bool = False):
+        self.stream = stream
+        self.include_spans = include_spans
+
+    def record_span(self, span: SpanRecord):
+        if self.include_spans:
+            label = f"[{span.label}]" if span.label else ""
+            self._print(f"⏱️ {span.path}{label}: {span.seconds * 1000:.1f} ms")
+
+    def record_count(self, name: str, value: float):
+        pass
+
+    def record_event(self, name: str, attrs: dict):
+        details = " ".join(f"{key}={value}" for key, value in attrs.items() if key not in ("trace", "path"))
+        self._print(f"• {name} {details}".rstrip())
+
+    def flush(self):
+        pass
+
+    def _print(self, message: str):
+        print(message, file=self.stream or sys.stderr)
+
+
+def _at_exit(callback: Callable):
+    """Ejecuta callback al salir, también en los procesos trabajadores (que terminan sin pasar por atexit)."""
+    atexit.register(callback)
+    if multiprocessing.parent_process() is not None:
+        multiprocessing.util.Finalize(None, callback, exitpriority=10)
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
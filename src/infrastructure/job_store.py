@@ -0,0 +1,186 @@
+"""
+Módulo de infraestructura con el almacenamiento en disco de los trabajos por
+lotes. Cada trabajo es un archivo SQLite con el manifiesto (la lista de
+imágenes) y los resultados, que se guardan en cuanto se producen: si la
+aplicación se cierra a mitad de un lote, al volver a lanzarlo solo se
+procesan las imágenes que faltan.
+
+El trabajo se identifica por la lista de rutas, el color y la configuración
+del pipeline (otro modo, perfil, idioma o resolución es otro trabajo); una
+imagen modificada desde su procesamiento (tamaño o fecha) vuelve a quedar
+pendiente.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterator, Optional
+
+from src.infrastructure.app_paths import user_data_path
+from src.infrastructure.ocr_config import OcrConfig
+from src.infrastructure.page_refs import split_page_ref
+from src.infrastructure.ocr_result import OcrResult, STATUS_OK, STATUS_EMPTY
+from src.infrastructure.result_cache import fingerprint
+
+JOBS_DIR_NAME = "jobs"
+# Los trabajos sin actividad durante este tiempo se borran al crear uno nuevo
+JOB_RETENTION_SECONDS = 14 * 24 * 3600
+# Archivos que SQLite crea junto a la base en modo WAL
+SQLITE_SIDECAR_SUFFIXES = ("-wal", "-shm")
+# Estado de una entrada aún no procesada
+STATUS_PENDING = "pending"
+# Estados que cuentan como terminados (los errores se reintentan al reanudar)
+DONE_STATUSES = (STATUS_OK, STATUS_EMPTY)
+
+
+def _file_stamp(path: str) -> Optional[str]:
+    try:
+        # Las páginas de un documento llevan la marca del archivo que las contiene
+        stat = os.stat(split_page_ref(path)[0])
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return None
+
+
+class JobStore:
+    """
+    Manifiesto y resultados de un trabajo por lotes en un archivo SQLite.
+    Segura entre hilos: el lote escribe desde un hilo y la interfaz lee desde otro.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " idx INTEGER PRIMARY KEY,"
+                " path TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " stamp TEXT,"
+                " text TEXT,"
+                " colors TEXT,"
+                " finished_at REAL,"
+                " duplicate_of TEXT)"
+            )
+            # Trabajos creados antes de la detección de casi duplicados
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+            if "duplicate_of" not in columns:
+                self._conn.execute("ALTER TABLE entries ADD COLUMN duplicate_of TEXT")
+
+    @classmethod
+    def open(cls, image_paths: list[str], color: str = "auto", config: Optional[OcrConfig] = None,
+             jobs_dir: Optional[str] = None) -> "JobStore":
+        """Abre el trabajo de estas imágenes con esta configuración (retomándolo si ya existe) o lo crea."""
+        jobs_dir = jobs_dir or user_data_path(JOBS_DIR_NAME)
+        os.makedirs(jobs_dir, exist_ok=True)
+        config = config or OcrConfig()
+        job_id = fingerprint([os.path.abspath(path) for path in image_paths], color, config.pipeline_fields())
+        path = os.path.join(jobs_dir, f"{job_id}.sqlite")
+        if not os.path.exists(path):
+            cls.prune(jobs_dir)
+
+        store = cls(path)
+        with store._lock, store._conn:
+            if store._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0:
+                store._conn.executemany(
+                    "INSERT INTO entries (idx, path, status) VALUES (?, ?, ?)",
+                    [(index, image_path, STATUS_PENDING) for index, image_path in enumerate(image_paths)],
+                )
+                store._conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("job_id", job_id), ("color", color), ("created_at", str(time.time()))],
+                )
+            else:
+                # Las imágenes modificadas desde que se procesaron se repiten
+                rows = store._conn.execute(
+                    "SELECT idx, path, stamp FROM entries WHERE status IN (?, ?)", DONE_STATUSES
+                ).fetchall()
+                stale = [(STATUS_PENDING, index) for index, image_path, stamp in rows if _file_stamp(image_path) != stamp]
+                store._conn.executemany(
+                    "UPDATE entries SET status = ?, text = NULL, colors = NULL, duplicate_of = NULL WHERE idx = ?", stale
+                )
+        return store
+
+    @staticmethod
+    def prune(jobs_dir: str, max_age_seconds: float = JOB_RETENTION_SECONDS):
+        """Borra los trabajos sin actividad reciente, con sus archivos -wal y -shm."""
+        now = time.time()
+        last_activity: dict[str, float] = {}
+        for name in os.listdir(jobs_dir):
+            job_name = name
+            for suffix in SQLITE_SIDECAR_SUFFIXES:
+                job_name = job_name.removesuffix(suffix)
+            try:
+                modified = os.path.getmtime(os.path.join(jobs_dir, name))
+            except OSError:
+                continue
+            # Las escrituras recientes pueden estar todavía solo en el -wal
+            last_activity[job_name] = max(modified, last_activity.get(job_name, 0.0))
+
+        for job_name, modified in last_activity.items():
+            if now - modified <= max_age_seconds:
+                continue
+            # Primero la base: si está abierta (Windows no la deja borrar), su -wal se conserva
+            for suffix in ("",) + SQLITE_SIDECAR_SUFFIXES:
+                try:
+                    os.remove(os.path.join(jobs_dir, job_name + suffix))
+                except FileNotFoundError:
+                    continue
+                except OSError:
+                    break
+
+    # --- Escritura ---
+    def record(self, index: int, result: OcrResult):
+        """Guarda el resultado de una imagen (queda en disco al volver)."""
+        colors = json.dumps(result.colors) if result.colors is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE entries SET status = ?, stamp = ?, text = ?, colors = ?, finished_at = ?, duplicate_of = ? WHERE idx = ?",
+                (result.status, _file_stamp(result.path), result.text, colors, time.time(), result.duplicate_of, index),
+            )
+
+    # --- Lectura ---
+    @property
+    def total(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def pending(self) -> list[tuple[int, str]]:
+        """(índice, ruta) de las imágenes que faltan por procesar, en orden."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT idx, path FROM entries WHERE status NOT IN (?, ?) ORDER BY idx", DONE_STATUSES
+            ).fetchall()
+
+    def completed(self) -> list[tuple[int, str, str, Optional[str]]]:
+        """(índice, ruta, estado, duplicado de) de las imágenes ya terminadas, sin cargar los textos."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT idx, path, status, duplicate_of FROM entries WHERE status IN (?, ?) ORDER BY idx", DONE_STATUSES
+            ).fetchall()
+
+    def text(self, index: int) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM entries WHERE idx = ?", (index,)).fetchone()
+        return row[0] if row else None
+
+    def iter_results(self) -> Iterator[tuple[int, str, str, str, Optional[str]]]:
+        """Recorre (índice, ruta, estado, texto, duplicado de) de las imágenes procesadas, de a una fila."""
+        with self._lock:
+            indices = [row[0] for row in self._conn.execute(
+                "SELECT idx FROM entries WHERE status != ? ORDER BY idx", (STATUS_PENDING,))]
+        for index in indices:
+            with self._lock:
+                row = self._conn.execute("SELECT idx, path, status, text, duplicate_of FROM entries WHERE idx = ?", (index,)).fetchone()
+            if row is not None:
+                yield row
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,110 @@
+"""
+Módulo de infraestructura que elige el idioma de Tesseract para cada lote.
+
+Con "spa+eng" Tesseract carga y evalúa los dos modelos en cada pasada (y en
+modo página hay hasta una por color), lo que cuesta casi el doble que con
+uno solo. Las primeras páginas del lote se leen con los dos; con su texto se
+cuentan palabras vacías de cada idioma ("de", "que", "the", "and"...) y, si
+uno domina claramente, el resto del lote usa solo ese modelo. Si el lote es
+mixto o no hay texto suficiente, se sigue con los dos.
+"""
+import re
+from typing import Optional
+
+# Palabras frecuentes y exclusivas de cada idioma (sin las compartidas: "no", "a", "me"...)
+STOPWORDS = {
+    "spa": frozenset((
+        "de", "la", "que", "el", "en", "y", "los", "del", "se", "las", "por", "un", "para", "con",
+        "una", "su", "al", "lo", "como", "más", "pero", "sus", "le", "ya", "este", "porque", "esta",
+        "entre", "cuando", "muy", "sin", "sobre", "también", "hasta", "hay", "donde", "desde",
+        "todo", "nos", "durante", "todos", "uno", "les", "ni", "contra", "otros", "ese", "eso",
+        "ante", "ellos", "esto", "antes", "algunos", "qué", "unos", "otro", "otras", "otra", "él",
+        "tanto", "esa", "estos", "mucho", "nada", "muchos", "cual", "poco", "ella", "estas", "es",
+        "son", "fue", "ser", "está", "según", "año", "años", "página", "fecha",
+    )),
+    "eng": frozenset((
+        "the", "of", "and", "to", "in", "is", "that", "it", "for", "was", "on", "are", "as", "with",
+        "be", "at", "by", "this", "have", "from", "or", "had", "not", "but", "what", "all", "were",
+        "when", "we", "there", "can", "an", "your", "which", "their", "if", "will", "each", "about",
+        "how", "up", "out", "them", "then", "she", "many", "some", "so", "these", "would", "other",
+        "into", "has", "more", "her", "like", "him", "could", "been", "than", "its", "who", "did",
+        "our", "should", "page", "date", "year",
+    )),
+}
+# Caracteres que solo aparecen en español (cuentan como una palabra vacía más)
+SPANISH_CHARACTERS = frozenset("ñÑáéíóúÁÉÍÓÚ¿¡")
+
+# Páginas del lote que se leen con todos los modelos antes de decidir
+LANGUAGE_SAMPLE_PAGES = 3
+# Si todavía no hay evidencia suficiente se sigue muestreando hasta este número
+LANGUAGE_MAX_SAMPLE_PAGES = 8
+# Palabras vacías reconocidas necesarias para decidir
+MIN_LANGUAGE_EVIDENCE = 20
+# Proporción mínima de las palabras vacías que debe reunir un idioma para quedarse solo
+DOMINANT_LANGUAGE_SHARE = 0.9
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+
+def language_evidence(text: str) -> dict[str, int]:
+    """Palabras vacías de cada idioma encontradas en el texto."""
+    counts = {lang: 0 for lang in STOPWORDS}
+    for word in _WORD_PATTERN.findall(text.lower()):
+        for lang, words in STOPWORDS.items():
+            if word in words:
+                counts[lang] += 1
+    counts["spa"] += sum(character in SPANISH_CHARACTERS for character in text)
+    return counts
+
+
+def dominant_language(evidence: dict[str, int], min_evidence: int = MIN_LANGUAGE_EVIDENCE) -> Optional[str]:
+    """Idioma que reúne DOMINANT_LANGUAGE_SHARE de la evidencia, o None (mixto o insuficiente)."""
+    total = sum(evidence.values())
+    if total < min_evidence:
+        return None
+    lang, hits = max(evidence.items(), key=lambda item: item[1])
+    return lang if hits >= DOMINANT_LANGUAGE_SHARE * total else None
+
+
+class LanguageSelector:
+    """
+    Idioma de Tesseract para el lote en curso, decidido con las primeras
+    páginas. `candidates` es la combinación que se usa mientras se muestrea
+    ("spa+eng"); solo se elige un idioma incluido en ella.
+    """
+
+    def __init__(self, candidates: str, sample_pages: int = LANGUAGE_SAMPLE_PAGES,
+                 max_sample_pages: int = LANGUAGE_MAX_SAMPLE_PAGES):
+        self.candidates = candidates
+        self.sample_pages = sample_pages
+        self.max_sample_pages = max_sample_pages
+        self.reset()
+
+    def reset(self):
+        self.language = self.candidates
+        self.decided = False
+        self.pages = 0
+        self.evidence = {lang: 0 for lang in STOPWORDS}
+
+    def observe(self, text: str) -> Optional[str]:
+        """
+        Suma el texto de una página leída con los modelos candidatos. Devuelve
+        el idioma elegido cuando se toma la decisión (una vez por lote); None
+        mientras se muestrea o si se decide seguir con todos.
+        """
+        if self.decided:
+            return None
+        self.pages += 1
+        for lang, hits in language_evidence(text).items():
+            self.evidence[lang] += hits
+        if self.pages < self.sample_pages:
+            return None
+
+        lang = dominant_language(self.evidence)
+        if lang is None and self.pages < self.max_sample_pages and sum(self.evidence.values()) < MIN_LANGUAGE_EVIDENCE:
+            return None  # Poco texto todavía: se sigue muestreando
+        self.decided = True
+        if lang is None or lang not in self.candidates.split("+"):
+            return None
+        self.language = lang
+        return lang
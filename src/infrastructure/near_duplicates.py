@@ -0,0 +1,157 @@
+"""
+Módulo de infraestructura que detecta imágenes casi idénticas dentro de un
+lote (ráfagas del teléfono, la misma página fotografiada dos veces) para
+hacer el OCR de una sola: la más nítida de cada grupo.
+
+- Huella perceptual: dHash de 16x16 (256 bits) sobre una versión reducida en
+  escala de grises. Los JPEG se decodifican directamente a 1/2 - 1/8 (draft),
+  de modo que la pasada previa cuesta una fracción del OCR.
+- Resaltado: la huella en grises casi no cambia al resaltar un párrafo más
+  o con otro color, así que se guardan también los colores de resaltador
+  presentes (mismos rangos HSV que el pipeline) y una grilla de 8x8 con
+  dónde está cada uno.
+- Dos imágenes son casi idénticas si sus huellas difieren en como mucho
+  max_distance bits, tienen la misma proporción y los mismos colores en
+  (casi) las mismas celdas.
+- Agrupamiento sin encadenar: de la más nítida a la menos nítida, cada
+  imagen se compara solo con los representantes de los grupos ya formados y
+  se une al primero que cumpla; si ninguno cumple, encabeza un grupo nuevo.
+  Así toda imagen está a max_distance de su representante, no de un vecino.
+- Sin comparar todos contra todos: con max_distance + 1 tramos de la huella,
+  dos huellas a esa distancia coinciden al menos en un tramo (principio del
+  palomar), así que solo se comparan las que comparten uno.
+- Nitidez: varianza del Laplaciano de la misma versión reducida.
+
+Las páginas de documentos (TIFF / PDF) no se agrupan: páginas distintas de
+un formulario pueden parecerse mucho.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from src.infrastructure.color_analysis import ColorClassifier, HIGHLIGHT_COLOR_RANGES
+from src.infrastructure.page_refs import is_document
+
+# Lado de la huella: HASH_SIZE x HASH_SIZE bits
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+# Lado largo de la versión reducida usada para la huella y la nitidez
+SIGNATURE_MAX_SIDE = 512
+# Diferencia máxima de proporción (ancho / alto) entre casi duplicados
+MAX_ASPECT_DIFFERENCE = 0.02
+# Un color cuenta como presente desde esta fracción de los píxeles
+COLOR_MIN_FRACTION = 0.002
+# Lado de la grilla con la ubicación de cada color (COLOR_GRID x COLOR_GRID bits)
+COLOR_GRID = 8
+# Fracción de una celda que debe estar resaltada para marcarla
+COLOR_CELL_FRACTION = 0.02
+# Celdas que pueden diferir entre casi duplicados (por color)
+MAX_COLOR_GRID_DISTANCE = 2
+
+_classifier = ColorClassifier(HIGHLIGHT_COLOR_RANGES)
+
+
+class ImageSignature(NamedTuple):
+    hash: int        # dHash de HASH_BITS bits
+    aspect: float    # ancho / alto (ya orientada según EXIF)
+    sharpness: float  # Varianza del Laplaciano (mayor = más nítida)
+    colors: dict[str, int]  # Color de resaltador presente -> grilla de celdas donde aparece
+
+
+def image_signature(path: str) -> Optional[ImageSignature]:
+    """Huella, proporción, nitidez y colores de una imagen. None si no se puede leer."""
+    try:
+        with Image.open(path) as image:
+            # JPEG: el decodificador reduce directamente (1/2, 1/4 u 1/8)
+            image.draft("RGB", (SIGNATURE_MAX_SIDE, SIGNATURE_MAX_SIDE))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            image.thumbnail((SIGNATURE_MAX_SIDE, SIGNATURE_MAX_SIDE), Image.Resampling.BILINEAR)
+            rgb = np.asarray(image)
+    except Exception:
+        return None
+    if rgb.size == 0:
+        return None
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+
+    # dHash: cada bit indica si el píxel es más claro que su vecino de la derecha
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    hash_value = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    return ImageSignature(hash_value, gray.shape[1] / gray.shape[0], sharpness, _color_layout(rgb))
+
+
+def _color_layout(rgb: np.ndarray) -> dict[str, int]:
+    """Colores de resaltador presentes y, de cada uno, la grilla de celdas donde aparece."""
+    labels = _classifier.classify(cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV))
+    counts = np.bincount(labels.ravel(), minlength=len(_classifier.color_names) + 1)
+    layout = {}
+    for color_name in _classifier.color_names:
+        label = _classifier.label_of(color_name)
+        if counts[label] < COLOR_MIN_FRACTION * labels.size:
+            continue
+        coverage = cv2.resize((labels == label).astype(np.float32), (COLOR_GRID, COLOR_GRID), interpolation=cv2.INTER_AREA)
+        layout[color_name] = int.from_bytes(np.packbits((coverage > COLOR_CELL_FRACTION).flatten()).tobytes(), "big")
+    return layout
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def is_near_duplicate(a: ImageSignature, b: ImageSignature, max_distance: int) -> bool:
+    """Misma proporción, huellas a max_distance bits o menos y el mismo resaltado."""
+    if abs(a.aspect - b.aspect) > MAX_ASPECT_DIFFERENCE * b.aspect:
+        return False
+    if a.colors.keys() != b.colors.keys():
+        return False
+    if any(hamming_distance(grid, b.colors[name]) > MAX_COLOR_GRID_DISTANCE for name, grid in a.colors.items()):
+        return False
+    return hamming_distance(a.hash, b.hash) <= max_distance
+
+
+def find_near_duplicates(image_paths: list[str], max_distance: int, max_workers: int = 1) -> dict[int, int]:
+    """
+    Agrupa las imágenes casi idénticas. Devuelve índice de duplicado ->
+    índice de su representante (el más nítido del grupo); los índices que no
+    aparecen se procesan normalmente. max_distance <= 0 desactiva la detección.
+    """
+    candidates = [index for index, path in enumerate(image_paths) if not is_document(path)]
+    if max_distance <= 0 or len(candidates) < 2:
+        return {}
+
+    # La decodificación de Pillow libera el GIL: los hilos aprovechan los núcleos
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        signatures = dict(zip(candidates, executor.map(image_signature, (image_paths[i] for i in candidates))))
+    signatures = {index: signature for index, signature in signatures.items() if signature is not None}
+
+    # Tramos de la huella: dos huellas a distancia <= max_distance comparten al menos uno
+    segments = min(max_distance + 1, HASH_BITS)
+    bounds = [HASH_BITS * i // segments for i in range(segments + 1)]
+
+    def segment_keys(signature: ImageSignature):
+        for segment in range(segments):
+            width = bounds[segment + 1] - bounds[segment]
+            yield segment, (signature.hash >> bounds[segment]) & ((1 << width) - 1)
+
+    # Representante: el más nítido del grupo (a igualdad, el primero del lote);
+    # en los tramos solo se registran los representantes
+    buckets: dict[tuple[int, int], list[int]] = {}
+    duplicates = {}
+    for index in sorted(signatures, key=lambda i: (-signatures[i].sharpness, i)):
+        signature = signatures[index]
+        keys = list(segment_keys(signature))
+        representative = next(
+            (other for key in keys for other in buckets.get(key, ())
+             if is_near_duplicate(signature, signatures[other], max_distance)),
+            None,
+        )
+        if representative is not None:
+            duplicates[index] = representative
+            continue
+        for key in keys:
+            buckets.setdefault(key, []).append(index)
+    return duplicates
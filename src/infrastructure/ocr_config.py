@@ -0,0 +1,110 @@
+"""
+Módulo de infraestructura con la configuración del pipeline OCR.
+Es inmutable y serializable para poder compartirla entre procesos trabajadores.
+"""
+import os
+from dataclasses import dataclass, asdict, replace
+from typing import Optional
+
+# Modos de extracción de las zonas resaltadas
+HIGHLIGHT_MODE_PAGE = "pagina"      # Máscara sobre la página completa, un OCR por color
+HIGHLIGHT_MODE_REGIONS = "regiones"  # OCR solo de los recortes de cada zona resaltada
+HIGHLIGHT_MODE_COMPOSITE = "compuesto"  # Recortes de todos los colores en un único OCR
+
+# Políticas de ejecución de las estrategias de página completa (fallback)
+FALLBACK_SEQUENTIAL = "secuencial"              # Una tras otra, en orden de prioridad
+FALLBACK_FIRST_ACCEPTABLE = "primera_aceptable"  # En paralelo; gana la primera que supera el umbral
+FALLBACK_BEST_CONFIDENCE = "mejor_confianza"     # En paralelo; gana la de mayor confianza media
+
+# Perfiles del filtrado de ruido del pre-procesamiento "Avanzado"
+PREPROCESS_FAST = "rapido"            # Mediana, sin NLM
+PREPROCESS_BALANCED = "equilibrado"   # NLM con ventana de búsqueda reducida
+PREPROCESS_QUALITY = "calidad"        # NLM original
+
+# Idioma de Tesseract elegido por lote entre los de DEFAULT_LANG (ver language_detection)
+LANGUAGE_AUTO = "auto"
+
+# Distancia de casi duplicados recomendada para ráfagas de fotos (ver near_duplicates)
+SUGGESTED_NEAR_DUPLICATE_DISTANCE = 20
+
+# Variantes de los modelos de Tesseract (carpetas tessdata_fast / tessdata_best junto a tessdata)
+MODEL_FAST = "fast"   # Modelos enteros: más rápidos, algo menos precisos
+MODEL_BEST = "best"   # Modelos de coma flotante: más lentos, más precisos
+
+# Campos que no cambian el texto que el pipeline obtiene de cada imagen
+# (rendimiento, almacenamiento o agrupación del lote)
+RUNTIME_ONLY_FIELDS = {
+    "engine_pool_size", "use_cache", "cache_path", "cache_max_bytes", "strategy_stats_path",
+    "trace_path", "metrics_path", "near_duplicate_distance", "strategy_threads",
+}
+
+
+@dataclass(frozen=True)
+class OcrConfig:
+    """Parámetros del pipeline OCR."""
+    # Modo de extracción de las zonas resaltadas. None = HIGHLIGHT_MODE_REGIONS
+    # con el motor persistente y HIGHLIGHT_MODE_COMPOSITE si cada llamada a
+    # Tesseract lanza un proceso (por zona hay una llamada por bloque)
+    highlight_mode: Optional[str] = None
+    # Idioma de Tesseract ("spa", "eng", "spa+eng"...). LANGUAGE_AUTO: las
+    # primeras páginas de cada lote se leen con spa+eng y, si domina un
+    # idioma, el resto del lote usa solo ese modelo (la mitad de trabajo)
+    language: str = LANGUAGE_AUTO
+    # Variante de los modelos (MODEL_FAST / MODEL_BEST). None = los de tessdata
+    model_variant: Optional[str] = None
+    # Instancias de Tesseract por idioma en el motor persistente (None = núcleos de la CPU)
+    engine_pool_size: Optional[int] = None
+    # Resolución a la que se decodifican las imágenes (las mayores se reducen
+    # al leerlas; los JPEG directamente en el decodificador). 0 = siempre nativa
+    target_dpi: int = 300
+    # Tamaño máximo (en píxeles) del proxy usado para OSD, detección de color y
+    # geometría de las máscaras. 0 = analizar siempre a resolución completa
+    analysis_max_pixels: int = 2_000_000
+    # Si la foto trae una etiqueta EXIF de orientación con giro (distinta de 1),
+    # el decodificador ya la aplicó y no se ejecuta OSD. Desactivar si se
+    # fotografían páginas giradas respecto de la cámara (p. ej. hojas apaisadas
+    # sobre la mesa)
+    trust_exif_orientation: bool = True
+    # Reutilizar la orientación dominante del lote y saltarse OSD cuando es estable
+    use_orientation_prior: bool = True
+    # Cómo se ejecutan las estrategias de página completa cuando no hay resaltados
+    fallback_policy: str = FALLBACK_FIRST_ACCEPTABLE
+    # Hilos para las estrategias en paralelo (None = una por estrategia). Los
+    # procesos de un lote usan solo su parte de los núcleos (ver for_workers)
+    strategy_threads: Optional[int] = None
+    # Perfil del filtrado de ruido y presupuesto de tiempo opcional por imagen.
+    # None = sin presupuesto (resultado determinista); con él, las imágenes
+    # grandes se filtran reducidas según lo que tarde esta máquina
+    preprocess_profile: str = PREPROCESS_QUALITY
+    preprocess_budget_seconds: Optional[float] = None
+    # Reordenar las estrategias según su éxito en el lote y en ejecuciones anteriores
+    adaptive_fallback: bool = True
+    # Ruta del JSON con las estadísticas de las estrategias (None = perfil del usuario)
+    strategy_stats_path: Optional[str] = None
+    # Caché persistente de resultados (por contenido de la imagen + configuración)
+    use_cache: bool = True
+    # Ruta del archivo SQLite de la caché (None = perfil del usuario)
+    cache_path: Optional[str] = None
+    # Tamaño máximo de la caché antes de expulsar las entradas menos usadas
+    cache_max_bytes: int = 256 * 1024 * 1024
+    # Instrumentación (ver instrumentation): JSONL con cada tramo y evento, y
+    # volcado de métricas en formato Prometheus. None = desactivada (sin costo)
+    trace_path: Optional[str] = None
+    metrics_path: Optional[str] = None
+    # En los lotes, las imágenes casi idénticas (huellas a esta distancia en bits
+    # de 256 o menos, con el mismo resaltado) se procesan una sola vez, la más
+    # nítida. Opcional: 0 = desactivado (ver SUGGESTED_NEAR_DUPLICATE_DISTANCE)
+    near_duplicate_distance: int = 0
+
+    def for_workers(self, workers: int) -> "OcrConfig":
+        """
+        Configuración para cada uno de `workers` procesos que comparten la CPU:
+        las estrategias en paralelo no usan más hilos que su parte de los núcleos.
+        """
+        if self.strategy_threads is not None:
+            return self
+        return replace(self, strategy_threads=max(1, (os.cpu_count() or 1) // max(1, workers)))
+
+    def pipeline_fields(self) -> dict:
+        """Campos que influyen en el texto extraído (para la huella de la caché)."""
+        return {key: value for key, value in asdict(self).items() if key not in RUNTIME_ONLY_FIELDS}
@@ -0,0 +1,35 @@
+"""
+Módulo de infraestructura con el resultado detallado de procesar una imagen:
+además del texto, los colores detectados, los tiempos de cada etapa y el
+estado. Es serializable (se devuelve desde los procesos trabajadores).
+"""
+from dataclasses import dataclass, field, asdict
+from typing import Optional
+
+# Estados posibles de un resultado
+STATUS_OK = "ok"        # Se extrajo texto
+STATUS_EMPTY = "empty"  # La imagen se procesó pero no tiene texto legible
+STATUS_ERROR = "error"  # No se pudo leer la imagen o falló el OCR
+
+
+@dataclass
+class OcrResult:
+    """Resultado de una imagen. `text` es lo mismo que devuelve extract_text_from_image."""
+    path: str
+    text: str
+    status: str = STATUS_OK
+    # Colores de resaltador detectados (vacío = página completa; None = desconocido)
+    colors: Optional[list] = None
+    # Segundos por etapa (read, decode, orientation, analysis, ocr, total)
+    timings: dict = field(default_factory=dict)
+    # True si el texto salió de la caché persistente
+    cached: bool = False
+    # Escala de la imagen procesada respecto del archivo original (para trasladar coordenadas)
+    scale: float = 1.0
+    # Página (desde 1) dentro de un documento TIFF / PDF; None en imágenes sueltas
+    page: Optional[int] = None
+    # Imagen casi idéntica del lote de la que se reutilizó el resultado (ver near_duplicates)
+    duplicate_of: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
@@ -4,13 +4,63 @@ con detección de color de resaltador para múltiples colores.
 """
 import cv2
 import numpy as np
-import pytesseract
 import os
-from typing import Protocol, Dict, Tuple
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Protocol, Dict, Tuple, Optional, Iterable, Iterator
+
+from src.infrastructure.tesseract_engine import TesseractEngine, UNKNOWN_VERSION, DEFAULT_LANG
+from src.infrastructure.tesseract_locator import locate_tesseract, remember_version
+from src.infrastructure.instrumentation import Instrumentation, instrumentation_from_config
+from src.infrastructure.color_analysis import ColorClassifier, ImageAnalysis, make_analysis_proxy, HIGHLIGHT_COLOR_RANGES
+from src.infrastructure.highlight_regions import find_highlight_blocks, pack_vertically, locate_placement
+from src.infrastructure.ocr_config import (
+    OcrConfig, HIGHLIGHT_MODE_REGIONS, HIGHLIGHT_MODE_COMPOSITE,
+    FALLBACK_SEQUENTIAL, FALLBACK_FIRST_ACCEPTABLE, LANGUAGE_AUTO,
+)
+from src.infrastructure.language_detection import LanguageSelector
+from src.infrastructure.strategy_stats import StrategyStats
+from src.infrastructure.preprocessing import Denoiser
+from src.infrastructure.orientation import OrientationPrior, find_text_dense_region
+from src.infrastructure.result_cache import ResultCache, hash_bytes, fingerprint
+from src.infrastructure.ocr_result import OcrResult, STATUS_OK, STATUS_EMPTY, STATUS_ERROR
+from src.infrastructure.image_ingest import read_file, decode, EXIF_ORIENTATION_NORMAL
+from src.infrastructure.page_refs import is_document, split_page_ref, PDF_EXTENSIONS
+from src.infrastructure.documents import expand_pages, render_page, pdf_supported, MISSING_PDF_SUPPORT_MESSAGE
 
 # --- Tipos de Datos ---
 ColorRange = Dict[str, Tuple[np.ndarray, np.ndarray]]
 
+# Longitud mínima del texto para aceptar una estrategia de página completa
+MIN_FALLBACK_TEXT_LENGTH = 15
+# Estrategias de página completa (ver _extract_full_page_robust): tope de hilos
+FULL_PAGE_STRATEGY_COUNT = 4
+
+# Mensajes devueltos como texto cuando no hay resultado
+NO_TEXT_MESSAGE = "No se encontró texto legible en la imagen (Intento fallido en todos los modos)."
+LOAD_ERROR_MESSAGE = "Error: No se pudo cargar la imagen (formato no soportado o ruta inválida)."
+
+# Encabezado del texto de cada página al combinar un documento
+PAGE_HEADER_TEMPLATE = "===== Página {page} ====="
+
+# Subir cuando un cambio en el código altere el texto extraído (invalida la caché)
+PIPELINE_VERSION = 2
+
+
+@lru_cache(maxsize=16)
+def _stat_document_hash(path: str, size: int, mtime_ns: int) -> str:
+    return hash_bytes(read_file(path))
+
+
+def _document_hash(path: str) -> str:
+    """Hash del contenido de un documento, calculado una vez por versión del archivo (no por página)."""
+    stat = os.stat(path)
+    return _stat_document_hash(path, stat.st_size, stat.st_mtime_ns)
+
+
 # --- Protocolo ---
 class OcrServiceProtocol(Protocol):
     """Define el contrato que cualquier servicio de OCR debe cumplir."""
@@ -23,33 +73,18 @@ class OcrService:
     """
     Servicio OCR que detecta texto en zonas resaltadas con color.
     Incluye detección automática del ejecutable de Tesseract.
+    La instrumentación (tramos, contadores y eventos) se configura con
+    config.trace_path / metrics_path o pasando una Instrumentation propia.
     """
-    DEBUG = False  # Modo de prueba desactivado para producción
-
-    def __init__(self):
-        # Rango HSV de cada color de resaltador
-        # HSV: Hue (0-180), Saturation (0-255), Value (0-255)
-        # Rangos calibrados basados en análisis de imágenes reales de documentos
-        # Rango HSV de cada color de resaltador
-        # HSV: Hue (0-180), Saturation (0-255), Value (0-255)
-        # Rangos calibrados para ser EXCLUSIVOS y evitar solapamientos.
-        # Saturation Min subido a 50 para ignorar sombras grises y blancos sucios.
-        self.color_ranges: ColorRange = {
-            # Naranja: 0-18 (Antes 0-25)
-            "naranja": (np.array([0, 50, 80]), np.array([18, 255, 255])),
-            # Amarillo: 19-35 (Antes 22-45, evitando verde)
-            "amarillo": (np.array([19, 50, 120]), np.array([35, 255, 255])),
-            # Verde: 36-90 (Antes 35-85, rango principal)
-            "verde": (np.array([36, 50, 120]), np.array([90, 255, 255])),
-            # Celeste: 91-110
-            "celeste": (np.array([91, 50, 120]), np.array([110, 255, 255])),
-            # Azul: 111-125
-            "azul": (np.array([111, 50, 120]), np.array([125, 255, 255])),
-            # Violeta: 126-160
-            "violeta": (np.array([126, 50, 120]), np.array([160, 255, 255])),
-            # Rosa: 161-180
-            "rosa": (np.array([161, 50, 120]), np.array([180, 255, 255])),
-        }
+
+    def __init__(self, config: Optional[OcrConfig] = None, instrumentation: Optional[Instrumentation] = None):
+        self.config = config or OcrConfig()
+        self.instrumentation = instrumentation or instrumentation_from_config(self.config)
+
+        # Rango HSV de cada color de resaltador (ver color_analysis)
+        self.color_ranges: ColorRange = dict(HIGHLIGHT_COLOR_RANGES)
+        # Los rangos se compilan una sola vez en tablas de consulta
+        self.color_classifier = ColorClassifier(self.color_ranges)
 
         # --- DETECCIÓN AUTOMÁTICA DE TESSERACT ---
         posibles_rutas = [
@@ -59,61 +94,145 @@ class OcrService:
             os.path.join(os.path.dirname(__file__), "..", "..", "Tesseract-OCR", "tesseract.exe"),
         ]
 
-        for ruta in posibles_rutas:
-            ruta_absoluta = os.path.abspath(ruta)
-            if os.path.exists(ruta_absoluta):
-                pytesseract.pytesseract.tesseract_cmd = ruta_absoluta
-                print(f"✅ Tesseract encontrado en: {ruta_absoluta}")
-                break
+        # La ubicación y la versión se recuerdan entre arranques
+        location = locate_tesseract(posibles_rutas)
+        tesseract_cmd = location.cmd
+        if tesseract_cmd:
+            self.instrumentation.event("tesseract_found", cmd=tesseract_cmd)
         else:
-            print("⚠️ No se encontró Tesseract. Coloca la carpeta 'Tesseract-OCR' junto al .exe o instálalo en Windows.")
+            self.instrumentation.event("tesseract_missing", candidates=posibles_rutas)
+            print("⚠️ No se encontró Tesseract. Coloca la carpeta 'Tesseract-OCR' junto al .exe o instálalo en Windows.", file=sys.stderr)
+
+        # Motor OCR persistente: instancias de Tesseract reutilizadas entre
+        # imágenes e hilos (los modelos se cargan una vez por instancia).
+        self.engine = TesseractEngine(tesseract_cmd=tesseract_cmd, pool_size=self.config.engine_pool_size,
+                                      known_versions=location.versions, instrumentation=self.instrumentation)
+        self._tesseract_cmd = tesseract_cmd
+
+        # Idioma fijo de la configuración o elegido en cada lote (ver begin_batch)
+        self.language_selector: Optional[LanguageSelector] = None
+        if self.config.language == LANGUAGE_AUTO:
+            self.language_selector = LanguageSelector(DEFAULT_LANG)
+            self.engine.select_model(DEFAULT_LANG, self.config.model_variant)
+        else:
+            self.engine.select_model(self.config.language, self.config.model_variant)
+
+        # Orientación dominante del lote en curso (ver begin_batch)
+        self.orientation_prior = OrientationPrior()
+
+        # Hilos para ejecutar en paralelo las estrategias de página completa
+        self._strategy_executor: Optional[ThreadPoolExecutor] = None
+        self._strategy_executor_lock = threading.Lock()
+        # Filtrado de ruido (perfil "rapido" / "equilibrado" / "calidad", presupuesto opcional)
+        self.denoiser = Denoiser(self.config.preprocess_profile, self.config.preprocess_budget_seconds)
+        # Qué estrategia suele funcionar con estos documentos (ver strategy_stats)
+        self.strategy_stats: Optional[StrategyStats] = None
+        if self.config.adaptive_fallback:
+            self.strategy_stats = StrategyStats(self.config.strategy_stats_path)
+
+        # Caché persistente de resultados (se consulta antes de decodificar)
+        self.cache: Optional[ResultCache] = None
+        # Huella por configuración efectiva (ver _cache_key)
+        self._cache_fingerprints: dict[tuple, str] = {}
+        if self.config.use_cache:
+            try:
+                self.cache = ResultCache(self.config.cache_path, self.config.cache_max_bytes)
+            except Exception as e:
+                print(f"⚠️ No se pudo abrir la caché de resultados: {e}", file=sys.stderr)
+
+    @property
+    def highlight_mode(self) -> str:
+        """Modo de extracción en uso: el de la configuración o el que conviene al backend de Tesseract."""
+        if self.config.highlight_mode is not None:
+            return self.config.highlight_mode
+        return HIGHLIGHT_MODE_REGIONS if self.engine.persistent else HIGHLIGHT_MODE_COMPOSITE
+
+    def begin_batch(self):
+        """Reinicia el estado que se aprende a lo largo de un lote."""
+        self.orientation_prior.reset()
+        if self.strategy_stats is not None:
+            self.strategy_stats.begin_batch()
+        if self.language_selector is not None:
+            # Las primeras páginas del lote se vuelven a leer con todos los idiomas
+            self.language_selector.reset()
+            self.engine.select_model(self.language_selector.language, self.config.model_variant)
 
     def correct_orientation(self, image: np.ndarray) -> np.ndarray:
         """
         Detecta la orientación de la imagen y la rota si es necesario.
         """
+        with self.instrumentation.span("orientation"):
+            proxy = make_analysis_proxy(image, self.config.analysis_max_pixels)
+            return self._rotate(image, self.detect_rotation(proxy))
+
+    def detect_rotation(self, image: np.ndarray, exif_orientation: Optional[int] = None) -> int:
+        """
+        Devuelve la rotación horaria (0, 90, 180, 270) que endereza la imagen.
+        Orden de resolución, de más barato a más caro:
+        1. Etiqueta EXIF que indica un giro (el decodificador ya lo aplicó).
+           La etiqueta 1 ("normal") la escriben casi todas las cámaras aunque la
+           foto se haya tomado de costado, así que no evita OSD.
+        2. Orientación dominante del lote, si es estable.
+        3. OSD sobre el recorte con más texto (y sobre la imagen entera si falla).
+        OSD no necesita resolución completa: se le pasa el proxy de análisis.
+        """
+        if exif_orientation not in (None, EXIF_ORIENTATION_NORMAL) and self.config.trust_exif_orientation:
+            return 0
+
+        if self.config.use_orientation_prior:
+            prior_angle = self.orientation_prior.dominant()
+            if prior_angle is not None:
+                return prior_angle
+
         try:
             # Usamos Tesseract OSD (Orientation and Script Detection)
-            # image_to_osd devuelve info como: "Rotate: 90\nOrientation in degrees: 90\n..."
-            osd_data = pytesseract.image_to_osd(image)
-            
-            rotation_angle = 0
-            # Parsear la salida texto de OSD
-            for line in osd_data.splitlines():
-                if "Rotate:" in line:
-                    rotation_angle = int(line.split(":")[1].strip())
-                    break
-            
-            if rotation_angle == 0:
-                return image
-
-            print(f"🔄 Auto-rotación detectada: {rotation_angle}°")
-
-            # Rotar la imagen según el ángulo detectado
-            if rotation_angle == 90:
-                image = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
-            elif rotation_angle == 180:
-                image = cv2.rotate(image, cv2.ROTATE_180)
-            elif rotation_angle == 270:
-                image = cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+            # El motor devuelve el valor "Rotate" de OSD: la rotación horaria necesaria
+            x, y, w, h = find_text_dense_region(image)
+            try:
+                rotation_angle, confidence = self.engine.detect_orientation(image[y:y + h, x:x + w])
+            except Exception:
+                # Recorte con poco texto para OSD: se intenta con la imagen completa
+                rotation_angle, confidence = self.engine.detect_orientation(image)
+            self.orientation_prior.record(rotation_angle, confidence)
             
-            return image
+            if rotation_angle != 0:
+                self.instrumentation.event("auto_rotation", angle=rotation_angle, confidence=confidence)
+            return rotation_angle
 
         except Exception as e:
             # Si falla OSD (ej. imagen sin suficiente texto para detectar orientación),
             # devolvemos la original sin cambios.
-            # print(f"Info: No se pudo detectar orientación ({e})")
-            return image
+            self.instrumentation.event("osd_failed", error=str(e))
+            return 0
+
+    def _rotate(self, image: np.ndarray, rotation_angle: int) -> np.ndarray:
+        """Rota la imagen según el ángulo detectado."""
+        if rotation_angle == 90:
+            image = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+        elif rotation_angle == 180:
+            image = cv2.rotate(image, cv2.ROTATE_180)
+        elif rotation_angle == 270:
+            image = cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        return image
+
+    def analyze_image(self, image: np.ndarray, proxy: Optional[np.ndarray] = None) -> ImageAnalysis:
+        """
+        Clasifica todos los píxeles del proxy por color en una sola pasada.
+        Si no se indica proxy, se genera a partir de la imagen.
+        """
+        if proxy is None:
+            proxy = make_analysis_proxy(image, self.config.analysis_max_pixels)
+        return ImageAnalysis(image, self.color_classifier, proxy)
 
-    def detect_active_colors(self, image: np.ndarray) -> list[str]:
+    def detect_active_colors(self, image: np.ndarray, analysis: Optional[ImageAnalysis] = None) -> list[str]:
         """
         Analiza la imagen para determinar qué colores de resaltado están presentes.
         Usa un umbral dinámico basado en el tamaño de la imagen y un umbral relativo
         para filtrar falsos positivos (ruido).
         """
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        height, width, _ = image.shape
-        total_pixels = height * width
+        if analysis is None:
+            analysis = self.analyze_image(image)
+        total_pixels = analysis.total_pixels
         
         # Umbral 1: Área mínima absoluta (0.2% de la imagen)
         # Para una foto de 12MP (4000x3000), esto es ~24,000 píxeles.
@@ -122,13 +241,22 @@ class OcrService:
         min_pixels_absolute = int(total_pixels * MIN_AREA_PERCENT) # Aumentamos umbral significativamente
 
         detected_stats = {}
+        # Núcleo 5x5 a resolución completa, escalado al tamaño del proxy
+        kernel_size = analysis.scale_length(5)
+        # Dos dilataciones kxk hacen crecer cada píxel como mucho hasta (2k-1)x(2k-1)
+        MAX_GROWTH = (2 * kernel_size - 1) ** 2
+
+        for color_name in self.color_ranges:
+            raw_count = analysis.pixel_count(color_name)
+            # Si ni con el crecimiento máximo supera el umbral, no hace falta dilatar
+            if raw_count * MAX_GROWTH <= min_pixels_absolute:
+                continue
 
-        for color_name, (lower, upper) in self.color_ranges.items():
-            mask = cv2.inRange(hsv_image, lower, upper)
+            mask = analysis.mask(color_name)
             
             # Dilatar máscara para conectar puntos dispersos antes de contar
             # Revertido a solo dilatación simple para no perder detalles finos
-            kernel = np.ones((5,5), np.uint8)
+            kernel = np.ones((kernel_size, kernel_size), np.uint8)
             # mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel) # ELIMINADO: Comía demasiado texto
             mask = cv2.dilate(mask, kernel, iterations=2)
 
@@ -149,8 +277,8 @@ class OcrService:
         for color, count in detected_stats.items():
             if count >= max_pixels * RELATIVE_THRESHOLD:
                 final_colors.append(color)
-            elif self.DEBUG:
-                print(f"⚠️ Color '{color}' descartado por ser minoritario ({count} px vs {max_pixels} px)")
+            else:
+                self.instrumentation.event("color_discarded", color=color, pixels=count, dominant_pixels=max_pixels)
 
         return final_colors
 
@@ -160,62 +288,247 @@ class OcrService:
         1. Intenta detectar colores de resaltado.
         2. Si encuentra colores, extrae el texto de esas zonas.
         3. Si NO encuentra colores, escanea toda la página con estrategia robusta (Smart Fallback).
+        Los documentos de varias páginas (TIFF / PDF) devuelven el texto de todas, en orden.
+        """
+        return self.extract_result(image_path, color).text
+
+    def extract_result(self, image_path: str, color: str = "auto") -> OcrResult:
+        """
+        Igual que extract_text_from_image, con colores detectados, tiempos por etapa y estado.
+        Acepta referencias a una página ("documento.pdf#page=3"); un documento
+        entero se procesa página a página y se devuelve combinado.
         """
+        source_path, page = split_page_ref(image_path)
+        if page is None and is_document(image_path):
+            pages = expand_pages([image_path])
+            if pages != [image_path]:
+                return self._combine_pages(image_path, (self.extract_result(ref, color) for ref in pages))
+
+        # Tramo raíz de la traza: todo lo que cuesta esta página cuelga de él
+        with self.instrumentation.span("page", file=os.path.basename(image_path)) as span:
+            result = self._extract_single(image_path, source_path, page, color)
+            span.set(status=result.status, cached=result.cached)
+        self._observe_language(result)
+        return result
+
+    def _observe_language(self, result: OcrResult):
+        """Con el texto de las primeras páginas del lote se elige el idioma del resto."""
+        selector = self.language_selector
+        if selector is None or selector.decided or result.status != STATUS_OK:
+            return
+        lang = selector.observe(result.text)
+        if lang is not None:
+            self.engine.select_model(lang, self.config.model_variant)
+        if selector.decided:
+            self.instrumentation.event("language_selected", lang=self.engine.lang, pages=selector.pages,
+                                       evidence=dict(selector.evidence))
+
+    def _extract_single(self, image_path: str, source_path: str, page: Optional[int], color: str) -> OcrResult:
+        """Una imagen o una página de documento: lectura, caché, decodificación y pipeline."""
+        result = OcrResult(path=source_path, text="", page=page)
+        timings = result.timings
+        start = time.perf_counter()
         try:
-            # image = cv2.imread(image_path) # Reemplazado por versión safe para unicode
-            image = self._read_image_safe(image_path)
+            if page is None:
+                stream = self._read_bytes(image_path)
+                loaded = stream is not None
+                if loaded:
+                    self.instrumentation.count("bytes_read", stream.nbytes)
+            else:
+                # Las páginas no leen el archivo entero: se decodifican directamente del documento
+                stream, loaded = None, os.path.isfile(source_path)
+            timings["read"] = time.perf_counter() - start
             
-            if image is None:
+            if not loaded:
+                result.status = STATUS_ERROR
                 # Intento de debug adicional: verificar si el archivo existe
-                if not os.path.exists(image_path):
-                     return f"Error: No se encuentra el archivo en la ruta: {image_path}"
-                return "Error: No se pudo cargar la imagen (formato no soportado o ruta inválida)."
+                if not os.path.exists(source_path):
+                     result.text = f"Error: No se encuentra el archivo en la ruta: {source_path}"
+                else:
+                    result.text = LOAD_ERROR_MESSAGE
+                return result
+
+            # Caché por contenido: se consulta antes de decodificar la imagen
+            cache_key = None
+            if self.cache is not None:
+                content_hash = hash_bytes(stream) if page is None else _document_hash(source_path)
+                cache_key = self._cache_key(content_hash, color, page)
+            if cache_key is not None:
+                entry = self.cache.get_entry(cache_key)
+                self.instrumentation.count("cache_hits" if entry is not None else "cache_misses")
+                if entry is not None:
+                    result.text, meta = entry
+                    result.colors = meta.get("colors")
+                    result.scale = meta.get("scale", 1.0)
+                    result.status = STATUS_EMPTY if result.text == NO_TEXT_MESSAGE else STATUS_OK
+                    result.cached = True
+                    return result
+
+            # image = cv2.imread(image_path) # Reemplazado por versión safe para unicode
+            stage_start = time.perf_counter()
+            if page is None:
+                image, exif_orientation, result.scale = self._decode_image(stream)
+            else:
+                with self.instrumentation.span("decode", label="page", page=page):
+                    image, exif_orientation, result.scale = render_page(source_path, page, self.config.target_dpi)
+            timings["decode"] = time.perf_counter() - stage_start
+            if image is not None:
+                self.instrumentation.count("bytes_decoded", image.nbytes)
+            if image is None:
+                result.status, result.text = STATUS_ERROR, LOAD_ERROR_MESSAGE
+                if image_path.lower().endswith(PDF_EXTENSIONS) and not pdf_supported():
+                    # PDF sin expandir en páginas: falta el lector opcional
+                    result.text = f"Error: {MISSING_PDF_SUPPORT_MESSAGE}"
+                return result
+
+            result.text, result.colors = self._extract_text(image, exif_orientation, timings)
+            result.status = STATUS_EMPTY if result.text == NO_TEXT_MESSAGE else STATUS_OK
+            if cache_key is not None:
+                self.cache.put(cache_key, result.text, {"colors": result.colors, "scale": result.scale})
+            return result
 
-            # --- Corregir orientación ---
-            image = self.correct_orientation(image)
-            # ---------------------------
+        except Exception as e:
+            result.status, result.text = STATUS_ERROR, f"Ocurrió un error considerable durante el OCR: {e}"
+            return result
+        finally:
+            timings["total"] = time.perf_counter() - start
 
-            # Paso 1: Intentar detección de colores (Modo Resaltador)
-            active_colors = self.detect_active_colors(image)
-            
+    def extract_document(self, document_path: str, color: str = "auto") -> Iterator[OcrResult]:
+        """
+        Resultados de cada página de un documento, en orden y de a una: cada
+        página se decodifica solo cuando se pide el siguiente resultado.
+        Para repartir las páginas entre procesos, usar expand_pages con BatchEngine.
+        """
+        for ref in expand_pages([document_path]):
+            yield self.extract_result(ref, color)
+
+    def _combine_pages(self, document_path: str, page_results: Iterable[OcrResult]) -> OcrResult:
+        """Une los resultados de las páginas en uno solo, con el texto de cada página encabezado."""
+        result = OcrResult(path=document_path, text="", status=STATUS_EMPTY, colors=[])
+        texts = []
+        for page_result in page_results:
+            for stage, seconds in page_result.timings.items():
+                result.timings[stage] = result.timings.get(stage, 0.0) + seconds
+            if page_result.status == STATUS_ERROR:
+                result.status = STATUS_ERROR
+            elif page_result.status == STATUS_OK and result.status == STATUS_EMPTY:
+                result.status = STATUS_OK
+            for color_name in page_result.colors or []:
+                if color_name not in result.colors:
+                    result.colors.append(color_name)
+            texts.append(f"{PAGE_HEADER_TEMPLATE.format(page=page_result.page)}\n{page_result.text}")
+        result.text = "\n\n".join(texts)
+        return result
+
+    def invalidate_cache(self, image_path: Optional[str] = None) -> int:
+        """
+        Borra de la caché los resultados de una imagen (en todas las
+        configuraciones) o, sin argumentos, la caché completa.
+        En los documentos se borran todas sus páginas.
+        """
+        if self.cache is None:
+            return 0
+        if image_path is None:
+            return self.cache.invalidate()
+        stream = self._read_bytes(split_page_ref(image_path)[0])
+        return self.cache.invalidate(hash_bytes(stream)) if stream is not None else 0
+
+    def _cache_key(self, content_hash: str, color: str, page: Optional[int] = None) -> str:
+        # La huella usa los valores efectivos, no los "automáticos" de la configuración:
+        # con idioma "auto" cuenta el modelo elegido para el lote en curso
+        resolved = {"highlight_mode": self.highlight_mode, "language": self.engine.lang}
+        resolved_key = tuple(resolved.values())
+        cache_fingerprint = self._cache_fingerprints.get(resolved_key)
+        if cache_fingerprint is None:
+            ranges = {name: (lower.tolist(), upper.tolist()) for name, (lower, upper) in self.color_ranges.items()}
+            version = self.engine.version()
+            if version != UNKNOWN_VERSION:
+                remember_version(self._tesseract_cmd, self.engine.backend, version)
+            cache_fingerprint = self._cache_fingerprints[resolved_key] = fingerprint(
+                PIPELINE_VERSION, ranges, version, {**self.config.pipeline_fields(), **resolved}
+            )
+        # Las páginas comparten el hash del documento: invalidarlo las borra todas
+        suffix = f":page={page}" if page is not None else ""
+        return ResultCache.make_key(content_hash, f"{cache_fingerprint}:{color}{suffix}")
+
+    def _extract_text(self, image: np.ndarray, exif_orientation: Optional[int], timings: Optional[dict] = None) -> tuple[str, list]:
+        """
+        Pipeline completo sobre una imagen ya decodificada. Devuelve el texto y
+        los colores de los que se extrajo (vacío si se leyó la página completa).
+        """
+        timings = {} if timings is None else timings
+        stage_start = time.perf_counter()
+        # Proxy reducido para OSD, detección de color y geometría de máscaras
+        proxy = make_analysis_proxy(image, self.config.analysis_max_pixels)
+
+        # --- Corregir orientación ---
+        with self.instrumentation.span("orientation"):
+            rotation_angle = self.detect_rotation(proxy, exif_orientation)
+            image, proxy = self._rotate(image, rotation_angle), self._rotate(proxy, rotation_angle)
+        # ---------------------------
+        timings["orientation"] = time.perf_counter() - stage_start
+
+        # Paso 1: Intentar detección de colores (Modo Resaltador)
+        # El análisis de color se hace una vez y se reutiliza en la extracción
+        stage_start = time.perf_counter()
+        with self.instrumentation.span("detect_colors") as span:
+            analysis = self.analyze_image(image, proxy)
+            active_colors = self.detect_active_colors(image, analysis)
+            span.set(colors=active_colors)
+        timings["analysis"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        try:
             if active_colors:
-                text_from_colors = self._extract_highlighted_text(image, active_colors)
+                text_from_colors = self._extract_highlighted_text(image, active_colors, analysis)
                 if text_from_colors:
-                    return text_from_colors
+                    return text_from_colors, active_colors
                 # Si detectó colores pero no pudo leer texto, caer al fallback
-                if self.DEBUG: print("⚠️ Colores detectados pero sin texto legible. Intentando escaneo completo...")
+                self.instrumentation.event("highlight_without_text", colors=active_colors)
 
             # Paso 2: Fallback a Escaneo Completo (Modo "Sin Filtro" Robusto)
-            return self._extract_full_page_robust(image)
-
-        except Exception as e:
-            return f"Ocurrió un error considerable durante el OCR: {e}"
+            with self.instrumentation.span("fallback"):
+                return self._extract_full_page_robust(image), []
+        finally:
+            timings["ocr"] = time.perf_counter() - stage_start
 
-    def _extract_highlighted_text(self, image: np.ndarray, active_colors: list) -> str:
+    def _extract_highlighted_text(self, image: np.ndarray, active_colors: list, analysis: Optional[ImageAnalysis] = None) -> str:
         """Extrae texto solo de las zonas de los colores especificados."""
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        _, thresh_image = cv2.threshold(gray_image, 128, 255, cv2.THRESH_BINARY_INV)
+        if analysis is None:
+            analysis = self.analyze_image(image)
         
-        kernel_connect = np.ones((3, 15), np.uint8) # Para conectar letras horizontalmente
-        kernel_clean = np.ones((5, 5), np.uint8)    # Para eliminar ruido
+        # Para conectar letras horizontalmente (3x15 a resolución completa, escalado al proxy)
+        kernel_connect = np.ones((analysis.scale_length(3), analysis.scale_length(15)), np.uint8)
 
-        config = '-l spa+eng --psm 6'
-
-        final_output = []
+        dilated_masks = {}
         for color_name in active_colors:
-            lower, upper = self.color_ranges[color_name]
-            mask = cv2.inRange(hsv_image, lower, upper)
+            mask = analysis.mask(color_name)
             
             # 1. Limpieza de ruido ELIMINADA para recuperar calidad de texto
-            # cleaned_mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel_clean)
             
             # 2. Solo Dilatación para cubrir letras (usamos la mask original)
-            dilated_mask = cv2.dilate(mask, kernel_connect, iterations=3)
-            
-            final_image_part = cv2.bitwise_and(thresh_image, thresh_image, mask=dilated_mask)
-            
-            text_part = pytesseract.image_to_string(final_image_part, config=config).strip()
+            with self.instrumentation.span("mask", label=color_name):
+                dilated_masks[color_name] = cv2.dilate(mask, kernel_connect, iterations=3)
+
+        if self.highlight_mode == HIGHLIGHT_MODE_COMPOSITE:
+            # Un único OCR para todos los colores
+            with self.instrumentation.span("ocr_colors", label="compuesto"):
+                texts_by_color = self._ocr_highlight_composite(analysis, dilated_masks)
+        else:
+            texts_by_color = {}
+            for color_name, dilated_mask in dilated_masks.items():
+                with self.instrumentation.span("ocr_color", label=color_name):
+                    if self.highlight_mode == HIGHLIGHT_MODE_REGIONS:
+                        texts_by_color[color_name] = self._ocr_highlight_regions(analysis, color_name, dilated_mask)
+                    else:
+                        thresh_image = analysis.thresh
+                        full_mask = analysis.to_full_mask(dilated_mask)
+                        final_image_part = cv2.bitwise_and(thresh_image, thresh_image, mask=full_mask)
+                        texts_by_color[color_name] = self.engine.image_to_string(final_image_part, psm=6).strip()
+
+        final_output = []
+        for color_name in active_colors:
+            text_part = texts_by_color.get(color_name, "")
             
             # Filtrar basura muy corta (menos de 3 letras suele ser ruido)
             if text_part and len(text_part) > 3:
@@ -226,38 +539,199 @@ class OcrService:
             return "\n\n" + ("-"*30) + "\n\n".join(final_output)
         return ""
 
+    def _ocr_highlight_regions(self, analysis: ImageAnalysis, color_name: str, dilated_mask: np.ndarray) -> str:
+        """
+        OCR solo de los bloques resaltados (componentes conexos de la máscara),
+        de arriba hacia abajo. Tesseract ya no analiza el lienzo negro de la página.
+        """
+        texts = []
+        for crop in self._highlight_crops(analysis, color_name, dilated_mask):
+            text = self.engine.image_to_string(crop, psm=6).strip()
+            if text:
+                texts.append(text)
+        return "\n".join(texts)
+
+    def _ocr_highlight_composite(self, analysis: ImageAnalysis, dilated_masks: dict) -> dict:
+        """
+        Apila los recortes de todos los colores en un lienzo compuesto, lo
+        reconoce con una sola llamada y reparte cada palabra a su color según
+        la posición de su caja.
+        """
+        crops = []
+        for color_name, dilated_mask in dilated_masks.items():
+            for block_index, crop in enumerate(self._highlight_crops(analysis, color_name, dilated_mask)):
+                crops.append(((color_name, block_index), crop))
+
+        # (color, bloque) -> {línea: [palabras]}, respetando el orden de lectura
+        lines_by_crop: dict = {key: {} for key, _ in crops}
+        for canvas, placements in pack_vertically(crops):
+            for word in self.engine.image_to_data(canvas, psm=6):
+                key = locate_placement(placements, word.top + word.height / 2)
+                if key is not None:
+                    lines_by_crop[key].setdefault(word.line, []).append(word.text)
+
+        texts_by_color: dict = {color_name: [] for color_name in dilated_masks}
+        for (color_name, _), lines in lines_by_crop.items():
+            block_text = "\n".join(" ".join(words) for words in lines.values())
+            if block_text:
+                texts_by_color[color_name].append(block_text)
+        return {color_name: "\n".join(blocks) for color_name, blocks in texts_by_color.items()}
+
+    def _highlight_crops(self, analysis: ImageAnalysis, color_name: str, dilated_mask: np.ndarray) -> list[np.ndarray]:
+        """
+        Recortes enmascarados de cada bloque resaltado, de arriba hacia abajo.
+        Los bloques se buscan en el proxy y se recortan de la imagen original;
+        la máscara del recorte se recalcula a resolución completa.
+        """
+        kernel_connect = np.ones((3, 15), np.uint8)
+        crops = []
+        for box in find_highlight_blocks(dilated_mask):
+            x, y, w, h = analysis.to_full_box(box)
+            if analysis.is_downscaled:
+                crop_mask = cv2.dilate(analysis.crop_mask(color_name, (x, y, w, h)), kernel_connect, iterations=3)
+            else:
+                crop_mask = dilated_mask[y:y + h, x:x + w]
+            thresh_crop = analysis.crop_thresh((x, y, w, h))
+            crops.append(cv2.bitwise_and(thresh_crop, thresh_crop, mask=crop_mask))
+        return crops
+
     def _extract_full_page_robust(self, image: np.ndarray) -> str:
         """Intenta leer la página completa usando múltiples estrategias de pre-procesamiento."""
         configs_to_try = [
             # Intento 1: Pre-procesamiento AVANZADO (Mejor para sombras/curvatura)
-            ("Avanzado", lambda img: self._preprocess_advanced(img), '-l spa+eng --psm 3'),
+            ("Avanzado", lambda img: self._preprocess_advanced(img), 3),
             # Intento 2: Pre-procesamiento MÍNIMO (Mejor para luz uniforme)
-            ("Mínimo", lambda img: self._preprocess_minimal(img), '-l spa+eng --psm 3'),
+            ("Mínimo", lambda img: self._preprocess_minimal(img), 3),
             # Intento 3: Raw (Sin tocar)
-            ("Raw", lambda img: img, '-l spa+eng --psm 3'),
+            ("Raw", lambda img: img, 3),
              # Intento 4: PSM 6 Fallback
-            ("Bloque", lambda img: self._preprocess_minimal(img), '-l spa+eng --psm 6')
+            ("Bloque", lambda img: self._preprocess_minimal(img), 6)
         ]
 
-        for name, preprocess_func, cfg in configs_to_try:
+        if self.strategy_stats is not None:
+            by_name = {strategy[0]: strategy for strategy in configs_to_try}
+            configs_to_try = [by_name[name] for name in self.strategy_stats.rank(list(by_name))]
+            self.instrumentation.event("strategy_order", order=[strategy[0] for strategy in configs_to_try])
+
+        if self.config.fallback_policy == FALLBACK_SEQUENTIAL:
+            return self._run_strategies_sequential(image, configs_to_try)
+
+        preferred = None
+        if self.strategy_stats is not None and self.config.fallback_policy == FALLBACK_FIRST_ACCEPTABLE:
+            preferred = self.strategy_stats.preferred([strategy[0] for strategy in configs_to_try])
+        if preferred is not None:
+            # El lote avala una estrategia: se prueba sola y el resto solo si falla
             try:
-                processed_img = preprocess_func(image)
-                text = pytesseract.image_to_string(processed_img, config=cfg).strip()
-                if len(text) > 15: # Umbral mínimo de éxito
-                    if self.DEBUG: print(f"✅ Éxito con estrategia: {name}")
+                return self._run_strategies_sequential(image, [by_name[preferred]], raise_on_miss=True)
+            except Exception:
+                configs_to_try = [strategy for strategy in configs_to_try if strategy[0] != preferred]
+        return self._run_strategies_parallel(image, configs_to_try)
+
+    def strategy_statistics(self) -> dict:
+        """Estadísticas de éxito de las estrategias de página completa (vacías si no se aprenden)."""
+        if self.strategy_stats is None:
+            return {}
+        return self.strategy_stats.snapshot()
+
+    def _run_strategies_sequential(self, image: np.ndarray, configs_to_try: list, raise_on_miss: bool = False) -> str:
+        """Prueba las estrategias una tras otra, en orden de prioridad."""
+        last_error, failed_count = None, 0
+        for name, preprocess_func, psm in configs_to_try:
+            try:
+                with self.instrumentation.span("strategy", label=name) as span:
+                    processed_img = preprocess_func(image)
+                    text = self.engine.image_to_string(processed_img, psm=psm).strip()
+                    accepted = len(text) > MIN_FALLBACK_TEXT_LENGTH # Umbral mínimo de éxito
+                    span.set(accepted=accepted)
+                self._record_strategy(name, accepted)
+                if accepted:
+                    self.instrumentation.event("strategy_accepted", strategy=name)
                     return text
             except Exception as e:
-                if self.DEBUG: print(f"⚠️ Falló estrategia {name}: {e}")
+                self.instrumentation.event("strategy_failed", strategy=name, error=str(e))
+                last_error, failed_count = e, failed_count + 1
                 continue
         
-        return "No se encontró texto legible en la imagen (Intento fallido en todos los modos)."
+        if failed_count == len(configs_to_try):
+            # Ninguna estrategia llegó a ejecutar el OCR (p. ej. falta Tesseract):
+            # es un error, no una página sin texto (y no debe quedar en caché)
+            raise last_error
+        if raise_on_miss:
+            raise LookupError("Ninguna estrategia superó el umbral de texto.")
+        return NO_TEXT_MESSAGE
+
+    def _run_strategies_parallel(self, image: np.ndarray, configs_to_try: list) -> str:
+        """
+        Lanza todas las estrategias a la vez.
+        - "primera_aceptable": gana la primera que supera el umbral y el resto se cancela.
+        - "mejor_confianza": se esperan todas y gana la de mayor confianza media.
+        """
+        winner_found = threading.Event()
+
+        def run_strategy(name, preprocess_func, psm):
+            with self.instrumentation.span("strategy", label=name) as span:
+                processed_img = preprocess_func(image)
+                if winner_found.is_set():
+                    # Otra estrategia ya ganó mientras se preprocesaba: no se paga el OCR
+                    span.set(skipped=True)
+                    return name, None, 0.0
+                text, confidence = self.engine.recognize(processed_img, psm=psm)
+                span.set(confidence=confidence)
+                return name, text.strip(), confidence
+
+        executor = self._get_strategy_executor()
+        # bind(): los tramos de cada estrategia cuelgan de la página aunque corran en otro hilo
+        futures = [executor.submit(self.instrumentation.bind(run_strategy), *strategy) for strategy in configs_to_try]
+        first_acceptable = self.config.fallback_policy == FALLBACK_FIRST_ACCEPTABLE
+        best_text, best_confidence = None, -1.0
+        last_error, failed_count = None, 0
+        try:
+            for future in as_completed(futures):
+                try:
+                    name, text, confidence = future.result()
+                except Exception as e:
+                    last_error, failed_count = e, failed_count + 1
+                    continue
+                if text is None:
+                    continue
+                self._record_strategy(name, len(text) > MIN_FALLBACK_TEXT_LENGTH)
+                if len(text) <= MIN_FALLBACK_TEXT_LENGTH:
+                    continue
+                if first_acceptable:
+                    self.instrumentation.event("strategy_accepted", strategy=name)
+                    return text
+                if confidence > best_confidence:
+                    best_text, best_confidence = text, confidence
+        finally:
+            winner_found.set()
+            for future in futures:
+                future.cancel()
+
+        if best_text is not None:
+            return best_text
+        if failed_count == len(configs_to_try):
+            raise last_error
+        return NO_TEXT_MESSAGE
+
+    def _record_strategy(self, name: str, success: bool):
+        if self.strategy_stats is not None:
+            self.strategy_stats.record(name, success)
+
+    def _get_strategy_executor(self) -> ThreadPoolExecutor:
+        # Se dimensiona por la configuración, no por la primera llamada (que
+        # puede traer menos estrategias si la preferida ya falló)
+        with self._strategy_executor_lock:
+            if self._strategy_executor is None:
+                max_workers = min(self.config.strategy_threads or FULL_PAGE_STRATEGY_COUNT, FULL_PAGE_STRATEGY_COUNT)
+                self._strategy_executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ocr-fallback")
+            return self._strategy_executor
 
     def _preprocess_advanced(self, image):
         """CLAHE + Denoise + Adaptive Threshold"""
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
         enhanced = clahe.apply(gray)
-        denoised = cv2.fastNlMeansDenoising(enhanced, None, 10, 7, 21)
+        denoised = self.denoiser.denoise(enhanced)
         binary = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
         return binary
 
@@ -271,14 +745,39 @@ class OcrService:
         Lee una imagen soportando rutas con caracteres Unicode/especiales en Windows.
         cv2.imread falla silenciosamente con rutas que tienen acentos o caracteres no ASCII.
         """
+        return self._load_image(path)[0]
+
+    def _load_image(self, path: str) -> tuple[Optional[np.ndarray], Optional[int]]:
+        """
+        Igual que _read_image_safe, pero devuelve también la orientación EXIF
+        (None si el archivo no la trae). IMREAD_COLOR ya aplica esa rotación.
+        """
+        stream = self._read_bytes(path)
+        if stream is None:
+            return None, None
+        return self._decode_image(stream)[:2]
+
+    def _read_bytes(self, path: str) -> Optional[np.ndarray]:
+        """Lee el archivo completo sin decodificarlo (admite rutas Unicode; los grandes se mapean en memoria)."""
         try:
-            # np.fromfile lee el archivo binario sin importar el nombre
-            stream = np.fromfile(path, dtype=np.uint8)
-            # cv2.imdecode decodifica el buffer de memoria a imagen OpenCV
-            image = cv2.imdecode(stream, cv2.IMREAD_COLOR)
-            return image
+            # np.fromfile / np.memmap leen el archivo binario sin importar el nombre
+            with self.instrumentation.span("read"):
+                return read_file(path)
         except Exception as e:
-            if self.DEBUG: print(f"Error en _read_image_safe: {e}")
+            self.instrumentation.event("read_error", path=path, error=str(e))
             return None
 
+    def _decode_image(self, stream: np.ndarray) -> tuple[Optional[np.ndarray], Optional[int], float]:
+        """
+        Decodifica a la resolución que necesita el OCR (config.target_dpi).
+        Devuelve la imagen, la orientación EXIF y la escala aplicada respecto del original.
+        """
+        try:
+            # cv2.imdecode decodifica el buffer de memoria a imagen OpenCV
+            with self.instrumentation.span("decode"):
+                return decode(stream, self.config.target_dpi)
+        except Exception as e:
+            self.instrumentation.event("decode_error", error=str(e))
+            return None, None, 1.0
+
 
@@ -0,0 +1,84 @@
+"""
+Módulo de infraestructura con las piezas para resolver la orientación de una
+página sin pagar un OSD completo por imagen: búsqueda de la zona con más texto
+(para hacer OSD solo sobre ese recorte) y una orientación dominante por lote.
+"""
+import threading
+from collections import Counter
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# Rejilla con la que se mide la densidad de texto y tamaño de la ventana elegida
+DENSITY_GRID = 8
+WINDOW_CELLS = 4
+
+# Confianza OSD a partir de la cual una detección cuenta para la orientación del lote
+MIN_PRIOR_CONFIDENCE = 5.0
+# Detecciones necesarias (y proporción que debe coincidir) para confiar en el lote
+MIN_PRIOR_SAMPLES = 3
+MIN_PRIOR_SHARE = 0.9
+# Aun con una orientación dominante, se vuelve a verificar con OSD cada N páginas
+PRIOR_RECHECK_EVERY = 10
+
+
+def find_text_dense_region(image: np.ndarray) -> tuple[int, int, int, int]:
+    """
+    Devuelve la caja (x, y, ancho, alto) de la ventana con mayor densidad de
+    bordes (texto). La ventana ocupa la mitad del ancho y del alto de la imagen.
+    """
+    height, width = image.shape[:2]
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    edges = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+    # Densidad media de bordes por celda de la rejilla
+    density = cv2.resize(edges, (DENSITY_GRID, DENSITY_GRID), interpolation=cv2.INTER_AREA).astype(np.float32)
+    window_sums = cv2.boxFilter(density, -1, (WINDOW_CELLS, WINDOW_CELLS), anchor=(0, 0),
+                                normalize=False, borderType=cv2.BORDER_CONSTANT)
+    # Solo ventanas que caben completas en la rejilla
+    valid = window_sums[:DENSITY_GRID - WINDOW_CELLS + 1, :DENSITY_GRID - WINDOW_CELLS + 1]
+    row, col = np.unravel_index(int(np.argmax(valid)), valid.shape)
+
+    cell_w, cell_h = width / DENSITY_GRID, height / DENSITY_GRID
+    x, y = int(col * cell_w), int(row * cell_h)
+    return x, y, int(WINDOW_CELLS * cell_w), int(WINDOW_CELLS * cell_h)
+
+
+class OrientationPrior:
+    """
+    Orientación dominante de las páginas ya procesadas en el lote actual.
+    Cuando es estable y con confianza alta permite saltarse el OSD.
+    """
+
+    def __init__(self):
+        self._angles: Counter = Counter()
+        self._skipped = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._angles.clear()
+            self._skipped = 0
+
+    def record(self, rotation_angle: int, confidence: float):
+        if confidence < MIN_PRIOR_CONFIDENCE:
+            return
+        with self._lock:
+            self._angles[rotation_angle] += 1
+
+    def dominant(self) -> Optional[int]:
+        """
+        Devuelve la orientación a reutilizar sin OSD, o None si hay que detectarla.
+        Cada PRIOR_RECHECK_EVERY páginas se fuerza una verificación.
+        """
+        with self._lock:
+            total = sum(self._angles.values())
+            if total < MIN_PRIOR_SAMPLES:
+                return None
+            angle, count = self._angles.most_common(1)[0]
+            if count / total < MIN_PRIOR_SHARE:
+                return None
+            self._skipped += 1
+            if self._skipped % PRIOR_RECHECK_EVERY == 0:
+                return None
+            return angle
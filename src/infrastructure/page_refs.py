@@ -0,0 +1,33 @@
+"""
+Módulo de infraestructura con las referencias a páginas de documentos TIFF y
+PDF: "documento.pdf#page=3" (numeración desde 1, como en los visores de PDF).
+
+Solo depende de la biblioteca estándar: la interfaz lo importa al arrancar
+sin cargar OpenCV (la lectura de las páginas está en documents).
+"""
+import re
+from typing import Optional
+
+TIFF_EXTENSIONS = ('.tif', '.tiff')
+PDF_EXTENSIONS = ('.pdf',)
+DOCUMENT_EXTENSIONS = TIFF_EXTENSIONS + PDF_EXTENSIONS
+
+_PAGE_REF_PATTERN = re.compile(r"^(?P<path>.+)#page=(?P<page>[1-9]\d*)$")
+
+
+def is_document(path: str) -> bool:
+    """True si el archivo puede tener varias páginas (TIFF o PDF)."""
+    return path.lower().endswith(DOCUMENT_EXTENSIONS)
+
+
+def page_ref(path: str, page: int) -> str:
+    """Referencia a una página (desde 1) de un documento."""
+    return f"{path}#page={page}"
+
+
+def split_page_ref(ref: str) -> tuple[str, Optional[int]]:
+    """(ruta del archivo, página) de una referencia; página None si es un archivo entero."""
+    match = _PAGE_REF_PATTERN.match(ref)
+    if match is None or not is_document(match.group("path")):
+        return ref, None
+    return match.group("path"), int(match.group("page"))
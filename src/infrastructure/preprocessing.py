@@ -0,0 +1,138 @@
+"""
+Módulo de infraestructura con el filtrado de ruido del pre-procesamiento
+"Avanzado", con un presupuesto de tiempo por imagen opcional.
+
+fastNlMeansDenoising es el paso más caro del pipeline (en una foto de 12MP
+tarda más que el propio OCR). Cada perfil elige cuánto de ese coste pagar:
+- "calidad":     NLM original (ventana de búsqueda 21). Es el predeterminado.
+- "equilibrado": NLM con ventana de búsqueda 11 (~3-4 veces más barato).
+- "rapido":      filtro de mediana, sin NLM.
+Solo si se fija un presupuesto y la estimación de tiempo lo supera, el NLM
+se aplica sobre la imagen reducida y, si ni así cabe, se usa la mediana. La
+estimación se mide en la máquina y depende de la carga, así que con
+presupuesto el resultado puede variar entre equipos; sin él es determinista.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from src.infrastructure.ocr_config import PREPROCESS_FAST, PREPROCESS_BALANCED, PREPROCESS_QUALITY
+
+# Intensidad y ventana de plantilla del NLM (las del pipeline original)
+NLM_STRENGTH = 10
+NLM_TEMPLATE_WINDOW = 7
+
+# Ventana de búsqueda de cada perfil (None = mediana, sin NLM)
+PROFILE_SEARCH_WINDOW = {PREPROCESS_FAST: None, PREPROCESS_BALANCED: 11, PREPROCESS_QUALITY: 21}
+
+# Por debajo de esta escala el NLM reducido pierde más de lo que gana
+MIN_DENOISE_SCALE = 0.5
+# Coste inicial estimado (segundos por píxel con ventana 21, un núcleo); se
+# corrige con cada medición real
+INITIAL_SECONDS_PER_PIXEL = 1.4e-6
+# Peso de cada medición nueva en la media móvil del coste
+COST_SMOOTHING = 0.3
+# Franjas por debajo de este alto no compensan el solapamiento
+MIN_TILE_HEIGHT = 128
+
+
+def nlm_overlap(search_window: int, template_window: int = NLM_TEMPLATE_WINDOW) -> int:
+    """Margen que necesita cada franja para que el NLM por franjas sea idéntico al completo."""
+    return search_window // 2 + template_window // 2
+
+
+def denoise_tiled(gray: np.ndarray, search_window: int, executor: Optional[ThreadPoolExecutor], tiles: int) -> np.ndarray:
+    """
+    NLM por franjas horizontales solapadas, en paralelo. Con el margen de
+    nlm_overlap el resultado es idéntico al de una sola llamada.
+    """
+    height = gray.shape[0]
+    tiles = max(1, min(tiles, height // MIN_TILE_HEIGHT))
+    if executor is None or tiles == 1:
+        return cv2.fastNlMeansDenoising(gray, None, NLM_STRENGTH, NLM_TEMPLATE_WINDOW, search_window)
+
+    overlap = nlm_overlap(search_window)
+    step = -(-height // tiles)
+    output = np.empty_like(gray)
+
+    def denoise_tile(index):
+        y0, y1 = index * step, min(height, (index + 1) * step)
+        top, bottom = max(0, y0 - overlap), min(height, y1 + overlap)
+        denoised = cv2.fastNlMeansDenoising(gray[top:bottom], None, NLM_STRENGTH, NLM_TEMPLATE_WINDOW, search_window)
+        output[y0:y1] = denoised[y0 - top:y1 - top]
+
+    list(executor.map(denoise_tile, range(tiles)))
+    return output
+
+
+class Denoiser:
+    """
+    Filtro de ruido según el perfil configurado. Con presupuesto de tiempo,
+    el coste por píxel se aprende de las ejecuciones anteriores para decidir
+    antes de empezar si el NLM completo cabe en él.
+    """
+
+    def __init__(self, profile: str = PREPROCESS_QUALITY, budget_seconds: Optional[float] = None):
+        if profile not in PROFILE_SEARCH_WINDOW:
+            raise ValueError(f"Perfil de pre-procesamiento desconocido: {profile}")
+        self.profile = profile
+        # None = sin presupuesto: siempre el NLM del perfil a resolución completa
+        self.budget_seconds = budget_seconds
+        self.search_window = PROFILE_SEARCH_WINDOW[profile]
+        # OpenCV ya reparte el NLM entre núcleos si tiene hilos; solo si corre
+        # en uno (p. ej. en procesos trabajadores) se reparte por franjas
+        self.tiles = (os.cpu_count() or 1) if cv2.getNumThreads() <= 1 else 1
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._seconds_per_pixel = INITIAL_SECONDS_PER_PIXEL * (self.search_window or 21) ** 2 / 21 ** 2 / self.tiles
+        self._lock = threading.Lock()
+
+    def denoise(self, gray: np.ndarray) -> np.ndarray:
+        if self.search_window is None:
+            return self._denoise_fast(gray)
+
+        if self.budget_seconds is None:
+            return denoise_tiled(gray, self.search_window, self._get_executor(), self.tiles)
+
+        pixels = gray.shape[0] * gray.shape[1]
+        estimate = pixels * self._seconds_per_pixel
+        scale = 1.0
+        if estimate > self.budget_seconds:
+            # El coste es proporcional a los píxeles: se reduce el lado por la raíz
+            scale = (self.budget_seconds / estimate) ** 0.5
+            if scale < MIN_DENOISE_SCALE:
+                return self._denoise_fast(gray)
+
+        source = gray if scale == 1.0 else cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        start = time.perf_counter()
+        denoised = denoise_tiled(source, self.search_window, self._get_executor(), self.tiles)
+        self._update_cost(time.perf_counter() - start, source.shape[0] * source.shape[1])
+        if scale != 1.0:
+            denoised = cv2.resize(denoised, (gray.shape[1], gray.shape[0]), interpolation=cv2.INTER_LINEAR)
+        return denoised
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @staticmethod
+    def _denoise_fast(gray: np.ndarray) -> np.ndarray:
+        return cv2.medianBlur(gray, 3)
+
+    def _update_cost(self, seconds: float, pixels: int):
+        with self._lock:
+            measured = seconds / max(1, pixels)
+            self._seconds_per_pixel += COST_SMOOTHING * (measured - self._seconds_per_pixel)
+
+    def _get_executor(self) -> Optional[ThreadPoolExecutor]:
+        if self.tiles == 1:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.tiles, thread_name_prefix="ocr-denoise")
+            return self._executor
@@ -0,0 +1,126 @@
+"""
+Módulo de infraestructura con la caché persistente de resultados OCR.
+
+Las entradas se direccionan por contenido: la clave combina el hash de los
+bytes de la imagen con una huella de la configuración del pipeline, así que
+renombrar o mover un archivo no invalida su resultado y cambiar la
+configuración no devuelve resultados obsoletos.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from src.infrastructure.app_paths import user_data_path
+
+DEFAULT_CACHE_FILE = "result_cache.sqlite"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def hash_bytes(data) -> str:
+    """Hash SHA-256 de un buffer (bytes, memoryview o array de numpy)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprint(*parts) -> str:
+    """Huella estable de cualquier combinación de valores serializables a JSON."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Caché SQLite con expulsión LRU acotada por tamaño.
+    Segura entre hilos y entre procesos (modo WAL).
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path or user_data_path(DEFAULT_CACHE_FILE)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " image_hash TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+            if "meta" not in columns:
+                # Cachés creadas antes de guardar metadatos (colores detectados, etc.)
+                self._conn.execute("ALTER TABLE results ADD COLUMN meta TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_access ON results(last_access)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_image ON results(image_hash)")
+
+    @staticmethod
+    def make_key(image_hash: str, config_fingerprint: str) -> str:
+        return f"{image_hash}:{config_fingerprint}"
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[tuple[str, dict]]:
+        """Devuelve (texto, metadatos) o None si no está en caché."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT text, meta FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            return row[0], json.loads(row[1]) if row[1] else {}
+
+    def put(self, key: str, text: str, meta: Optional[dict] = None):
+        image_hash = key.split(":", 1)[0]
+        meta_json = json.dumps(meta, ensure_ascii=False) if meta else None
+        size = len(text.encode("utf-8")) + len(key) + len(meta_json or "")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, image_hash, text, size, last_access, meta) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, image_hash, text, size, time.time(), meta_json),
+            )
+            self._evict()
+
+    def invalidate(self, image_hash: Optional[str] = None) -> int:
+        """
+        Borra las entradas de una imagen (todas sus configuraciones) o, sin
+        argumentos, la caché completa. Devuelve cuántas entradas se borraron.
+        """
+        with self._lock, self._conn:
+            if image_hash is None:
+                cursor = self._conn.execute("DELETE FROM results")
+            else:
+                cursor = self._conn.execute("DELETE FROM results WHERE image_hash = ?", (image_hash,))
+            return cursor.rowcount
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self):
+        """Expulsa las entradas menos usadas recientemente hasta respetar max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY last_access ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM results WHERE key = ?", victims)
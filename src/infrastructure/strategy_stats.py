@@ -0,0 +1,210 @@
+"""
+Módulo de infraestructura con las estadísticas de éxito de las estrategias de
+página completa (fallback). Permite probar primero la estrategia que suele
+funcionar con los documentos del usuario y saltarse las que nunca ganan.
+
+Los conteos se guardan en un JSON en el perfil del usuario. Cada proceso
+acumula solo sus incrementos y los suma al archivo al volcarlos, así que
+varios procesos trabajadores pueden compartirlo sin pisarse.
+"""
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+from src.infrastructure.app_paths import user_data_path
+
+DEFAULT_STATS_FILE = "strategy_stats.json"
+
+# Probabilidad de ignorar lo aprendido y probar un orden al azar (exploración)
+EXPLORATION_RATE = 0.05
+# Páginas del lote necesarias antes de preferir sus estadísticas al histórico
+MIN_BATCH_SAMPLES = 3
+# Una estrategia se ejecuta sola (sin las demás en paralelo) si en el lote
+# ganó al menos MIN_PREFERRED_SAMPLES veces con esta tasa de éxito
+MIN_PREFERRED_SAMPLES = 5
+MIN_PREFERRED_RATE = 0.9
+# Volcado a disco cada N registros o cada N segundos
+FLUSH_EVERY = 10
+FLUSH_INTERVAL = 5.0
+# Tiempo máximo de espera por el archivo de bloqueo y antigüedad para darlo por abandonado
+LOCK_TIMEOUT = 1.0
+STALE_LOCK_AGE = 10.0
+
+
+def _empty_counts() -> dict:
+    return {"attempts": 0, "successes": 0}
+
+
+def _score(counts: dict) -> float:
+    """Tasa de éxito suavizada (Laplace): sin datos vale 0.5."""
+    return (counts["successes"] + 1) / (counts["attempts"] + 2)
+
+
+class StrategyStats:
+    """
+    Conteos de intentos y éxitos por estrategia, del lote actual y
+    acumulados entre ejecuciones. Segura entre hilos.
+    """
+
+    def __init__(self, path: Optional[str] = None, exploration_rate: float = EXPLORATION_RATE):
+        self.path = path or user_data_path(DEFAULT_STATS_FILE)
+        self.exploration_rate = exploration_rate
+        self._lock = threading.Lock()
+        self._history: dict = self._read_file()
+        self._batch: dict = {}
+        self._pending: dict = {}
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+        # Lo pendiente al cerrar la aplicación también se guarda
+        atexit.register(self.flush)
+
+    # --- Consulta ---
+    def rank(self, names: list[str]) -> list[str]:
+        """
+        Ordena las estrategias de mayor a menor tasa de éxito. Usa el lote actual
+        si ya tiene suficientes páginas y, si no, el histórico. Los empates
+        respetan el orden de prioridad recibido.
+        """
+        if self.exploration_rate and random.random() < self.exploration_rate:
+            explored = list(names)
+            random.shuffle(explored)
+            return explored
+        with self._lock:
+            source = self._batch if self._batch_samples() >= MIN_BATCH_SAMPLES else self._combined()
+            return sorted(names, key=lambda name: -_score(source.get(name, _empty_counts())))
+
+    def preferred(self, names: list[str]) -> Optional[str]:
+        """Estrategia que el lote actual avala para ejecutarse sola, o None."""
+        with self._lock:
+            for name in names:
+                counts = self._batch.get(name)
+                if counts and counts["successes"] >= MIN_PREFERRED_SAMPLES \
+                        and counts["successes"] / counts["attempts"] >= MIN_PREFERRED_RATE:
+                    return name
+        return None
+
+    def snapshot(self) -> dict:
+        """Copia de los conteos: {"lote": {...}, "historico": {...}} con la tasa de éxito de cada estrategia."""
+        with self._lock:
+            def describe(source):
+                return {
+                    name: {**counts, "rate": counts["successes"] / counts["attempts"] if counts["attempts"] else 0.0}
+                    for name, counts in source.items()
+                }
+            return {"lote": describe(self._batch), "historico": describe(self._combined())}
+
+    # --- Registro ---
+    def record(self, name: str, success: bool):
+        with self._lock:
+            for source in (self._batch, self._pending):
+                counts = source.setdefault(name, _empty_counts())
+                counts["attempts"] += 1
+                counts["successes"] += int(success)
+            self._pending_count += 1
+            should_flush = self._pending_count >= FLUSH_EVERY or time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+        if should_flush:
+            self.flush()
+
+    def begin_batch(self):
+        self.flush()
+        with self._lock:
+            self._batch = {}
+
+    def flush(self):
+        """Suma los incrementos pendientes al archivo (escritura atómica)."""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending, self._pending_count = self._pending, {}, 0
+            self._last_flush = time.monotonic()
+        try:
+            with self._file_lock():
+                merged = self._read_file()
+                for name, delta in pending.items():
+                    counts = merged.setdefault(name, _empty_counts())
+                    counts["attempts"] += delta["attempts"]
+                    counts["successes"] += delta["successes"]
+                self._write_file(merged)
+        except OSError:
+            # Perfil sin permisos de escritura: se conservan para el próximo intento
+            with self._lock:
+                for name, delta in pending.items():
+                    counts = self._pending.setdefault(name, _empty_counts())
+                    counts["attempts"] += delta["attempts"]
+                    counts["successes"] += delta["successes"]
+            return
+        with self._lock:
+            # El archivo ya incluye lo de otros procesos: pasa a ser el nuevo histórico
+            self._history = merged
+
+    # --- Persistencia ---
+    def _batch_samples(self) -> int:
+        return sum(counts["successes"] for counts in self._batch.values())
+
+    def _combined(self) -> dict:
+        """Histórico del archivo más los incrementos aún no volcados."""
+        combined = {name: dict(counts) for name, counts in self._history.items()}
+        for name, delta in self._pending.items():
+            counts = combined.setdefault(name, _empty_counts())
+            counts["attempts"] += delta["attempts"]
+            counts["successes"] += delta["successes"]
+        return combined
+
+    def _read_file(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {
+                name: {"attempts": int(counts["attempts"]), "successes": int(counts["successes"])}
+                for name, counts in data.get("strategies", {}).items()
+            }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return {}
+
+    def _write_file(self, strategies: dict):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "strategies": strategies}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _file_lock(self):
+        return _LockFile(self.path + ".lock")
+
+
+class _LockFile:
+    """Bloqueo entre procesos mediante un archivo creado en exclusiva."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def __enter__(self):
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > STALE_LOCK_AGE:
+                        os.remove(self.path)  # Un proceso murió con el bloqueo tomado
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() > deadline:
+                    # Sin bloqueo se arriesga perder algún incremento, nunca el archivo
+                    return self
+                time.sleep(0.01)
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
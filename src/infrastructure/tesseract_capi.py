@@ -0,0 +1,190 @@
+"""
+Módulo de infraestructura con un acceso mínimo a la API en C de Tesseract
+(libtesseract) a través de ctypes.
+
+Es el motor persistente cuando `tesserocr` no está instalado: en Windows no
+hay paquetes binarios de tesserocr, pero la instalación de Tesseract (la
+portable y la de UB Mannheim) trae `libtesseract-5.dll` junto a
+`tesseract.exe`. Cargándola, los modelos quedan en memoria y cada llamada
+evita lanzar un proceso y escribir un PNG temporal, igual que con tesserocr.
+"""
+import ctypes
+import ctypes.util
+import glob
+import os
+from typing import Iterator, Optional
+
+# Nombres de la biblioteca junto al ejecutable (Windows, Linux, macOS)
+LIBRARY_PATTERNS = ("libtesseract*.dll", "tesseract*.dll", "libtesseract*.so*", "libtesseract*.dylib")
+
+# Constantes de la API (tesseract/publictypes.h)
+PSM_OSD_ONLY = 0
+RIL_TEXTLINE = 2
+RIL_WORD = 3
+
+_c_int_p = ctypes.POINTER(ctypes.c_int)
+_c_float_p = ctypes.POINTER(ctypes.c_float)
+
+# Función -> (tipos de los argumentos, tipo devuelto)
+_SIGNATURES = {
+    "TessVersion": ((), ctypes.c_char_p),
+    "TessDeleteText": ((ctypes.c_void_p,), None),
+    "TessBaseAPICreate": ((), ctypes.c_void_p),
+    "TessBaseAPIDelete": ((ctypes.c_void_p,), None),
+    "TessBaseAPIInit3": ((ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p), ctypes.c_int),
+    "TessBaseAPISetVariable": ((ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p), ctypes.c_int),
+    "TessBaseAPISetPageSegMode": ((ctypes.c_void_p, ctypes.c_int), None),
+    "TessBaseAPISetImage": ((ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int), None),
+    "TessBaseAPIRecognize": ((ctypes.c_void_p, ctypes.c_void_p), ctypes.c_int),
+    "TessBaseAPIGetUTF8Text": ((ctypes.c_void_p,), ctypes.c_void_p),
+    "TessBaseAPIMeanTextConf": ((ctypes.c_void_p,), ctypes.c_int),
+    "TessBaseAPIDetectOrientationScript": ((ctypes.c_void_p, _c_int_p, _c_float_p, ctypes.POINTER(ctypes.c_char_p), _c_float_p), ctypes.c_int),
+    "TessBaseAPIClear": ((ctypes.c_void_p,), None),
+    "TessBaseAPIEnd": ((ctypes.c_void_p,), None),
+    "TessBaseAPIGetIterator": ((ctypes.c_void_p,), ctypes.c_void_p),
+    "TessResultIteratorDelete": ((ctypes.c_void_p,), None),
+    "TessResultIteratorNext": ((ctypes.c_void_p, ctypes.c_int), ctypes.c_int),
+    "TessResultIteratorGetPageIterator": ((ctypes.c_void_p,), ctypes.c_void_p),
+    "TessResultIteratorGetUTF8Text": ((ctypes.c_void_p, ctypes.c_int), ctypes.c_void_p),
+    "TessResultIteratorConfidence": ((ctypes.c_void_p, ctypes.c_int), ctypes.c_float),
+    "TessPageIteratorIsAtBeginningOf": ((ctypes.c_void_p, ctypes.c_int), ctypes.c_int),
+    "TessPageIteratorBoundingBox": ((ctypes.c_void_p, ctypes.c_int, _c_int_p, _c_int_p, _c_int_p, _c_int_p), ctypes.c_int),
+}
+
+# Carpetas añadidas a la búsqueda de DLL de Windows. Quedan abiertas mientras
+# viva el proceso: la biblioteca cargada puede necesitar sus dependencias en
+# cualquier momento. Las de un intento de carga fallido se cierran enseguida.
+_dll_directories = []
+
+
+def load_library(tesseract_cmd: Optional[str] = None) -> Optional[ctypes.CDLL]:
+    """libtesseract junto al ejecutable o en las rutas del sistema. None si no se puede cargar."""
+    candidates = []
+    if tesseract_cmd:
+        folder = os.path.dirname(os.path.abspath(tesseract_cmd))
+        for pattern in LIBRARY_PATTERNS:
+            candidates.extend(sorted(glob.glob(os.path.join(folder, pattern))))
+    for name in ("tesseract", "libtesseract-5"):
+        found = ctypes.util.find_library(name)
+        if found:
+            candidates.append(found)
+
+    for path in candidates:
+        directory = None
+        try:
+            if os.name == "nt" and os.path.isabs(path):
+                # Las DLL de las que depende (leptonica...) están en la misma carpeta
+                directory = os.add_dll_directory(os.path.dirname(path))
+            library = ctypes.CDLL(path)
+            for name, (argtypes, restype) in _SIGNATURES.items():
+                function = getattr(library, name)
+                function.argtypes = argtypes
+                function.restype = restype
+        except (OSError, AttributeError):
+            if directory is not None:
+                directory.close()
+            continue
+        if directory is not None:
+            _dll_directories.append(directory)
+        return library
+    return None
+
+
+def library_version(library: ctypes.CDLL) -> str:
+    return library.TessVersion().decode("utf-8", "replace")
+
+
+class TessApi:
+    """
+    Instancia de TessBaseAPI con los modelos cargados. Imita la parte de
+    `tesserocr.PyTessBaseAPI` que usa el motor; no es segura entre hilos
+    (el pool entrega cada instancia a un solo hilo a la vez).
+    """
+
+    def __init__(self, library: ctypes.CDLL, lang: str, path: Optional[str] = None, psm: Optional[int] = None):
+        self._library = library
+        self._handle = library.TessBaseAPICreate()
+        if library.TessBaseAPIInit3(self._handle, _encode_path(path) if path else None, lang.encode("utf-8")) != 0:
+            library.TessBaseAPIDelete(self._handle)
+            self._handle = None
+            raise RuntimeError(f"No se pudo inicializar Tesseract (idioma '{lang}', modelos en '{path}')")
+        # Sin consola para los avisos de Tesseract ("Invalid resolution"...), como hace tesserocr
+        library.TessBaseAPISetVariable(self._handle, b"debug_file", os.fsencode(os.devnull))
+        if psm is not None:
+            self.SetPageSegMode(psm)
+
+    def SetPageSegMode(self, psm: int):
+        self._library.TessBaseAPISetPageSegMode(self._handle, psm)
+
+    def SetImageBytes(self, data: bytes, width: int, height: int, bytes_per_pixel: int, bytes_per_line: int):
+        # Tesseract copia el buffer: no hace falta mantenerlo vivo
+        self._library.TessBaseAPISetImage(self._handle, data, width, height, bytes_per_pixel, bytes_per_line)
+
+    def Recognize(self) -> bool:
+        return self._library.TessBaseAPIRecognize(self._handle, None) == 0
+
+    def GetUTF8Text(self) -> str:
+        return self._take_text(self._library.TessBaseAPIGetUTF8Text(self._handle))
+
+    def MeanTextConf(self) -> int:
+        return self._library.TessBaseAPIMeanTextConf(self._handle)
+
+    def DetectOrientationScript(self) -> Optional[dict]:
+        orient_deg, orient_conf = ctypes.c_int(), ctypes.c_float()
+        script_name, script_conf = ctypes.c_char_p(), ctypes.c_float()
+        if not self._library.TessBaseAPIDetectOrientationScript(
+                self._handle, ctypes.byref(orient_deg), ctypes.byref(orient_conf),
+                ctypes.byref(script_name), ctypes.byref(script_conf)):
+            return None
+        return {
+            "orient_deg": orient_deg.value,
+            "orient_conf": orient_conf.value,
+            "script_name": (script_name.value or b"").decode("utf-8", "replace"),
+            "script_conf": script_conf.value,
+        }
+
+    def words(self) -> Iterator[tuple[str, tuple[int, int, int, int], float, bool]]:
+        """
+        Palabras del último Recognize(): (texto, (x1, y1, x2, y2), confianza,
+        empieza una línea nueva). El texto puede venir vacío.
+        """
+        library = self._library
+        iterator = library.TessBaseAPIGetIterator(self._handle)
+        if not iterator:
+            return
+        page_iterator = library.TessResultIteratorGetPageIterator(iterator)
+        box = [ctypes.c_int() for _ in range(4)]
+        try:
+            while True:
+                new_line = bool(library.TessPageIteratorIsAtBeginningOf(page_iterator, RIL_TEXTLINE))
+                text = self._take_text(library.TessResultIteratorGetUTF8Text(iterator, RIL_WORD))
+                library.TessPageIteratorBoundingBox(page_iterator, RIL_WORD, *map(ctypes.byref, box))
+                yield (text, tuple(value.value for value in box),
+                       float(library.TessResultIteratorConfidence(iterator, RIL_WORD)), new_line)
+                if not library.TessResultIteratorNext(iterator, RIL_WORD):
+                    break
+        finally:
+            library.TessResultIteratorDelete(iterator)
+
+    def Clear(self):
+        self._library.TessBaseAPIClear(self._handle)
+
+    def End(self):
+        if self._handle is not None:
+            self._library.TessBaseAPIEnd(self._handle)
+            self._library.TessBaseAPIDelete(self._handle)
+            self._handle = None
+
+    def _take_text(self, pointer: Optional[int]) -> str:
+        """Copia un texto devuelto por Tesseract y libera su memoria."""
+        if not pointer:
+            return ""
+        try:
+            return ctypes.string_at(pointer).decode("utf-8", "replace")
+        finally:
+            self._library.TessDeleteText(pointer)
+
+
+def _encode_path(path: str) -> bytes:
+    # Tesseract abre los archivos con la API de caracteres estrechos (página de códigos ANSI en Windows)
+    return path.encode("mbcs") if os.name == "nt" else os.fsencode(path)
@@ -0,0 +1,417 @@
+"""
+Módulo de infraestructura que encapsula el acceso a Tesseract.
+
+Mantiene un pool de instancias de Tesseract ya inicializadas (a través de la
+API en C, con `tesserocr` o cargando libtesseract con ctypes) para no lanzar
+un proceso, escribir un PNG temporal y recargar los modelos en cada llamada.
+Si no hay ninguna de las dos, recurre a `pytesseract` con la misma interfaz.
+
+El idioma y la variante de los modelos (tessdata, tessdata_fast,
+tessdata_best) se pueden cambiar entre lotes con select_model(); hay un
+pool de instancias por combinación.
+"""
+import functools
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+import pytesseract
+
+from src.infrastructure.instrumentation import Instrumentation
+from src.infrastructure.tesseract_capi import TessApi, PSM_OSD_ONLY, load_library, library_version
+
+try:
+    import tesserocr
+except ImportError:  # Sin él (Windows) se carga libtesseract junto al ejecutable
+    tesserocr = None
+
+
+DEFAULT_LANG = "spa+eng"
+OSD_LANG = "osd"
+UNKNOWN_VERSION = "desconocida"
+
+# Backends: los dos primeros mantienen los modelos cargados entre llamadas
+BACKEND_TESSEROCR = "tesserocr"
+BACKEND_LIBTESSERACT = "libtesseract"
+BACKEND_CLI = "pytesseract"
+
+
+class OcrWord(NamedTuple):
+    """Palabra reconocida con su caja en coordenadas de la imagen."""
+    text: str
+    left: int
+    top: int
+    width: int
+    height: int
+    conf: float
+    line: int  # Identificador de la línea de texto dentro de la página
+
+
+class EngineInitError(RuntimeError):
+    """No se pudo inicializar una instancia de Tesseract (modelos o ruta inválidos)."""
+
+
+def _instrumented(method):
+    """Cuenta y cronometra cada llamada a Tesseract (tramo "tesseract" con el método como variante)."""
+    @functools.wraps(method)
+    def wrapper(self, image, *args, **kwargs):
+        instrumentation = self.instrumentation
+        if not instrumentation.enabled:
+            return method(self, image, *args, **kwargs)
+        instrumentation.count("tesseract_calls")
+        with instrumentation.span("tesseract", label=method.__name__, width=image.shape[1], height=image.shape[0]):
+            return method(self, image, *args, **kwargs)
+    return wrapper
+
+
+class _ApiPool:
+    """Pool acotado de instancias de la API en C para un mismo idioma y carpeta de modelos."""
+
+    def __init__(self, factory, max_size: int):
+        self._factory = factory
+        self._max_size = max_size
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        api = None
+        try:
+            api = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self._max_size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    api = self._factory()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                # Todas las instancias están ocupadas: esperar a que se libere una
+                api = self._idle.get()
+        try:
+            yield api
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().End()
+            except queue.Empty:
+                break
+
+
+class TesseractEngine:
+    """
+    Motor OCR reutilizable y seguro entre hilos.
+    Las imágenes se pasan como buffers en memoria (arrays de numpy).
+    """
+
+    def __init__(self, tesseract_cmd: Optional[str] = None, lang: str = DEFAULT_LANG, pool_size: Optional[int] = None,
+                 known_versions: Optional[dict] = None, instrumentation: Optional[Instrumentation] = None):
+        self.instrumentation = instrumentation or Instrumentation()
+        self.pool_size = max(1, pool_size or os.cpu_count() or 1)
+        self.tessdata_dir = self._find_tessdata(tesseract_cmd)
+        # Idioma y carpeta de modelos en uso: se cambian juntos (ver select_model)
+        self._model: tuple[str, Optional[str]] = (lang, self.tessdata_dir)
+        self._languages: dict[str, Optional[set]] = {}
+        # Carpetas de modelos que el ejecutable no puede recibir (ver _cli_config)
+        self._unusable_dirs: set[str] = set()
+        # Sin modelo de OSD (osd.traineddata) la orientación no se detecta; el reconocimiento no cambia
+        self._osd_unavailable = False
+        self._pools: dict[tuple[str, Optional[str]], _ApiPool] = {}
+        self._pools_lock = threading.Lock()
+        self._library = None
+        if tesserocr is not None:
+            self._backend = BACKEND_TESSEROCR
+        else:
+            self._library = load_library(tesseract_cmd)
+            self._backend = BACKEND_LIBTESSERACT if self._library is not None else BACKEND_CLI
+        # Versión recordada de un arranque anterior (por backend), evita el subproceso
+        self._version: Optional[str] = (known_versions or {}).get(self.backend)
+
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    @property
+    def persistent(self) -> bool:
+        """True si las llamadas reutilizan instancias ya cargadas (sin lanzar procesos)."""
+        return self._backend != BACKEND_CLI
+
+    # --- API pública ---
+    @property
+    def lang(self) -> str:
+        return self._model[0]
+
+    @property
+    def model_dir(self) -> Optional[str]:
+        return self._model[1]
+
+    def select_model(self, lang: str, variant: Optional[str] = None) -> tuple[str, Optional[str]]:
+        """
+        Idioma y variante de los modelos ("fast", "best") de las próximas
+        llamadas. La variante se busca en una carpeta tessdata_<variante>
+        junto a tessdata; si no está o le falta el idioma, se usa tessdata.
+        """
+        model_dir = self.tessdata_dir
+        if variant:
+            variant_dir = self._find_variant_dir(variant)
+            installed = self.available_languages(variant_dir) if variant_dir else None
+            if installed is not None and all(part in installed for part in lang.split("+")):
+                model_dir = variant_dir
+            else:
+                self.instrumentation.event("model_variant_missing", variant=variant, lang=lang)
+        self._model = (lang, model_dir)
+        return self._model
+
+    def available_languages(self, model_dir: Optional[str] = None) -> Optional[set]:
+        """Idiomas instalados en la carpeta de modelos (None si no se pueden listar)."""
+        key = model_dir or ""
+        if key not in self._languages:
+            self._languages[key] = self._list_languages(model_dir)
+        return self._languages[key]
+
+    def version(self) -> str:
+        """Versión de Tesseract en uso (se consulta una sola vez)."""
+        if self._version is None:
+            try:
+                if self._backend == BACKEND_TESSEROCR:
+                    self._version = tesserocr.tesseract_version().splitlines()[0].strip()
+                elif self._backend == BACKEND_LIBTESSERACT:
+                    self._version = f"tesseract {library_version(self._library)}"
+                else:
+                    self._version = f"tesseract {pytesseract.get_tesseract_version()}"
+            except Exception:
+                self._version = UNKNOWN_VERSION
+        return self._version
+
+    @_instrumented
+    def image_to_string(self, image: np.ndarray, psm: int = 3, lang: Optional[str] = None) -> str:
+        """Reconoce el texto de la imagen con el modo de segmentación indicado."""
+        model_lang, model_dir = self._model
+        lang = lang or model_lang
+        if self.persistent:
+            try:
+                with self._get_pool(lang, model_dir).acquire() as api:
+                    api.SetPageSegMode(psm)
+                    self._set_image(api, image)
+                    return api.GetUTF8Text()
+            except EngineInitError:
+                # Tesseract no pudo inicializarse (p. ej. faltan los traineddata
+                # en la ruta de la API): se sigue con el ejecutable.
+                self._backend = BACKEND_CLI
+        return pytesseract.image_to_string(image, config=self._cli_config(lang, psm, model_dir))
+
+    @_instrumented
+    def recognize(self, image: np.ndarray, psm: int = 3, lang: Optional[str] = None) -> tuple[str, float]:
+        """Reconoce el texto y devuelve también la confianza media (0-100)."""
+        model_lang, model_dir = self._model
+        lang = lang or model_lang
+        if self.persistent:
+            try:
+                with self._get_pool(lang, model_dir).acquire() as api:
+                    api.SetPageSegMode(psm)
+                    self._set_image(api, image)
+                    text = api.GetUTF8Text()
+                    return text, float(api.MeanTextConf())
+            except EngineInitError:
+                self._backend = BACKEND_CLI
+
+        # Con pytesseract basta una llamada: el texto se rearma desde los datos por palabra
+        data = pytesseract.image_to_data(image, config=self._cli_config(lang, psm, model_dir), output_type=pytesseract.Output.DICT)
+        lines, confidences = {}, []
+        for i, word in enumerate(data["text"]):
+            if not word.strip():
+                continue
+            paragraph = (data["block_num"][i], data["par_num"][i])
+            lines.setdefault(paragraph, {}).setdefault(data["line_num"][i], []).append(word)
+            if float(data["conf"][i]) >= 0:
+                confidences.append(float(data["conf"][i]))
+        text = "\n\n".join(
+            "\n".join(" ".join(words) for words in paragraph_lines.values())
+            for paragraph_lines in lines.values()
+        )
+        return text, (sum(confidences) / len(confidences) if confidences else 0.0)
+
+    @_instrumented
+    def image_to_data(self, image: np.ndarray, psm: int = 3, lang: Optional[str] = None) -> list[OcrWord]:
+        """Reconoce la imagen y devuelve cada palabra con su caja y confianza."""
+        model_lang, model_dir = self._model
+        lang = lang or model_lang
+        if self.persistent:
+            try:
+                with self._get_pool(lang, model_dir).acquire() as api:
+                    api.SetPageSegMode(psm)
+                    self._set_image(api, image)
+                    api.Recognize()
+                    return self._collect_words(api)
+            except EngineInitError:
+                self._backend = BACKEND_CLI
+
+        data = pytesseract.image_to_data(image, config=self._cli_config(lang, psm, model_dir), output_type=pytesseract.Output.DICT)
+        words, line_ids = [], {}
+        for i, text in enumerate(data["text"]):
+            if not text.strip():
+                continue
+            line_key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            line_id = line_ids.setdefault(line_key, len(line_ids))
+            words.append(OcrWord(text, data["left"][i], data["top"][i], data["width"][i],
+                                 data["height"][i], float(data["conf"][i]), line_id))
+        return words
+
+    @_instrumented
+    def detect_orientation(self, image: np.ndarray) -> tuple[int, float]:
+        """
+        Devuelve (rotación en grados para enderezar la imagen, confianza).
+        Equivale a las líneas "Rotate:" y "Orientation confidence:" de OSD.
+        """
+        if self._osd_unavailable:
+            return 0, 0.0
+        if self.persistent:
+            try:
+                # osd.traineddata solo está en tessdata
+                with self._get_pool(OSD_LANG, self.tessdata_dir).acquire() as api:
+                    self._set_image(api, image)
+                    osd = api.DetectOrientationScript()
+                if not osd:
+                    raise pytesseract.TesseractError(1, "OSD sin resultado")
+                # orient_deg es la orientación actual; "Rotate" es la corrección horaria
+                return (360 - osd["orient_deg"]) % 360, float(osd["orient_conf"])
+            except EngineInitError as e:
+                # Solo falla OSD: el reconocimiento sigue con la API persistente y
+                # las imágenes quedan como están (sin confianza no se rotan)
+                self._osd_unavailable = True
+                self.instrumentation.event("osd_unavailable", error=str(e))
+                return 0, 0.0
+
+        osd_data = pytesseract.image_to_osd(image)
+        rotation_angle, confidence = 0, 0.0
+        for line in osd_data.splitlines():
+            if "Rotate:" in line:
+                rotation_angle = int(line.split(":")[1].strip())
+            elif "Orientation confidence:" in line:
+                confidence = float(line.split(":")[1].strip())
+        return rotation_angle, confidence
+
+    def close(self):
+        """Libera las instancias de Tesseract inicializadas."""
+        with self._pools_lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+
+    # --- Internos ---
+    def _get_pool(self, lang: str, model_dir: Optional[str]) -> _ApiPool:
+        with self._pools_lock:
+            pool = self._pools.get((lang, model_dir))
+            if pool is None:
+                pool = _ApiPool(lambda: self._create_api(lang, model_dir), self.pool_size)
+                self._pools[(lang, model_dir)] = pool
+            return pool
+
+    def _create_api(self, lang: str, model_dir: Optional[str]):
+        kwargs = {"lang": lang}
+        if lang == OSD_LANG:
+            kwargs["psm"] = PSM_OSD_ONLY
+        if model_dir:
+            kwargs["path"] = model_dir
+        try:
+            if self._backend == BACKEND_LIBTESSERACT:
+                return TessApi(self._library, **kwargs)
+            return tesserocr.PyTessBaseAPI(**kwargs)
+        except RuntimeError as e:
+            raise EngineInitError(str(e)) from e
+
+    def _cli_config(self, lang: str, psm: int, model_dir: Optional[str]) -> str:
+        config = f"-l {lang} --psm {psm}"
+        if model_dir and model_dir != self.tessdata_dir:
+            model_dir = model_dir.rstrip(os.sep)
+            # pytesseract parte la configuración con shlex (sin modo POSIX en
+            # Windows, que deja las comillas en el argumento): una ruta con
+            # espacios no se puede pasar, y se usan los modelos de tessdata.
+            if any(character.isspace() for character in model_dir):
+                if model_dir not in self._unusable_dirs:
+                    self._unusable_dirs.add(model_dir)
+                    self.instrumentation.event("model_dir_unusable", model_dir=model_dir)
+            else:
+                config += f" --tessdata-dir {model_dir}"
+        return config
+
+    def _list_languages(self, model_dir: Optional[str]) -> Optional[set]:
+        try:
+            if model_dir:
+                return {os.path.splitext(name)[0] for name in os.listdir(model_dir) if name.endswith(".traineddata")}
+            if self._backend == BACKEND_TESSEROCR:
+                return set(tesserocr.get_languages()[1])
+            return set(pytesseract.get_languages())
+        except Exception:
+            return None
+
+    def _find_variant_dir(self, variant: str) -> Optional[str]:
+        """Carpeta tessdata_<variante> junto a tessdata (la portable o la de TESSDATA_PREFIX)."""
+        bases = [self.tessdata_dir, os.environ.get("TESSDATA_PREFIX")]
+        for base in filter(None, bases):
+            candidate = os.path.join(os.path.dirname(base.rstrip(os.sep)), f"tessdata_{variant}")
+            if os.path.isdir(candidate):
+                return candidate + os.sep
+        return None
+
+    @staticmethod
+    def _collect_words(api) -> list[OcrWord]:
+        words = []
+        line_id = -1
+        for text, (x1, y1, x2, y2), conf, new_line in TesseractEngine._iterate_words(api):
+            if new_line:
+                line_id += 1
+            if not text or not text.strip():
+                continue
+            words.append(OcrWord(text, x1, y1, x2 - x1, y2 - y1, conf, max(line_id, 0)))
+        return words
+
+    @staticmethod
+    def _iterate_words(api):
+        """(texto, caja, confianza, empieza una línea) de cada palabra, con cualquiera de los dos backends."""
+        if isinstance(api, TessApi):
+            yield from api.words()
+            return
+        iterator = api.GetIterator()
+        if iterator is None:
+            return
+        level = tesserocr.RIL.WORD
+        for result in tesserocr.iterate_level(iterator, level):
+            yield (result.GetUTF8Text(level), result.BoundingBox(level), result.Confidence(level),
+                   result.IsAtBeginningOf(tesserocr.RIL.TEXTLINE))
+
+    @staticmethod
+    def _set_image(api, image: np.ndarray):
+        """Entrega el buffer crudo a Tesseract sin codificarlo a PNG."""
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+        api.SetImageBytes(image.tobytes(), width, height, bytes_per_pixel, width * bytes_per_pixel)
+
+    @staticmethod
+    def _find_tessdata(tesseract_cmd: Optional[str]) -> Optional[str]:
+        if tesseract_cmd:
+            tessdata = os.path.join(os.path.dirname(tesseract_cmd), "tessdata")
+            if os.path.isdir(tessdata):
+                # La API en C espera la ruta con separador final
+                return tessdata + os.sep
+        return None
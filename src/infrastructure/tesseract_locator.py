@@ -0,0 +1,72 @@
+"""
+Módulo de infraestructura que localiza el ejecutable de Tesseract y recuerda,
+entre ejecuciones, dónde se encontró y qué versión tiene. Consultar la versión
+lanza un subproceso, que en el .exe portable es de lo más lento del arranque.
+
+El registro se invalida solo si el ejecutable cambia (tamaño o fecha) o si
+cambian las rutas candidatas.
+"""
+import json
+import os
+from typing import NamedTuple, Optional
+
+from src.infrastructure.app_paths import user_data_path
+
+LOCATOR_FILE = "tesseract.json"
+
+
+class TesseractLocation(NamedTuple):
+    # Ruta absoluta del ejecutable (None = no encontrado; se usa el PATH)
+    cmd: Optional[str]
+    # Versión conocida por backend ("tesserocr" / "libtesseract" / "pytesseract")
+    versions: dict
+
+
+def locate_tesseract(candidates: list[str]) -> TesseractLocation:
+    """Devuelve la ubicación recordada si sigue siendo válida o la busca de nuevo."""
+    candidates = [os.path.abspath(path) for path in candidates]
+    record = _read_record()
+    if record.get("candidates") == candidates and record.get("cmd") and record.get("stamp") == _stamp(record["cmd"]):
+        return TesseractLocation(record["cmd"], dict(record.get("versions", {})))
+
+    cmd = next((path for path in candidates if os.path.exists(path)), None)
+    if cmd is not None:
+        _write_record({"candidates": candidates, "cmd": cmd, "stamp": _stamp(cmd), "versions": {}})
+    return TesseractLocation(cmd, {})
+
+
+def remember_version(cmd: Optional[str], backend: str, version: str):
+    """Guarda la versión detectada para no volver a consultarla en el próximo arranque."""
+    record = _read_record()
+    if cmd is None or record.get("cmd") != cmd or record.get("versions", {}).get(backend) == version:
+        return
+    record.setdefault("versions", {})[backend] = version
+    _write_record(record)
+
+
+def _stamp(path: str) -> Optional[list]:
+    try:
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        return None
+
+
+def _read_record() -> dict:
+    try:
+        with open(user_data_path(LOCATOR_FILE), "r", encoding="utf-8") as f:
+            record = json.load(f)
+        return record if isinstance(record, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_record(record: dict):
+    path = user_data_path(LOCATOR_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # Sin permisos de escritura: simplemente no se recuerda
@@ -0,0 +1,271 @@
+# src/interface/cli.py
+"""
+Módulo que implementa la interfaz de línea de comandos (sin ventana).
+Procesa archivos, carpetas (recursivamente) o patrones glob y escribe una
+línea JSON por imagen (o por página de un TIFF / PDF) a medida que terminan,
+para servidores y tareas cron.
+
+No importa nada de la GUI (CustomTkinter / TkinterDnD).
+
+Con --watch queda vigilando las carpetas y procesa solo los archivos que
+van llegando (ver folder_watcher).
+
+Uso:
+    python -m src.interface.cli escaneos/ "fotos/**/*.jpg" -o resultados.jsonl
+    python -m src.interface.cli --watch escaneos/ --sidecar
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from typing import Iterable, Optional, TextIO
+
+from src.infrastructure.batch_engine import BatchEngine
+from src.infrastructure.ocr_config import (
+    OcrConfig, HIGHLIGHT_MODE_PAGE, HIGHLIGHT_MODE_REGIONS, HIGHLIGHT_MODE_COMPOSITE,
+    PREPROCESS_FAST, PREPROCESS_BALANCED, PREPROCESS_QUALITY, LANGUAGE_AUTO, MODEL_FAST, MODEL_BEST,
+    SUGGESTED_NEAR_DUPLICATE_DISTANCE,
+)
+from src.infrastructure.ocr_result import OcrResult, STATUS_ERROR, STATUS_OK
+from src.infrastructure.page_refs import DOCUMENT_EXTENSIONS, split_page_ref
+from src.infrastructure.documents import expand_pages
+from src.infrastructure.folder_watcher import FolderWatcher, DEFAULT_SETTLE_SECONDS, DEFAULT_POLL_INTERVAL
+
+# Los TIFF y PDF pueden tener varias páginas (cada una se procesa por separado)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp') + DOCUMENT_EXTENSIONS
+
+
+def collect_image_paths(inputs: Iterable[str]) -> list[str]:
+    """
+    Expande archivos, carpetas y patrones glob en la lista de imágenes a
+    procesar, sin duplicados y en orden estable. Las rutas explícitas que no
+    existen se conservan para informarlas como error. Los documentos de
+    varias páginas se expanden en una entrada por página ("doc.pdf#page=2"),
+    que se reparten entre los procesos como imágenes sueltas.
+    """
+    paths: list[str] = []
+    seen = set()
+
+    def add(path):
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            paths.append(path)
+
+    for item in inputs:
+        candidates = sorted(glob.glob(item, recursive=True)) if glob.has_magic(item) else [item]
+        for candidate in candidates:
+            if os.path.isdir(candidate):
+                for root, dirs, files in os.walk(candidate):
+                    dirs.sort()
+                    for name in sorted(files):
+                        if name.lower().endswith(IMAGE_EXTENSIONS):
+                            add(os.path.join(root, name))
+            elif glob.has_magic(item) and not candidate.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            else:
+                add(candidate)
+    return expand_pages(paths)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="extractor-ocr",
+        description="Extrae el texto resaltado de imágenes y escribe una línea JSON por imagen.",
+    )
+    parser.add_argument("inputs", nargs="+", help="Archivos, carpetas (recursivo) o patrones glob.")
+    parser.add_argument("-o", "--output", help="Archivo JSONL de salida (por defecto, la salida estándar).")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo).")
+    parser.add_argument("-c", "--color", default="auto", help="Color de resaltador a buscar (por defecto, auto).")
+    parser.add_argument("--dedupe-distance", type=int, default=OcrConfig.near_duplicate_distance,
+                        help=f"Distancia máxima (bits de 256, p. ej. {SUGGESTED_NEAR_DUPLICATE_DISTANCE}) para tratar dos fotos con el mismo resaltado "
+                             "como casi idénticas y procesar solo la más nítida (por defecto, 0: desactivado).")
+    add_pipeline_arguments(parser)
+    watch = parser.add_argument_group("vigilancia de carpetas")
+    watch.add_argument("--watch", action="store_true",
+                       help="Vigilar las carpetas indicadas y procesar los archivos nuevos o modificados a medida que llegan.")
+    watch.add_argument("--sidecar", action="store_true",
+                       help="Guardar el texto en un .txt junto a cada imagen (nombre_pN.txt en las páginas).")
+    watch.add_argument("--include-existing", action="store_true",
+                       help="En la primera vigilancia de una carpeta, procesar también lo que ya contiene.")
+    watch.add_argument("--settle", type=float, default=DEFAULT_SETTLE_SECONDS,
+                       help=f"Segundos sin cambios para dar un archivo por completo (por defecto, {DEFAULT_SETTLE_SECONDS:g}).")
+    watch.add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL,
+                       help=f"Intervalo de sondeo en segundos (por defecto, {DEFAULT_POLL_INTERVAL:g}).")
+    parser.add_argument("-q", "--quiet", action="store_true", help="No mostrar el progreso en la salida de errores.")
+    return parser
+
+
+def add_pipeline_arguments(parser: argparse.ArgumentParser):
+    """Opciones de la configuración del pipeline (compartidas con el modo servidor)."""
+    parser.add_argument("--no-cache", action="store_true", help="No leer ni guardar resultados en la caché persistente.")
+    parser.add_argument("--cache-path", help="Ruta del archivo de caché (por defecto, el perfil del usuario).")
+    parser.add_argument("--mode", choices=(HIGHLIGHT_MODE_REGIONS, HIGHLIGHT_MODE_COMPOSITE, HIGHLIGHT_MODE_PAGE),
+                        default=OcrConfig.highlight_mode,
+                        help="Modo de extracción de las zonas resaltadas. Por defecto, regiones con el motor "
+                             "persistente y compuesto si cada llamada a Tesseract lanza un proceso.")
+    parser.add_argument("--profile", choices=(PREPROCESS_FAST, PREPROCESS_BALANCED, PREPROCESS_QUALITY),
+                        default=OcrConfig.preprocess_profile, help="Perfil de pre-procesamiento de página completa.")
+    parser.add_argument("--denoise-budget", type=float, default=OcrConfig.preprocess_budget_seconds,
+                        help="Segundos máximos de filtrado de ruido por imagen (reduce las imágenes grandes; "
+                             "el resultado pasa a depender de la velocidad del equipo).")
+    parser.add_argument("--lang", default=OcrConfig.language,
+                        help=f"Idioma de Tesseract (spa, eng, spa+eng...). '{LANGUAGE_AUTO}': se elige por lote con las primeras páginas.")
+    parser.add_argument("--model", choices=(MODEL_FAST, MODEL_BEST), default=OcrConfig.model_variant,
+                        help="Variante de los modelos (carpetas tessdata_fast / tessdata_best). Por defecto, los de tessdata.")
+    parser.add_argument("--trace", help="Archivo JSONL con el tiempo de cada etapa de cada imagen (instrumentación).")
+    parser.add_argument("--metrics", help="Archivo de métricas en formato de texto de Prometheus (uno por proceso).")
+
+
+def config_from_args(args: argparse.Namespace) -> OcrConfig:
+    return OcrConfig(
+        highlight_mode=args.mode,
+        preprocess_profile=args.profile,
+        preprocess_budget_seconds=args.denoise_budget,
+        language=args.lang,
+        model_variant=args.model,
+        use_cache=not args.no_cache,
+        cache_path=args.cache_path,
+        trace_path=args.trace,
+        metrics_path=args.metrics,
+        # Solo la línea de comandos procesa lotes (el servidor no tiene esta opción)
+        near_duplicate_distance=getattr(args, "dedupe_distance", OcrConfig.near_duplicate_distance),
+    )
+
+
+def result_record(index: int, result: OcrResult) -> dict:
+    """Resultado como objeto JSON (una línea de la salida)."""
+    record = {"index": index, **result.to_dict()}
+    record["timings"] = {stage: round(seconds, 4) for stage, seconds in result.timings.items()}
+    return record
+
+
+def _write_result(out: TextIO, index: int, result: OcrResult):
+    out.write(json.dumps(result_record(index, result), ensure_ascii=False) + "\n")
+    out.flush()
+
+
+def sidecar_path(image_path: str) -> str:
+    """Archivo .txt junto a la imagen (o al documento, con el número de página)."""
+    document_path, page = split_page_ref(image_path)
+    stem = os.path.splitext(document_path)[0]
+    return f"{stem}_p{page}.txt" if page is not None else f"{stem}.txt"
+
+
+def _write_sidecar(image_path: str, result: OcrResult):
+    path = sidecar_path(image_path)
+    # Escritura atómica: quien lee los .txt nunca ve uno a medio escribir
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(result.text)
+    os.replace(temporary, path)
+
+
+def run(args: argparse.Namespace, out: TextIO) -> int:
+    if args.watch:
+        return run_watch(args, out)
+    image_paths = collect_image_paths(args.inputs)
+    if not image_paths:
+        print("No se encontraron imágenes en las rutas indicadas.", file=sys.stderr)
+        return 2
+
+    config = config_from_args(args)
+    engine = BatchEngine(max_workers=args.workers, service_kwargs={"config": config})
+    errors = 0
+    start = time.perf_counter()
+
+    def on_progress(completed, total, index, image_path, result):
+        nonlocal errors
+        errors += result.status == STATUS_ERROR
+        _write_result(out, index, result)
+        if not args.quiet:
+            print(f"[{completed}/{total}] {result.status:<5} {image_path}", file=sys.stderr)
+
+    try:
+        engine.run(image_paths, args.color, on_progress=on_progress, detailed=True)
+    except KeyboardInterrupt:
+        engine.cancel()
+        print("Cancelado.", file=sys.stderr)
+        return 130
+    finally:
+        engine.shutdown()
+
+    if not args.quiet:
+        print(f"{len(image_paths)} imágenes en {time.perf_counter() - start:.1f}s ({errors} con error).", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def run_watch(args: argparse.Namespace, out: TextIO) -> int:
+    """
+    Vigila las carpetas hasta Ctrl+C. Cada tanda de archivos listos se procesa
+    en el mismo pool de procesos; un archivo se da por hecho (y no se vuelve a
+    procesar mientras no cambie) cuando terminaron todas sus páginas.
+    """
+    missing = [path for path in args.inputs if not os.path.isdir(path)]
+    if missing:
+        print(f"--watch requiere carpetas: {', '.join(missing)}", file=sys.stderr)
+        return 2
+
+    engine = BatchEngine(max_workers=args.workers, service_kwargs={"config": config_from_args(args)})
+    # Un solo evento para todas las carpetas: un archivo en cualquiera despierta el bucle
+    wake = threading.Event()
+    watchers = [
+        FolderWatcher(path, IMAGE_EXTENSIONS, settle_seconds=args.settle, poll_interval=args.poll,
+                      include_existing=args.include_existing, wake=wake)
+        for path in args.inputs
+    ]
+    for watcher in watchers:
+        watcher.start()
+        if not args.quiet:
+            detection = "eventos del sistema" if watcher.uses_events else "sondeo"
+            print(f"Vigilando {watcher.root} ({detection}). Ctrl+C para terminar.", file=sys.stderr)
+
+    def on_progress(completed, total, index, image_path, result):
+        _write_result(out, index, result)
+        if args.sidecar and result.status == STATUS_OK:
+            try:
+                _write_sidecar(image_path, result)
+            except OSError as e:
+                print(f"No se pudo guardar el texto de {image_path}: {e}", file=sys.stderr)
+        if not args.quiet:
+            print(f"[{completed}/{total}] {result.status:<5} {image_path}", file=sys.stderr)
+
+    try:
+        while True:
+            ready = [(watcher, path) for watcher in watchers for path in watcher.poll()]
+            if not ready:
+                wake.wait(args.poll)
+                wake.clear()
+                continue
+            engine.run(expand_pages([path for _, path in ready]), args.color, on_progress=on_progress, detailed=True)
+            for watcher, path in ready:
+                watcher.mark_done(path)
+    except KeyboardInterrupt:
+        engine.cancel()
+        print("Vigilancia detenida.", file=sys.stderr)
+    finally:
+        engine.shutdown()
+        for watcher in watchers:
+            watcher.stop()
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.output:
+        # Vigilando, los resultados se agregan a los de ejecuciones anteriores
+        with open(args.output, "a" if args.watch else "w", encoding="utf-8") as out:
+            return run(args, out)
+    # En Windows la consola puede no ser UTF-8: JSON con acentos sin romper la salida
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+    return run(args, sys.stdout)
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
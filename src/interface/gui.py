@@ -13,11 +13,23 @@ import os
 import threading
 import queue
 import pathlib
-
-from src.core import use_cases
-from src.infrastructure.ocr_service import OcrService
+import bisect
+import time
+from dataclasses import replace
+from typing import Optional
+
+from src.interface.preview_cache import PreviewCache
+from src.infrastructure.ocr_config import SUGGESTED_NEAR_DUPLICATE_DISTANCE
+from src.infrastructure.ocr_result import STATUS_OK, STATUS_EMPTY
+from src.infrastructure.page_refs import DOCUMENT_EXTENSIONS, split_page_ref
+# El motor OCR (OpenCV, numpy, Tesseract) se importa en segundo plano: ver App._init_ocr_stack
 from tkinterdnd2 import DND_FILES, TkinterDnD
 
+# Tiempo máximo (segundos) que cada tick de la interfaz dedica a vaciar la cola de eventos
+QUEUE_DRAIN_BUDGET = 0.03
+# Archivos que se pueden abrir (los TIFF y PDF pueden tener varias páginas)
+SUPPORTED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp') + DOCUMENT_EXTENSIONS
+
 # --- INCRUSTACIÓN DE ASSETS POR CÓDIGO ---
 ICONO_DROP_B64 = base64.b64decode(
     b'iVBORw0KGgoAAAANSUhEUgAAAEAAAABACAYAAACqaXHeAAAABGdBTUEAALGPC/xhBQAAACBjSFJNAAB6JgAA'
@@ -70,7 +82,7 @@ import ctypes
 from ctypes import windll
 
 class App(TkinterDnD.Tk):
-    def __init__(self, ocr_service: OcrService):
+    def __init__(self, ocr_service=None):
         ctk.set_appearance_mode("Light")
         super().__init__()
         
@@ -93,12 +105,25 @@ class App(TkinterDnD.Tk):
         
         self.geometry("1000x600")
 
-        self.ocr_service = ocr_service
-        self.batch_results: dict[str, str] = {}
+        # Se asignan cuando el motor termina de prepararse (mensaje "ocr_ready")
+        self.ocr_service = None
+        self.batch_engine = None
+        # ruta -> (índice en el trabajo, tiene texto). Los textos se leen del
+        # almacén del trabajo al abrir cada archivo (ver job_store)
+        self.batch_results: dict[str, tuple[int, bool, Optional[str]]] = {}
+        self.job_store = None
         self.copy_in_progress = False
         self.image_paths_to_process: list[str] = []
         self.ocr_result_queue = queue.Queue()
         self.active_file_button = None
+        self.batch_running = False
+        # Vistas previas reducidas, reutilizadas al navegar por los resultados
+        self.preview_cache = PreviewCache()
+        # Botones de la lista de archivos ordenados por índice de entrada
+        self._file_button_indices: list[int] = []
+        self._file_buttons: list[ctk.CTkButton] = []
+        # Documentos de varias páginas: ruta -> {"header", "pages": [(página, botón)], "expanded"}
+        self._document_groups: dict[str, dict] = {}
 
         self.drop_target_register(DND_FILES)
         self.dnd_bind('<<Drop>>', self._on_drop)
@@ -107,6 +132,8 @@ class App(TkinterDnD.Tk):
         self.minimize_functional_var = ctk.BooleanVar(value=True)
         self.adjust_720p_var = ctk.BooleanVar(value=True)
         self.show_taskbar_var = ctk.BooleanVar(value=True)
+        # Procesar una sola vez las fotos casi idénticas del lote (opcional, ver near_duplicates)
+        self.dedupe_var = ctk.BooleanVar(value=False)
         
         self.adjust_720p_var.trace_add("write", self._on_720p_change)
 
@@ -115,6 +142,25 @@ class App(TkinterDnD.Tk):
         
         self.after(200, self._set_taskbar_icon)
 
+        # La ventana aparece primero; el motor OCR se prepara sin bloquearla
+        self._update_status("Preparando el motor OCR...")
+        threading.Thread(target=self._init_ocr_stack, args=(ocr_service,), daemon=True).start()
+
+    def _init_ocr_stack(self, ocr_service):
+        try:
+            from src.infrastructure.ocr_service import OcrService
+            from src.infrastructure.batch_engine import BatchEngine
+            service = ocr_service or OcrService()
+            self.ocr_result_queue.put(("ocr_ready", (service, BatchEngine(service=service))))
+        except Exception as e:
+            self.ocr_result_queue.put(("ocr_error", f"Error al iniciar el motor OCR: {e}"))
+
+    def _on_ocr_ready(self, ocr_stack):
+        self.ocr_service, self.batch_engine = ocr_stack
+        if self.status_label.cget("text") == "Preparando el motor OCR...":
+            self._update_status("Listo.")
+        self._set_ui_state("normal")
+
     def _set_taskbar_icon(self):
         """Hack para mostrar ventana en barra de tareas siendo frameless (overrideredirect=True)"""
         try:
@@ -153,20 +199,46 @@ class App(TkinterDnD.Tk):
         self.drop_icon = None
         self.save_all_icon = None
         self.clean_text_icon = None
+        # Los PNG se decodifican en segundo plano; los widgets se crean sin icono
+        # y lo reciben en _apply_assets (Tk solo puede usarse desde este hilo)
+        threading.Thread(target=self._decode_assets, daemon=True).start()
+
+    def _decode_assets(self):
         try:
             assets_path = pathlib.Path(__file__).parent.parent.parent / "assets"
-            
-            self.copy_icon = ctk.CTkImage(Image.open(assets_path / "copy_icon.png"))
-            self.save_icon = ctk.CTkImage(Image.open(assets_path / "save_icon.png"))
-            self.save_all_icon = ctk.CTkImage(Image.open(assets_path / "save_all_icon.png"))
-            self.clean_text_icon = ctk.CTkImage(Image.open(assets_path / "clean_text_icon.png"))
+            images = {}
+            for name in ("copy_icon", "save_icon", "save_all_icon", "clean_text_icon", "app_icon"):
+                if name == "app_icon" and not (assets_path / "app_icon.png").exists():
+                    continue
+                images[name] = Image.open(assets_path / f"{name}.png")
+                images[name].load()
+            images["drop_icon"] = Image.open(io.BytesIO(ICONO_DROP_B64))
+            images["drop_icon"].load()
+            self.ocr_result_queue.put(("assets", images))
+        except Exception as e:
+            print(f"Advertencia: No se pudieron cargar los iconos: {e}")
+
+    def _apply_assets(self, images):
+        try:
+            self.copy_icon = ctk.CTkImage(images["copy_icon"])
+            self.save_icon = ctk.CTkImage(images["save_icon"])
+            self.save_all_icon = ctk.CTkImage(images["save_all_icon"])
+            self.clean_text_icon = ctk.CTkImage(images["clean_text_icon"])
 
-            drop_pil_image = Image.open(io.BytesIO(ICONO_DROP_B64))
+            drop_pil_image = images["drop_icon"]
             self.drop_icon = ctk.CTkImage(light_image=drop_pil_image, dark_image=drop_pil_image, size=(64, 64))
-            
-            if (assets_path / "app_icon.png").exists():
-                 app_icon = Image.open(assets_path / "app_icon.png")
-                 self.iconphoto(False, ctk.CTkImage(app_icon)._light_image)
+
+            if not self.copy_in_progress:
+                self.copy_button.configure(image=self.copy_icon)
+            self.save_button.configure(image=self.save_icon)
+            self.save_all_button.configure(image=self.save_all_icon)
+            self.clean_text_button.configure(image=self.clean_text_icon)
+            # El estado vacío se vuelve a dibujar para incluir el icono de arrastre
+            if not self.image_paths_to_process:
+                self._create_image_label()
+
+            if "app_icon" in images:
+                 self.iconphoto(False, ctk.CTkImage(images["app_icon"])._light_image)
             else:
                  self.iconphoto(False, drop_pil_image)
             
@@ -214,6 +286,10 @@ class App(TkinterDnD.Tk):
         
         self.help_button = ctk.CTkButton(self.top_frame, text="Ayuda (?)", command=self._show_help_window, fg_color=self.COLOR_SECONDARY, hover_color=self.COLOR_SECONDARY_HOVER, **btn_style)
         self.help_button.grid(row=0, column=2, padx=5, pady=10)
+
+        self.dedupe_checkbox = ctk.CTkCheckBox(self.top_frame, text="Omitir fotos repetidas", variable=self.dedupe_var, font=self.FONT_BODY, text_color=self.COLOR_TEXT, fg_color=self.COLOR_SECONDARY, hover_color=self.COLOR_SECONDARY_HOVER)
+        self.dedupe_checkbox.grid(row=0, column=3, padx=(15, 5), pady=10)
+        Tooltip(self.dedupe_checkbox, "De las fotos casi idénticas y con el mismo resaltado, procesar solo la más nítida y reutilizar su texto", self.COLOR_FRAME)
         
         self.extract_button = ctk.CTkButton(self.top_frame, text="Extraer Texto", command=self._start_ocr_process, state="disabled", fg_color=self.COLOR_PRIMARY, hover_color=self.COLOR_PRIMARY_HOVER, **btn_style)
         self.extract_button.grid(row=0, column=6, padx=(5, 10), pady=10)
@@ -270,6 +346,8 @@ class App(TkinterDnD.Tk):
         self.status_label = ctk.CTkLabel(self.status_frame, text="Listo.", text_color=self.COLOR_TEXT, font=self.FONT_BODY)
         self.status_label.pack(side="left", padx=15, pady=8)
         self.progress_bar = ctk.CTkProgressBar(self.status_frame, mode='determinate', progress_color=self.COLOR_SECONDARY)
+        self.cancel_button = ctk.CTkButton(self.status_frame, text="Cancelar", command=self._cancel_batch, width=90, height=26, corner_radius=8,
+                                           font=(self.FONT_BODY[0], 12, "bold"), fg_color=self.COLOR_PRIMARY, hover_color=self.COLOR_PRIMARY_HOVER, text_color="white")
     
     def _create_image_label(self, image_object=None):
         for widget in self.image_frame.winfo_children():
@@ -294,7 +372,7 @@ class App(TkinterDnD.Tk):
             drop_text_label.grid(row=1, column=0, sticky="n")
 
     def _select_image(self):
-        filepath = filedialog.askopenfilename(filetypes=(("Archivos de imagen", "*.jpg *.jpeg *.png *.bmp"), ("Todos los archivos", "*.*")))
+        filepath = filedialog.askopenfilename(filetypes=(("Imágenes y documentos", " ".join(f"*{ext}" for ext in SUPPORTED_EXTENSIONS)), ("Todos los archivos", "*.*")))
         if not filepath: return
         self.image_paths_to_process = [filepath]
         self._load_and_display_image(filepath)
@@ -302,7 +380,7 @@ class App(TkinterDnD.Tk):
     def _select_folder(self):
         folder_path = filedialog.askdirectory(title="Seleccionar Carpeta para Procesar")
         if not folder_path: return
-        image_paths = sorted([os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp'))])
+        image_paths = sorted([os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.lower().endswith(SUPPORTED_EXTENSIONS)])
         if image_paths:
             self.image_paths_to_process = image_paths
             self._load_and_display_image(image_paths[0])
@@ -333,7 +411,8 @@ class App(TkinterDnD.Tk):
     
     def _load_and_display_image(self, filepath):
         try:
-            pil_image = Image.open(filepath)
+            pil_image = self.preview_cache.get(filepath)
+            self._prefetch_neighbors(filepath)
             self._update_status(f"Vista previa: {os.path.basename(filepath)}")
             self.clear_image_button.place(relx=1.0, rely=0.0, anchor="ne", x=-7, y=7)
             self.after(50, lambda: self._update_image_preview(pil_image))
@@ -343,6 +422,15 @@ class App(TkinterDnD.Tk):
             self.image_paths_to_process.clear()
             self._set_ui_state("normal")
 
+    def _prefetch_neighbors(self, filepath):
+        """Prepara en segundo plano las vistas previas del archivo siguiente y del anterior."""
+        paths = self.image_paths_to_process
+        try:
+            index = paths.index(filepath)
+        except ValueError:
+            return
+        self.preview_cache.prefetch([paths[i] for i in (index + 1, index - 1) if 0 <= i < len(paths)])
+
     def _update_image_preview(self, pil_image):
         if not self.image_frame.winfo_exists(): return
         container_width, container_height = self.image_frame.winfo_width() - 40, self.image_frame.winfo_height() - 40
@@ -362,72 +450,203 @@ class App(TkinterDnD.Tk):
             self._update_status("Error: Por favor, seleccione una imagen o carpeta primero.")
 
     def _start_batch_ocr_thread(self, image_paths):
+        self.batch_running = True
         self._set_ui_state("disabled")
         self.result_textbox.delete("0.0", "end")
         self.batch_results.clear()
         if self.active_file_button:
             self.active_file_button = None
         self._clear_file_list()
+        self.cancel_button.pack(side="right", padx=(0, 15), pady=8)
         self.progress_bar.pack(side="right", padx=15, pady=8, fill="x", expand=True)
         self.progress_bar.set(0)
         
         selected_color = "auto"
+        # Casi duplicados: campo de ejecución, no cambia el trabajo guardado (ver job_store)
+        distance = SUGGESTED_NEAR_DUPLICATE_DISTANCE if self.dedupe_var.get() else 0
+        self.ocr_service.config = replace(self.ocr_service.config, near_duplicate_distance=distance)
         
         thread = threading.Thread(target=self._ocr_batch_worker, args=(image_paths, selected_color), daemon=True)
         thread.start()
         
     def _ocr_batch_worker(self, image_paths, color):
-        total_images = len(image_paths)
-        for i, image_path in enumerate(image_paths):
-            progress_msg = f"Procesando {i+1}/{total_images}: {os.path.basename(image_path)}"
+        from src.infrastructure.job_store import JobStore
+        from src.infrastructure.documents import expand_pages
+        completed_count = 0
+
+        def on_progress(completed, total, index, image_path, result):
+            nonlocal completed_count
+            completed_count = completed
+            # Cada imagen se lista en cuanto termina (batch_results se llena en el hilo de la interfaz)
+            has_text = result.status != STATUS_EMPTY and bool(result.text.strip())
+            self.ocr_result_queue.put(("result", (index, image_path, has_text, result.duplicate_of)))
+            progress_msg = f"Procesado {completed}/{total}: {os.path.basename(image_path)}"
             self.ocr_result_queue.put(("progress", progress_msg))
-            result = use_cases.extraer_texto_de_imagen(self.ocr_service, image_path, color)
-            self.batch_results[image_path] = result.strip()
-            progress_value = (i + 1) / total_images
-            self.ocr_result_queue.put(("progress_update", progress_value))
-        self.ocr_result_queue.put(("done", "Proceso finalizado."))
+            self.ocr_result_queue.put(("progress_update", completed / total))
+
+        try:
+            # Cada página de un TIFF / PDF es una entrada más del lote (se reparten entre procesos)
+            image_paths = expand_pages(image_paths)
+            self.ocr_result_queue.put(("paths", image_paths))
+            # Los resultados se guardan en disco en cuanto salen: relanzar el mismo
+            # lote (p. ej. tras cerrar la aplicación) retoma donde quedó
+            store = JobStore.open(image_paths, color, self.ocr_service.config)
+            self.ocr_result_queue.put(("job", store))
+            resumed = store.completed()
+            for index, image_path, status, duplicate_of in resumed:
+                self.ocr_result_queue.put(("result", (index, image_path, status == STATUS_OK, duplicate_of)))
+            completed_count = len(resumed)
+            if resumed:
+                self.ocr_result_queue.put(("progress", f"Reanudando: {len(resumed)}/{len(image_paths)} imágenes ya procesadas."))
+                self.ocr_result_queue.put(("progress_update", len(resumed) / len(image_paths)))
+
+            self.batch_engine.run_job(store, color, on_progress=on_progress)
+        except Exception as e:
+            self.ocr_result_queue.put(("done", f"Error durante el procesamiento por lotes: {e}"))
+            return
+
+        if self.batch_engine.cancelled:
+            self.ocr_result_queue.put(("done", f"Proceso cancelado ({completed_count}/{len(image_paths)} imágenes procesadas)."))
+        else:
+            self.ocr_result_queue.put(("done", "Proceso finalizado."))
+
+    def _cancel_batch(self):
+        self.batch_engine.cancel()
+        self.cancel_button.configure(state="disabled")
+        self._update_status("Cancelando... esperando a que terminen las imágenes en curso.")
 
     def _check_ocr_queue(self):
+        """
+        Vacía la cola en cada tick (hasta QUEUE_DRAIN_BUDGET). Los mensajes de
+        progreso se agrupan: solo se pinta el último de cada tipo.
+        """
+        deadline = time.perf_counter() + QUEUE_DRAIN_BUDGET
+        last_status = last_progress = None
         try:
-            message_type, data = self.ocr_result_queue.get_nowait()
-            if message_type == "progress": self._update_status(data)
-            elif message_type == "progress_update": self.progress_bar.set(data)
-            elif message_type == "done": self._process_ocr_result(data)
+            while time.perf_counter() < deadline:
+                message_type, data = self.ocr_result_queue.get_nowait()
+                if message_type == "progress": last_status = data
+                elif message_type == "progress_update": last_progress = data
+                elif message_type == "result": self._add_result(*data)
+                elif message_type == "job": self._set_job_store(data)
+                elif message_type == "paths": self.image_paths_to_process = data
+                elif message_type == "done":
+                    last_status = last_progress = None
+                    self._process_ocr_result(data)
+                elif message_type == "assets": self._apply_assets(data)
+                elif message_type == "ocr_ready": self._on_ocr_ready(data)
+                elif message_type == "ocr_error": self._update_status(data)
         except queue.Empty: pass
-        finally: self.after(100, self._check_ocr_queue)
+        finally:
+            if last_status is not None: self._update_status(last_status)
+            if last_progress is not None: self.progress_bar.set(last_progress)
+            # Si quedó trabajo pendiente se vuelve enseguida; si no, al ritmo normal
+            self.after(10 if not self.ocr_result_queue.empty() else 100, self._check_ocr_queue)
+
+    def _set_job_store(self, store):
+        if self.job_store is not None and self.job_store is not store:
+            self.job_store.close()
+        self.job_store = store
+
+    def _add_result(self, index, filepath, has_text, duplicate_of=None):
+        self.batch_results[filepath] = (index, has_text, duplicate_of)
+        btn = self._add_file_button(index, filepath)
+        # La primera imagen terminada se muestra sin esperar al resto del lote
+        if self.active_file_button is None:
+            btn.invoke()
 
     def _process_ocr_result(self, final_message):
         self.progress_bar.set(1)
         self.progress_bar.pack_forget()
+        self.cancel_button.pack_forget()
+        self.cancel_button.configure(state="normal")
         self._update_status(final_message)
-        self._populate_file_list()
-        if self.batch_results:
-            first_button = next(iter(self.file_list_frame.winfo_children()), None)
-            if first_button:
-                first_button.invoke()
+        self.batch_running = False
         self.after(50, lambda: self._set_ui_state("normal"))
 
     def _clear_file_list(self):
         for widget in self.file_list_frame.winfo_children(): widget.destroy()
-
-    def _populate_file_list(self):
-        self._clear_file_list()
-        self.active_file_button = None
+        self._file_button_indices.clear()
+        self._file_buttons.clear()
+        self._document_groups.clear()
+
+    def _add_file_button(self, index, filepath):
+        """
+        Agrega un archivo a la lista respetando el orden de entrada del lote.
+        Las páginas de un documento se agrupan bajo una cabecera desplegable.
+        """
+        document_path, page = split_page_ref(filepath)
+        filename = os.path.basename(document_path)
+        group = None
+        if page is not None:
+            group = self._document_groups.get(document_path)
+            if group is None:
+                # Las páginas de un documento son consecutivas en el lote: la
+                # cabecera va justo antes de la primera, aunque llegue más tarde
+                group = self._add_document_header(document_path, index - page + 0.5)
+            filename = f"Página {page}"
         
-        for filepath in self.batch_results.keys():
-            filename = os.path.basename(filepath)
-            
-            texto_resultado = self.batch_results.get(filepath, "")
-            sin_texto = not texto_resultado.strip() or "No se encontró texto" in texto_resultado
-            
-            text_color = "#A0A0A0" if sin_texto else self.COLOR_TEXT_SECONDARY
-            display_text = f"📄 {filename}" if sin_texto else filename
+        sin_texto = not self.batch_results[filepath][1]
+        duplicate_of = self.batch_results[filepath][2]
+        
+        text_color = "#A0A0A0" if sin_texto else self.COLOR_TEXT_SECONDARY
+        display_text = f"📄 {filename}" if sin_texto else filename
+        if duplicate_of:
+            # Casi idéntica a otra imagen del lote: se reutilizó su texto
+            display_text = f"🔁 {display_text}"
+
+        btn = ctk.CTkButton(self.file_list_frame, text=display_text, font=self.FONT_BODY, 
+                            fg_color="transparent", text_color=text_color, hover_color=self.COLOR_FRAME, 
+                            anchor="w")
+        btn.configure(command=lambda f=filepath, b=btn: self._display_text_for_file(f, b))
+        if duplicate_of:
+            Tooltip(btn, f"Casi idéntica a {os.path.basename(duplicate_of)}: se reutilizó su texto", self.COLOR_FRAME)
+
+        if group is None:
+            self._insert_file_button(index, btn, padx=5)
+        else:
+            self._insert_file_button(index, btn, padx=(25, 5), visible=group["expanded"])
+            bisect.insort(group["pages"], (page, btn))
+        return btn
+
+    def _add_document_header(self, document_path, position_key):
+        group = {"pages": [], "expanded": True}
+        group["header"] = ctk.CTkButton(self.file_list_frame, text=self._document_label(document_path, True),
+                                        font=self.FONT_BUTTON, fg_color="transparent", text_color=self.COLOR_TEXT,
+                                        hover_color=self.COLOR_FRAME, anchor="w",
+                                        command=lambda d=document_path: self._toggle_document(d))
+        self._insert_file_button(position_key, group["header"], padx=5)
+        self._document_groups[document_path] = group
+        return group
+
+    def _insert_file_button(self, position_key, btn, padx, visible=True):
+        position = bisect.bisect(self._file_button_indices, position_key)
+        if visible:
+            # Se empaqueta antes del siguiente botón visible (los de documentos plegados no lo están)
+            following = next((b for b in self._file_buttons[position:] if b.winfo_manager()), None)
+            if following is not None:
+                btn.pack(fill="x", padx=padx, pady=2, before=following)
+            else:
+                btn.pack(fill="x", padx=padx, pady=2)
+        self._file_button_indices.insert(position, position_key)
+        self._file_buttons.insert(position, btn)
+
+    def _toggle_document(self, document_path):
+        """Pliega o despliega las páginas de un documento en la lista."""
+        group = self._document_groups[document_path]
+        group["expanded"] = not group["expanded"]
+        group["header"].configure(text=self._document_label(document_path, group["expanded"]))
+        previous = group["header"]
+        for _, btn in group["pages"]:
+            if group["expanded"]:
+                btn.pack(fill="x", padx=(25, 5), pady=2, after=previous)
+                previous = btn
+            else:
+                btn.pack_forget()
 
-            btn = ctk.CTkButton(self.file_list_frame, text=display_text, font=self.FONT_BODY, 
-                                fg_color="transparent", text_color=text_color, hover_color=self.COLOR_FRAME, 
-                                anchor="w")
-            btn.configure(command=lambda f=filepath, b=btn: self._display_text_for_file(f, b))
-            btn.pack(fill="x", padx=5, pady=2)
+    @staticmethod
+    def _document_label(document_path, expanded):
+        return f"{'▾' if expanded else '▸'} {os.path.basename(document_path)}"
 
     def _display_text_for_file(self, filepath: str, button_widget: ctk.CTkButton):
         if self.active_file_button:
@@ -437,16 +656,25 @@ class App(TkinterDnD.Tk):
         self.active_file_button = button_widget
 
         self._load_and_display_image(filepath)
-        text = self.batch_results.get(filepath, "Error: No se encontró el texto para este archivo.")
+        entry = self.batch_results.get(filepath)
+        text = self.job_store.text(entry[0]) if entry and self.job_store else None
+        if text is None:
+            text = "Error: No se encontró el texto para este archivo."
         self.result_textbox.delete("0.0", "end")
         self.result_textbox.insert("0.0", text)
+        if entry and entry[2]:
+            self._update_status(f"Texto reutilizado de {os.path.basename(entry[2])} (imagen casi idéntica).")
         self._set_ui_state("normal")
     
     def _set_ui_state(self, state: str):
         is_normal = state == "normal"
-        for widget in [self.select_image_button, self.batch_button, self.help_button]: widget.configure(state=state)
+        # Durante un lote se pueden consultar los resultados, pero no lanzar otro
+        controls_state = "disabled" if self.batch_running else state
+        for widget in [self.select_image_button, self.batch_button, self.help_button, self.dedupe_checkbox]: widget.configure(state=controls_state)
         
-        self.extract_button.configure(state="normal" if is_normal and self.image_paths_to_process else "disabled")
+        ocr_ready = self.batch_engine is not None
+        can_extract = controls_state == "normal" and ocr_ready and self.image_paths_to_process
+        self.extract_button.configure(state="normal" if can_extract else "disabled")
         
         has_text = len(self.result_textbox.get("0.0", "end-1c").strip()) > 0
         can_copy_save = is_normal and has_text
@@ -456,8 +684,9 @@ class App(TkinterDnD.Tk):
         
         self.save_button.configure(state="normal" if can_copy_save else "disabled", fg_color=self.COLOR_PRIMARY if can_copy_save else self.COLOR_DISABLED)
         
-        self.save_all_button.configure(state="normal" if is_normal and len(self.batch_results) > 1 else "disabled",
-                                       fg_color=self.COLOR_PRIMARY if is_normal and len(self.batch_results) > 1 else self.COLOR_DISABLED)
+        can_save_all = controls_state == "normal" and len(self.batch_results) > 1
+        self.save_all_button.configure(state="normal" if can_save_all else "disabled",
+                                       fg_color=self.COLOR_PRIMARY if can_save_all else self.COLOR_DISABLED)
         
         self.clean_text_button.configure(state="normal" if can_copy_save else "disabled",
                                          fg_color=self.COLOR_SECONDARY if can_copy_save else self.COLOR_DISABLED)
@@ -493,12 +722,20 @@ class App(TkinterDnD.Tk):
         if not folder_path: return
 
         saved_count = 0
-        for filepath, text in self.batch_results.items():
-            if not text.strip() or "No se encontró texto" in text:
+        # Se lee del almacén de a un resultado: no hace falta tenerlos todos en memoria
+        for _, filepath, _, text, duplicate_of in self.job_store.iter_results():
+            text = (text or "").strip()
+            if not text or "No se encontró texto" in text:
                 continue
+            if duplicate_of:
+                # El texto es el de la imagen más nítida del grupo: se indica de cuál
+                text = f"[Casi idéntica a {os.path.basename(duplicate_of)}: texto reutilizado]\n\n{text}"
 
-            base_name = os.path.basename(filepath)
+            document_path, page = split_page_ref(filepath)
+            base_name = os.path.basename(document_path)
             file_name_without_ext = os.path.splitext(base_name)[0]
+            if page is not None:
+                file_name_without_ext = f"{file_name_without_ext}_p{page}"
             new_filepath = os.path.join(folder_path, f"{file_name_without_ext}.txt")
             
             try:
@@ -565,11 +802,17 @@ class App(TkinterDnD.Tk):
 
     def _start_move(self, event): self.x, self.y = event.x, event.y
     def _do_move(self, event): self.geometry(f"+{self.winfo_x() + event.x - self.x}+{self.winfo_y() + event.y - self.y}")
-    def _close_window(self): self.destroy()
+    def _close_window(self):
+        if self.batch_engine is not None:
+            self.batch_engine.cancel()
+            self.batch_engine.shutdown()
+        self.preview_cache.shutdown()
+        if self.job_store is not None and not self.batch_running:
+            self.job_store.close()
+        self.destroy()
 
 def main():
-    ocr_service = OcrService()
-    app = App(ocr_service=ocr_service)
+    app = App()
     app.mainloop()
 
 if __name__ == "__main__":
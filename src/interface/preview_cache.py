@@ -0,0 +1,125 @@
+# src/interface/preview_cache.py
+"""
+Módulo de la interfaz con la caché de vistas previas: imágenes reducidas al
+tamaño de pantalla, decodificadas en modo borrador (los JPEG se decodifican
+directamente a 1/2, 1/4 u 1/8 de su tamaño) y acotadas por memoria. Acepta
+referencias a páginas de documentos ("documento.pdf#page=3").
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from PIL import Image
+
+from src.infrastructure.page_refs import PDF_EXTENSIONS, split_page_ref
+
+# Tamaño máximo de una vista previa (cubre el panel con la ventana maximizada)
+PREVIEW_MAX_SIZE = (1280, 1280)
+# Memoria máxima ocupada por las vistas previas en caché
+PREVIEW_CACHE_MAX_BYTES = 96 * 1024 * 1024
+
+
+class PreviewCache:
+    """
+    Caché LRU de vistas previas acotada en bytes, segura entre hilos.
+    Las entradas se invalidan si el archivo cambia (tamaño o fecha).
+    """
+
+    def __init__(self, max_bytes: int = PREVIEW_CACHE_MAX_BYTES, max_size: tuple[int, int] = PREVIEW_MAX_SIZE):
+        self.max_bytes = max_bytes
+        self.max_size = max_size
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, tuple[tuple, Image.Image, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: set[str] = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def get(self, path: str) -> Image.Image:
+        """Devuelve la vista previa (de la caché o decodificándola). Lanza la excepción de PIL si no se puede abrir."""
+        cached = self._lookup(path)
+        if cached is not None:
+            return cached
+        return self._load(path)
+
+    def prefetch(self, paths: Iterable[str]):
+        """Decodifica en segundo plano las vistas previas que aún no están en caché."""
+        for path in paths:
+            with self._lock:
+                if path in self._entries or path in self._pending:
+                    continue
+                self._pending.add(path)
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview")
+            self._executor.submit(self._prefetch_one, path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # --- Internos ---
+    def _prefetch_one(self, path: str):
+        try:
+            if self._lookup(path) is None:
+                self._load(path)
+        except Exception:
+            pass  # Si falla, el error se mostrará al abrirla
+        finally:
+            with self._lock:
+                self._pending.discard(path)
+
+    def _lookup(self, path: str) -> Optional[Image.Image]:
+        stamp = self._stamp(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            if entry[0] != stamp:
+                self._remove(path)
+                return None
+            self._entries.move_to_end(path)
+            return entry[1]
+
+    def _load(self, path: str) -> Image.Image:
+        stamp = self._stamp(path)
+        source_path, page = split_page_ref(path)
+        if page is not None or source_path.lower().endswith(PDF_EXTENSIONS):
+            # Importación diferida: la lectura de documentos arrastra OpenCV
+            from src.infrastructure.documents import preview_page
+            preview = preview_page(source_path, page or 1, self.max_size)
+        else:
+            with Image.open(path) as image:
+                # Modo borrador: el decodificador JPEG reduce la escala al leer
+                image.draft("RGB", self.max_size)
+                preview = image.copy() if image.mode in ("RGB", "RGBA", "L") else image.convert("RGB")
+            preview.thumbnail(self.max_size, Image.Resampling.BILINEAR)
+        size = preview.width * preview.height * len(preview.getbands())
+
+        with self._lock:
+            if path in self._entries:
+                self._remove(path)
+            if size <= self.max_bytes:
+                self._entries[path] = (stamp, preview, size)
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+        return preview
+
+    def _remove(self, path: str):
+        _, _, size = self._entries.pop(path)
+        self.total_bytes -= size
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(split_page_ref(path)[0])
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
@@ -0,0 +1,548 @@
+# src/interface/server.py
+"""
+Módulo que implementa el modo servidor: un único equipo con Tesseract atiende
+por HTTP a toda la oficina, sin instalarlo en cada puesto.
+
+Los clientes suben una imagen o un lote y reciben el id del trabajo; después
+consultan el estado o reciben los resultados a medida que terminan. Cada
+imagen (o página de un TIFF / PDF) pasa por una cola interna acotada hacia
+el pool de procesos de AsyncOcrService, con la misma configuración del
+pipeline para todos los trabajos. Con la cola llena se responde 503 en vez
+de aceptar trabajo sin límite; un trabajo con más imágenes que la cola se
+admite cuando está vacía y sus imágenes entran a medida que se liberan lugares.
+
+Solo usa la biblioteca estándar y por defecto escucha en 127.0.0.1.
+
+Endpoints:
+    POST   /jobs?name=foto.jpg&color=auto   Cuerpo: una imagen
+    POST   /jobs                            Cuerpo JSON: {"color": "auto", "images": [{"name": ..., "data": <base64>}]}
+    GET    /jobs/<id>                       Estado y resultados hasta el momento
+    GET    /jobs/<id>/stream                Una línea JSON por resultado, a medida que terminan
+    DELETE /jobs/<id>                       Cancela las imágenes que no empezaron
+    GET    /metrics                         Cola, rendimiento y trabajos (texto de Prometheus)
+    GET    /health
+
+Uso:
+    python -m src.interface.server --port 8765 --workers 4
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import collections
+import json
+import mimetypes
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from src.infrastructure.async_ocr import AsyncOcrService, TIMEOUT_MESSAGE, error_result
+from src.infrastructure.documents import expand_pages
+from src.infrastructure.ocr_config import OcrConfig
+from src.infrastructure.ocr_result import OcrResult, STATUS_ERROR, STATUS_EMPTY, STATUS_OK
+from src.infrastructure.page_refs import split_page_ref
+from src.interface.cli import IMAGE_EXTENSIONS, add_pipeline_arguments, config_from_args, result_record
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Imágenes (o páginas) esperando en la cola como máximo
+DEFAULT_QUEUE_SIZE = 256
+# Tamaño máximo del cuerpo de una petición
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+# Los trabajos terminados se olvidan (y se liberan sus resultados) pasado este tiempo
+JOB_RETENTION_SECONDS = 3600
+# Ventana sobre la que se calcula el rendimiento (imágenes / segundo)
+THROUGHPUT_WINDOW_SECONDS = 60
+# Segundos sugeridos al cliente para reintentar con la cola llena
+RETRY_AFTER_SECONDS = 5
+
+# Estados de un trabajo
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_CANCELLED = "cancelled"
+# Estado de las imágenes descartadas al cancelar
+STATUS_CANCELLED = "cancelled"
+
+
+class QueueFullError(Exception):
+    """La cola no tiene lugar para todas las imágenes del trabajo."""
+
+
+class UploadError(ValueError):
+    """Petición de trabajo mal formada."""
+
+
+# --- Trabajos ---
+class Job:
+    """Un lote subido por un cliente. Se consulta desde los hilos HTTP: todo cambio va bajo condition."""
+
+    def __init__(self, job_id: str, color: str, names: list[str], image_paths: list[str], spool_dir: str):
+        self.id = job_id
+        self.color = color
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        # Nombre subido por el cliente de cada imagen (las páginas comparten nombre)
+        self.names = names
+        self.image_paths = image_paths
+        self.spool_dir = spool_dir
+        self.results: list[Optional[dict]] = [None] * len(image_paths)
+        # Índices en orden de finalización (para /stream)
+        self.completion_order: list[int] = []
+        self.started = 0
+        self.cancelled = False
+        self.condition = threading.Condition()
+
+    @property
+    def total(self) -> int:
+        return len(self.image_paths)
+
+    @property
+    def done(self) -> bool:
+        return len(self.completion_order) == self.total
+
+    @property
+    def status(self) -> str:
+        if self.cancelled:
+            return JOB_CANCELLED
+        if self.done:
+            return JOB_DONE
+        return JOB_RUNNING if self.started else JOB_QUEUED
+
+    def summary(self) -> dict:
+        with self.condition:
+            return {
+                "job": self.id,
+                "status": self.status,
+                "color": self.color,
+                "total": self.total,
+                "completed": len(self.completion_order),
+                "created": round(self.created, 3),
+                "finished": round(self.finished, 3) if self.finished else None,
+            }
+
+    def snapshot(self) -> dict:
+        summary = self.summary()
+        with self.condition:
+            summary["results"] = [self.results[index] for index in self.completion_order]
+        return summary
+
+
+class OcrJobServer:
+    """
+    Cola de trabajos sobre AsyncOcrService. El bucle de eventos corre en un
+    hilo propio; los hilos HTTP le entregan los trabajos y leen los
+    resultados de los objetos Job.
+    """
+
+    def __init__(self, config: Optional[OcrConfig] = None, max_workers: Optional[int] = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, timeout: Optional[float] = None):
+        self.config = config or OcrConfig()
+        self.ocr = AsyncOcrService(max_concurrency=max_workers, timeout=timeout, service_kwargs={"config": self.config})
+        self.queue_size = queue_size
+        self.jobs: dict[str, Job] = {}
+        self._jobs_lock = threading.Lock()
+
+        # Métricas
+        self.started_at = time.time()
+        self.jobs_submitted = 0
+        self.jobs_rejected = 0
+        self.images_by_status: collections.Counter = collections.Counter()
+        self.image_seconds = 0.0
+        self.in_flight = 0
+        self._recent_completions: collections.deque = collections.deque()
+        self._metrics_lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        # Imágenes admitidas que todavía esperan lugar en la cola (trabajos más grandes que la cola)
+        self._pending = 0
+        self._feeders: set[asyncio.Task] = set()
+
+    # --- Ciclo de vida ---
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="ocr-jobs", daemon=True)
+        self._loop_thread.start()
+        self._call(self._start_workers())
+
+    def stop(self):
+        if self._loop is None:
+            return
+        self._call(self._stop_workers())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+        self._loop = None
+        with self._jobs_lock:
+            for job in self.jobs.values():
+                shutil.rmtree(job.spool_dir, ignore_errors=True)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() + self._pending if self._queue is not None else 0
+
+    # --- Trabajos ---
+    def submit(self, uploads: list[tuple[str, bytes]], color: str = "auto") -> Job:
+        """
+        Guarda las imágenes subidas (nombre, contenido) y encola el trabajo
+        entero, o nada: lanza QueueFullError si no hay lugar para todas sus
+        imágenes (o, si son más que la cola, si la cola no está vacía) y
+        UploadError si alguna no es un formato admitido.
+        """
+        if not uploads:
+            raise UploadError("El trabajo no tiene imágenes.")
+        self._prune_jobs()
+
+        spool_dir = tempfile.mkdtemp(prefix="ocr-job-")
+        names, image_paths = [], []
+        try:
+            for position, (name, content) in enumerate(uploads):
+                extension = os.path.splitext(name)[1].lower()
+                if extension not in IMAGE_EXTENSIONS:
+                    raise UploadError(f"Formato no admitido: {name!r}.")
+                # El nombre del cliente no se usa como ruta: solo su extensión
+                spooled = os.path.join(spool_dir, f"{position}{extension}")
+                with open(spooled, "wb") as f:
+                    f.write(content)
+                pages = expand_pages([spooled])
+                names.extend([name] * len(pages))
+                image_paths.extend(pages)
+
+            job = Job(uuid.uuid4().hex[:12], color, names, image_paths, spool_dir)
+            self._call(self._enqueue(job))
+        except BaseException as e:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+            if isinstance(e, QueueFullError):
+                with self._metrics_lock:
+                    self.jobs_rejected += 1
+            raise
+
+        with self._jobs_lock:
+            self.jobs[job.id] = job
+        with self._metrics_lock:
+            self.jobs_submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._jobs_lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Las imágenes que no empezaron se descartan; las que están en curso terminan."""
+        job = self.get(job_id)
+        if job is not None:
+            with job.condition:
+                if not job.done:
+                    job.cancelled = True
+                    job.condition.notify_all()
+        return job
+
+    def _prune_jobs(self):
+        limit = time.time() - JOB_RETENTION_SECONDS
+        with self._jobs_lock:
+            expired = [job for job in self.jobs.values() if job.finished and job.finished < limit]
+            for job in expired:
+                del self.jobs[job.id]
+
+    # --- Bucle de eventos ---
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _start_workers(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.ocr.max_concurrency)]
+
+    async def _stop_workers(self):
+        tasks = self._workers + list(self._feeders)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.ocr.aclose()
+
+    async def _enqueue(self, job: Job):
+        # Se ejecuta en el hilo del bucle: la comprobación y el encolado son atómicos
+        free = self._queue.maxsize - self.queue_depth
+        # Un trabajo que no cabe en la cola se admite solo con la cola vacía
+        if free < min(job.total, self._queue.maxsize):
+            raise QueueFullError(f"Cola llena ({self.queue_depth} imágenes en espera, capacidad {self._queue.maxsize}).")
+        for index in range(min(job.total, free)):
+            self._queue.put_nowait((job, index))
+        if job.total > free:
+            # El resto entra a medida que los workers liberan lugares; mientras tanto
+            # cuenta como ocupado y los demás trabajos reciben 503
+            self._pending = job.total - free
+            feeder = asyncio.ensure_future(self._feed(job, free))
+            self._feeders.add(feeder)
+            feeder.add_done_callback(self._feeders.discard)
+
+    async def _feed(self, job: Job, start: int):
+        for index in range(start, job.total):
+            await self._queue.put((job, index))
+            self._pending -= 1
+
+    async def _worker(self):
+        while True:
+            job, index = await self._queue.get()
+            try:
+                await self._process(job, index)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: Job, index: int):
+        image_path = job.image_paths[index]
+        with job.condition:
+            cancelled = job.cancelled
+            job.started += 1
+        if cancelled:
+            source_path, page = split_page_ref(image_path)
+            self._record(job, index, OcrResult(path=source_path, text="", status=STATUS_CANCELLED, page=page), 0.0)
+            return
+
+        with self._metrics_lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            # Cada trabajo es un lote: el idioma y la orientación aprendidos no pasan de un cliente a otro
+            result = await self.ocr.extract_result(image_path, job.color, batch_id=job.id)
+        except asyncio.TimeoutError:
+            result = error_result(image_path, TIMEOUT_MESSAGE.format(seconds=self.ocr.timeout))
+        except Exception as e:
+            result = error_result(image_path, f"Error: {e}")
+        finally:
+            with self._metrics_lock:
+                self.in_flight -= 1
+        self._record(job, index, result, time.perf_counter() - start)
+
+    def _record(self, job: Job, index: int, result: OcrResult, seconds: float):
+        record = result_record(index, result)
+        # La ruta es la del archivo temporal: se informa el nombre que subió el cliente
+        record["path"] = job.names[index]
+        with job.condition:
+            job.results[index] = record
+            job.completion_order.append(index)
+            if job.done:
+                job.finished = time.time()
+                shutil.rmtree(job.spool_dir, ignore_errors=True)
+            job.condition.notify_all()
+
+        now = time.monotonic()
+        with self._metrics_lock:
+            self.images_by_status[result.status] += 1
+            if result.status != STATUS_CANCELLED:
+                self.image_seconds += seconds
+                self._recent_completions.append(now)
+            while self._recent_completions and self._recent_completions[0] < now - THROUGHPUT_WINDOW_SECONDS:
+                self._recent_completions.popleft()
+
+    # --- Métricas ---
+    def metrics_text(self) -> str:
+        """Métricas del servidor en formato de texto de Prometheus."""
+        now = time.monotonic()
+        with self._metrics_lock:
+            while self._recent_completions and self._recent_completions[0] < now - THROUGHPUT_WINDOW_SECONDS:
+                self._recent_completions.popleft()
+            window = min(THROUGHPUT_WINDOW_SECONDS, max(time.time() - self.started_at, 1e-9))
+            throughput = len(self._recent_completions) / window
+            processed = sum(count for status, count in self.images_by_status.items() if status != STATUS_CANCELLED)
+            lines = [
+                "# HELP ocr_server_queue_depth Imágenes esperando en la cola.",
+                "# TYPE ocr_server_queue_depth gauge",
+                f"ocr_server_queue_depth {self.queue_depth}",
+                "# TYPE ocr_server_queue_capacity gauge",
+                f"ocr_server_queue_capacity {self.queue_size}",
+                "# HELP ocr_server_images_in_flight Imágenes en proceso.",
+                "# TYPE ocr_server_images_in_flight gauge",
+                f"ocr_server_images_in_flight {self.in_flight}",
+                "# HELP ocr_server_throughput_images_per_second Imágenes terminadas por segundo en la última ventana.",
+                "# TYPE ocr_server_throughput_images_per_second gauge",
+                f"ocr_server_throughput_images_per_second {throughput:.6g}",
+                "# TYPE ocr_server_jobs_total counter",
+                f"ocr_server_jobs_total {self.jobs_submitted}",
+                "# HELP ocr_server_jobs_rejected_total Trabajos rechazados con la cola llena.",
+                "# TYPE ocr_server_jobs_rejected_total counter",
+                f"ocr_server_jobs_rejected_total {self.jobs_rejected}",
+                "# TYPE ocr_server_images_total counter",
+            ]
+            for status in (STATUS_OK, STATUS_EMPTY, STATUS_ERROR, STATUS_CANCELLED):
+                lines.append(f'ocr_server_images_total{{status="{status}"}} {self.images_by_status[status]}')
+            lines += [
+                "# HELP ocr_server_image_seconds Tiempo de proceso de cada imagen (sin la espera en la cola).",
+                "# TYPE ocr_server_image_seconds summary",
+                f"ocr_server_image_seconds_sum {self.image_seconds:.6g}",
+                f"ocr_server_image_seconds_count {processed}",
+                "# TYPE ocr_server_uptime_seconds gauge",
+                f"ocr_server_uptime_seconds {time.time() - self.started_at:.3f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+# --- HTTP ---
+class OcrRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ExtractorOCR/1.0"
+
+    @property
+    def jobs(self) -> OcrJobServer:
+        return self.server.jobs
+
+    def do_GET(self):
+        parts = self._path_parts()
+        if parts == ["health"]:
+            return self._send_json({"status": "ok", "queue_depth": self.jobs.queue_depth})
+        if parts == ["metrics"]:
+            return self._send(HTTPStatus.OK, self.jobs.metrics_text().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return self._send_error(HTTPStatus.NOT_FOUND, "Trabajo inexistente.")
+            if len(parts) == 2:
+                return self._send_json(job.snapshot())
+            if parts[2] == "stream":
+                return self._stream(job)
+        self._send_error(HTTPStatus.NOT_FOUND, "Ruta inexistente.")
+
+    def do_POST(self):
+        if self._path_parts() != ["jobs"]:
+            return self._send_error(HTTPStatus.NOT_FOUND, "Ruta inexistente.")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_UPLOAD_BYTES:
+            return self._send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Máximo {MAX_UPLOAD_BYTES} bytes por petición.")
+        body = self.rfile.read(length)
+        query = parse_qs(urlsplit(self.path).query)
+
+        try:
+            uploads, color = self._parse_uploads(body, query)
+            job = self.jobs.submit(uploads, color)
+        except UploadError as e:
+            return self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+        except QueueFullError as e:
+            return self._send_error(HTTPStatus.SERVICE_UNAVAILABLE, str(e), {"Retry-After": str(RETRY_AFTER_SECONDS)})
+        self._send_json(job.summary(), HTTPStatus.ACCEPTED, {"Location": f"/jobs/{job.id}"})
+
+    def do_DELETE(self):
+        parts = self._path_parts()
+        job = self.jobs.cancel(parts[1]) if len(parts) == 2 and parts[0] == "jobs" else None
+        if job is None:
+            return self._send_error(HTTPStatus.NOT_FOUND, "Trabajo inexistente.")
+        self._send_json(job.summary())
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    # --- Auxiliares ---
+    def _parse_uploads(self, body: bytes, query: dict) -> tuple[list[tuple[str, bytes]], str]:
+        color = query.get("color", ["auto"])[0]
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            # Una sola imagen en el cuerpo
+            name = query.get("name", [None])[0]
+            if not name:
+                name = "imagen" + (mimetypes.guess_extension(content_type) or "")
+            return [(name, body)], color
+
+        try:
+            payload = json.loads(body)
+            color = payload.get("color", color)
+            uploads = [(str(item["name"]), base64.b64decode(item["data"], validate=True)) for item in payload["images"]]
+        except (ValueError, KeyError, TypeError, AttributeError, binascii.Error) as e:
+            raise UploadError(f"JSON inválido: se espera {{\"images\": [{{\"name\", \"data\"}}]}} ({e}).")
+        return uploads, color
+
+    def _stream(self, job: Job):
+        """Una línea JSON por resultado en cuanto termina; la conexión se cierra al final del trabajo."""
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        sent = 0
+        while True:
+            with job.condition:
+                while sent == len(job.completion_order) and not job.done:
+                    job.condition.wait()
+                records = [job.results[index] for index in job.completion_order[sent:]]
+                finished = job.done
+            try:
+                for record in records:
+                    self.wfile.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            sent += len(records)
+            if finished:
+                return
+
+    def _path_parts(self) -> list[str]:
+        return [part for part in urlsplit(self.path).path.split("/") if part]
+
+    def _send_json(self, payload: dict, status: HTTPStatus = HTTPStatus.OK, headers: Optional[dict] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8", headers)
+
+    def _send_error(self, status: HTTPStatus, message: str, headers: Optional[dict] = None):
+        self._send_json({"error": message}, status, headers)
+
+    def _send(self, status: HTTPStatus, body: bytes, content_type: str, headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def create_server(jobs: OcrJobServer, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, quiet: bool = False) -> ThreadingHTTPServer:
+    """Servidor HTTP sobre la cola de trabajos (port=0 elige un puerto libre)."""
+    server = ThreadingHTTPServer((host, port), OcrRequestHandler)
+    server.jobs = jobs
+    server.quiet = quiet
+    return server
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="extractor-ocr-server",
+        description="Servidor HTTP local que extrae el texto resaltado de las imágenes que suben los clientes.",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interfaz donde escuchar (por defecto, solo este equipo).")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help=f"Puerto (por defecto, {DEFAULT_PORT}).")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo).")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="Imágenes en espera como máximo.")
+    parser.add_argument("--timeout", type=float, default=None, help="Segundos máximos por imagen (por defecto, sin límite).")
+    add_pipeline_arguments(parser)
+    parser.add_argument("-q", "--quiet", action="store_true", help="No registrar cada petición en la salida de errores.")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    jobs = OcrJobServer(config_from_args(args), max_workers=args.workers, queue_size=args.queue_size, timeout=args.timeout)
+    server = create_server(jobs, args.host, args.port, args.quiet)
+    jobs.start()
+    host, port = server.server_address[:2]
+    print(f"Servidor OCR en http://{host}:{port} ({jobs.ocr.max_concurrency} procesos, cola de {args.queue_size}).", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Deteniendo.", file=sys.stderr)
+    finally:
+        server.server_close()
+        jobs.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
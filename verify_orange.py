@@ -1,10 +1,11 @@
 import os
 import sys
 from src.infrastructure.ocr_service import OcrService
+from src.infrastructure.instrumentation import Instrumentation, ConsoleSink
 
 def verify_orange_extraction():
-    service = OcrService()
-    service.DEBUG = True # Enable debug mode to see masks if needed
+    # Eventos y tiempos de cada etapa en la consola (antes: service.DEBUG = True)
+    service = OcrService(instrumentation=Instrumentation([ConsoleSink(include_spans=True)]))
     
     test_dir = "test_images"
     if not os.path.exists(test_dir):